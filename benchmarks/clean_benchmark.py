@@ -0,0 +1,65 @@
+"""
+Compare the cleaning engines of `clean_data`.
+
+    python -m benchmarks.clean_benchmark --sizes 10000 1000000 10000000
+    python -m benchmarks.clean_benchmark --from-raw --engines python vectorized arrow
+
+By default only the DataFrame cleaning step of the python and vectorized engines
+is timed. With --from-raw each engine is timed end to end from raw NDJSON bytes,
+which is the only fair comparison with the arrow engine (no json_normalize, no pandas).
+
+Synthetic records are generated once and tiled up to each size, so the 10M row
+case needs several GB of RAM for the input alone.
+"""
+import argparse
+import io
+import json
+import time
+import warnings
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_breweries
+from dags.etl.transform import clean_dataframe, clean_table, load_records, read_raw_table
+
+def build_frame(size, unique=100000):
+    base = pd.json_normalize(list(generate_breweries(min(size, unique))))
+    repeats = -(-size // len(base))
+    return pd.concat([base] * repeats, ignore_index=True).iloc[:size]
+
+def build_ndjson(size, unique=100000):
+    base = b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in generate_breweries(min(size, unique)))
+    repeats = -(-size // min(size, unique))
+    lines = (base * repeats).splitlines(keepends=True)[:size]
+    return b"".join(lines)
+
+def clean_raw(data, engine):
+    if engine == "arrow":
+        return clean_table(read_raw_table(data, "raw.jsonl"))
+    return clean_dataframe(pd.json_normalize(load_records(io.BytesIO(data), "raw.jsonl")), engine=engine)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--engines", nargs="+", default=["python", "vectorized"])
+    parser.add_argument("--from-raw", action="store_true", help="Time each engine end to end from raw NDJSON bytes.")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", FutureWarning)
+    print(f"{'rows':>10} {'engine':>11} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    for size in args.sizes:
+        frame = build_ndjson(size) if args.from_raw else build_frame(size)
+        baseline = None
+        for engine in args.engines:
+            start = time.perf_counter()
+            if args.from_raw:
+                clean_raw(frame, engine)
+            else:
+                clean_dataframe(frame.copy(), engine=engine)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{size:>10} {engine:>11} {elapsed:>9.2f} {size / elapsed:>12.0f} {baseline / elapsed:>7.1f}x")
+        del frame
+
+if __name__ == "__main__":
+    main()
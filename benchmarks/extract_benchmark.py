@@ -0,0 +1,30 @@
+"""
+Compare sequential and concurrent full-catalogue extraction against the local API stand-in.
+
+    python -m benchmarks.extract_benchmark --records 8000 --latency 0.2 --workers 1 4 8 16
+"""
+import argparse
+import time
+
+from benchmarks.fake_brewery_api import FakeBreweryApi
+from dags.etl.extract import fetch_all_breweries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds of latency per request.")
+    parser.add_argument("--per-page", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    with FakeBreweryApi(args.records, args.latency) as api:
+        print(f"{'workers':>8} {'records':>8} {'requests':>9} {'seconds':>8} {'records/s':>10}")
+        for workers in args.workers:
+            api.request_count = 0
+            start = time.perf_counter()
+            breweries = fetch_all_breweries(args.per_page, max_workers=workers, base_url=api.base_url)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8} {len(breweries):>8} {api.request_count:>9} {elapsed:>8.2f} {len(breweries) / elapsed:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Local stand-in for the Open Brewery DB API, used to benchmark extraction offline.
+
+Serves `/v1/breweries/meta` and `/v1/breweries?page=&per_page=` from synthetic
+records, with an optional per-request latency to mimic the real API.
+
+    python -m benchmarks.fake_brewery_api --records 8000 --latency 0.2 --port 8765
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import generate_breweries
+
+class FakeBreweryApi:
+    """
+    Threaded HTTP server answering like the Open Brewery DB breweries endpoints.
+
+    Args:
+        records (int): Size of the synthetic catalogue.
+        latency (float): Seconds each request sleeps before answering.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+    """
+
+    def __init__(self, records=8000, latency=0.0, host="127.0.0.1", port=0):
+        self.breweries = list(generate_breweries(records))
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/breweries"
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                with api._lock:
+                    api.request_count += 1
+                if api.latency:
+                    time.sleep(api.latency)
+
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/v1/breweries/meta":
+                    per_page = int(query.get("per_page", ["50"])[0])
+                    payload = {"total": str(len(api.breweries)), "page": "1", "per_page": str(per_page)}
+                elif url.path == "/v1/breweries":
+                    page = int(query.get("page", ["1"])[0])
+                    per_page = min(int(query.get("per_page", ["50"])[0]), 200)
+                    start = (page - 1) * per_page
+                    payload = api.breweries[start:start + per_page]
+                else:
+                    self.send_error(404)
+                    return
+
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    api = FakeBreweryApi(args.records, args.latency, port=args.port).start()
+    print(f"Serving {args.records} breweries at {api.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+if __name__ == "__main__":
+    main()
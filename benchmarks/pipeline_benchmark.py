@@ -0,0 +1,255 @@
+"""
+Run the bronze, clean, silver and gold stages at scale against a local S3 stand-in.
+
+    pip install "moto[server]"
+    python -m benchmarks.pipeline_benchmark --sizes 10000 1000000 10000000
+    python -m benchmarks.pipeline_benchmark --endpoint http://localhost:9003 --sizes 100000
+    python -m benchmarks.pipeline_benchmark --sizes 100000 --output baseline.json
+    python -m benchmarks.pipeline_benchmark --sizes 100000 --baseline baseline.json --threshold 0.2
+
+Without --endpoint an in-process moto server is started (moto is only needed for the
+benchmarks, so it is not part of requirements.txt). Each stage runs in a fresh
+process, which makes its peak RSS its own, and talks to S3 through a client whose
+botocore event hooks count requests and bytes sent and received.
+
+The stages run the functions of the full (non-incremental) DAG with its settings from
+`dags.settings`, so the `BREWERY_*` environment variables select the same codec, shard
+sizes, cleaning engine, silver writer and gold options as in Airflow: sharded bronze,
+one clean call per raw shard, the silver plan, routing, shard builds and commit (or the
+whole-layer writer), then the gold layer with its manifest, partials and cube. The mapped
+tasks of a stage run one after the other in its process. With BREWERY_CLEAN_WORKERS
+above 1, the requests of the cleaning worker processes are not counted.
+
+Records are generated once per size from `benchmarks.synthetic` (skewed across states
+and types) and tiled past 100k rows, so ids repeat in the largest runs.
+
+With --baseline the run fails (exit code 1) when a stage is slower, uses more memory,
+sends more requests or transfers more bytes than the baseline by more than --threshold.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import queue
+import resource
+import socket
+import sys
+import time
+
+from benchmarks.synthetic import generate_breweries
+from dags.conn.minio_conn import get_boto3_client, get_cached_boto3_client, get_arrow_filesystem
+from dags.conn.object_store import iter_keys, delete_keys
+from dags import settings
+
+STAGES = ("bronze", "clean", "silver", "gold")
+METRICS = ("seconds", "peak_rss_mb", "requests", "bytes_sent", "bytes_received")
+
+def count_transfer(client):
+    """
+    Register botocore event hooks that count the requests and bytes of a client.
+
+    Returns:
+        dict: Updated in place with `requests`, `bytes_sent` and `bytes_received`.
+    """
+    counters = {"requests": 0, "bytes_sent": 0, "bytes_received": 0}
+
+    def on_request(request, **kwargs):
+        counters["requests"] += 1
+        counters["bytes_sent"] += int(request.headers.get("Content-Length") or 0)
+
+    def on_response(http_response, **kwargs):
+        counters["bytes_received"] += int(http_response.headers.get("content-length") or 0)
+
+    client.meta.events.register("request-created.s3", on_request)
+    client.meta.events.register("after-call.s3", on_response)
+    return counters
+
+def iter_pages(rows, per_page=200, unique=100000):
+    base = list(generate_breweries(min(rows, unique)))
+    records = itertools.islice(itertools.cycle(base), rows)
+    while True:
+        page = list(itertools.islice(records, per_page))
+        if not page:
+            return
+        yield page
+
+def run_bronze(client, rows, credentials, bucket_name, inputs):
+    from dags.etl.load import stream_bronze_shards
+
+    return stream_bronze_shards(client, iter_pages(rows), bucket_name=bucket_name, file_name="bronze_breweries.jsonl",
+                                records_per_shard=settings.BRONZE_SHARD_RECORDS, part_size=settings.TRANSFER_CONFIG["multipart_chunksize"],
+                                codec=settings.BRONZE_CODEC, skip_unchanged=True)
+
+def run_clean(client, rows, credentials, bucket_name, bronze_keys):
+    from dags.etl.fused import clean_to_silver
+    from dags.etl.transform import clean_data
+
+    # Without the bronze stage, the shards of a previous run are cleaned
+    bronze_keys = bronze_keys or list(iter_keys(client, bucket_name, "bronze_layer/raw/"))
+    if settings.FUSED_CLEAN_SILVER:
+        return clean_to_silver(client, bucket_name=bucket_name, keys=bronze_keys, engine=settings.CLEAN_ENGINE,
+                               cleaned_dir="bronze_layer/cleaned" if settings.FUSED_CLEANED_OUTPUT else None,
+                               use_manifest=settings.SILVER_MANIFEST, transfer_config=settings.TRANSFER_CONFIG, codec=settings.BRONZE_CODEC)
+    client_config = dict(zip(("endpoint", "access_key", "secret_key"), credentials))
+    # One call per raw shard, like the mapped clean tasks
+    return sorted(
+        cleaned_key for bronze_key in bronze_keys
+        for cleaned_key in clean_data(client, bucket_name=bucket_name, cleaned_dir="bronze_layer/cleaned", keys=[bronze_key],
+                                      engine=settings.CLEAN_ENGINE, max_workers=settings.CLEAN_WORKERS, client_config=client_config,
+                                      transfer_config=settings.TRANSFER_CONFIG, codec=settings.BRONZE_CODEC)
+    )
+
+def run_silver(client, rows, credentials, bucket_name, cleaned_keys):
+    from dags.etl.load import (create_silver_layer, prune_objects, plan_state_shards, route_state_shards, build_silver_shard,
+                               commit_silver_shards)
+
+    if settings.FUSED_CLEAN_SILVER:
+        print("Fused mode: the silver layer was written by the clean stage.")
+        return cleaned_keys
+    cleaned_keys = cleaned_keys or sorted(iter_keys(client, bucket_name, "bronze_layer/cleaned/"))
+    prune_objects(client, cleaned_keys, bucket_name=bucket_name, prefix="bronze_layer/cleaned/")
+    options = dict(bucket_name=bucket_name, use_manifest=settings.SILVER_MANIFEST, transfer_config=settings.TRANSFER_CONFIG)
+    if settings.SILVER_WRITER == "dataset":
+        return create_silver_layer(client, writer="dataset", dataset_options=settings.SILVER_DATASET_OPTIONS,
+                                   filesystem=get_arrow_filesystem(*credentials), **options)
+    if settings.SILVER_WRITER == "stream":
+        return create_silver_layer(client, writer="stream", stream_options=settings.SILVER_STREAM_OPTIONS, **options)
+    if settings.SILVER_SHARDS < 1:
+        return create_silver_layer(client, in_memory=settings.SILVER_IN_MEMORY, **options)
+    state_groups = plan_state_shards(client, cleaned_keys, shard_count=settings.SILVER_SHARDS, bucket_name=bucket_name)
+    shard_keys = route_state_shards(client, cleaned_keys, state_groups, bucket_name=bucket_name)
+    results = [build_silver_shard(client, keys, states, **options) for keys, states in zip(shard_keys, state_groups)]
+    return commit_silver_shards(client, results, bucket_name=bucket_name, use_manifest=settings.SILVER_MANIFEST)
+
+def run_gold(client, rows, credentials, bucket_name, changed_states):
+    from dags.etl.load import create_gold_layer, CUBE_GROUPING_SETS
+
+    filesystem = get_arrow_filesystem(*credentials) if settings.SILVER_WRITER == "dataset" else None
+    create_gold_layer(client, bucket_name=bucket_name, filesystem=filesystem, use_manifest=settings.SILVER_MANIFEST,
+                      use_partials=settings.GOLD_PARTIALS, grouping_sets=CUBE_GROUPING_SETS if settings.GOLD_CUBE else None,
+                      transfer_config=settings.TRANSFER_CONFIG)
+
+STAGE_RUNNERS = {"bronze": run_bronze, "clean": run_clean, "silver": run_silver, "gold": run_gold}
+
+def run_stage(stage, rows, credentials, bucket_name, inputs, results):
+    client = get_cached_boto3_client(*credentials, **settings.S3_CLIENT_SETTINGS)
+    counters = count_transfer(client)
+    start = time.perf_counter()
+    output = STAGE_RUNNERS[stage](client, rows, credentials, bucket_name, inputs)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != "darwin" else 1024 * 1024)
+    results.put((dict(counters, seconds=seconds, peak_rss_mb=peak_rss), output))
+
+def measure(stage, rows, credentials, bucket_name, inputs=None):
+    """
+    Run a stage in a fresh process.
+
+    Returns:
+        tuple: The stage metrics and its output (the keys or states the next stage reads).
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_stage, args=(stage, rows, credentials, bucket_name, inputs, results))
+    process.start()
+    # Read before joining: a process does not exit while its queued output is not consumed
+    outcome = None
+    while outcome is None:
+        try:
+            outcome = results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                break
+    process.join()
+    if process.exitcode != 0 or outcome is None:
+        raise RuntimeError(f"Stage {stage} failed for {rows} rows (exit code {process.exitcode}).")
+    return outcome
+
+def empty_bucket(client, bucket_name):
+    existing = [bucket["Name"] for bucket in client.list_buckets().get("Buckets", [])]
+    if bucket_name not in existing:
+        client.create_bucket(Bucket=bucket_name)
+        return
+    delete_keys(client, bucket_name, iter_keys(client, bucket_name, ""))
+
+def start_moto_server():
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        sys.exit("moto is not installed: pip install 'moto[server]', or pass --endpoint of a running MinIO.")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    return server, f"http://127.0.0.1:{port}"
+
+def regressions(results, baseline, threshold):
+    """
+    List the stages whose time, peak RSS, request count or transferred bytes grew more than
+    `threshold` over the baseline. Metrics missing from an older baseline are not compared.
+    """
+    failures = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            if metric not in previous:
+                continue
+            limit = previous[metric] * (1 + threshold)
+            if current[metric] > limit:
+                failures.append(f"{key} {metric}: {current[metric]:.2f} > {limit:.2f} (baseline {previous[metric]:.2f})")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000, 10000000])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--endpoint", help="S3 endpoint of a running MinIO; a moto server is started when omitted.")
+    parser.add_argument("--access-key", default="benchmark")
+    parser.add_argument("--secret-key", default="benchmark")
+    parser.add_argument("--bucket", default="pipeline-benchmark")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results of a previous --output.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative growth over the baseline.")
+    args = parser.parse_args()
+
+    server = None
+    endpoint = args.endpoint
+    if endpoint is None:
+        server, endpoint = start_moto_server()
+    credentials = (endpoint, args.access_key, args.secret_key)
+    client = get_boto3_client(*credentials)
+
+    results = {}
+    try:
+        print(f"{'rows':>10} {'stage':>7} {'seconds':>9} {'rss MiB':>9} {'requests':>9} {'MiB sent':>9} {'MiB recv':>9}")
+        for rows in args.sizes:
+            empty_bucket(client, args.bucket)
+            output = None
+            for stage in args.stages:
+                stats, output = measure(stage, rows, credentials, args.bucket, output)
+                results[f"{rows}/{stage}"] = stats
+                print(f"{rows:>10} {stage:>7} {stats['seconds']:>9.2f} {stats['peak_rss_mb']:>9.1f} {stats['requests']:>9} "
+                      f"{stats['bytes_sent'] / 2 ** 20:>9.1f} {stats['bytes_received'] / 2 ** 20:>9.1f}")
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(results, json.load(f), args.threshold)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print(f"No regression above {args.threshold:.0%} of the baseline.")
+
+if __name__ == "__main__":
+    main()
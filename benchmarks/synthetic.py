@@ -0,0 +1,67 @@
+import random
+import uuid
+
+# Rough shape of the real catalogue: a handful of states and types hold most breweries.
+STATES = [
+    ("California", 12.0), ("Colorado", 6.0), ("Washington", 6.0), ("New York", 5.0),
+    ("Michigan", 5.0), ("Pennsylvania", 5.0), ("Texas", 4.5), ("Oregon", 4.0),
+    ("Florida", 4.0), ("Ohio", 3.5), ("North Carolina", 3.5), ("Illinois", 3.5),
+    ("Virginia", 3.0), ("Wisconsin", 2.5), ("Massachusetts", 2.5), ("Minnesota", 2.5),
+    ("Indiana", 2.0), ("Maine", 1.5), ("Missouri", 1.5), ("Arizona", 1.5),
+    ("Georgia", 1.5), ("Vermont", 1.0), ("Montana", 1.0), ("Oklahoma", 1.0),
+    ("Kentucky", 1.0), ("Idaho", 0.8), ("Utah", 0.8), ("New Mexico", 0.8),
+    ("Iowa", 0.8), ("Maryland", 0.8), ("New Jersey", 0.8), ("Connecticut", 0.7),
+    ("Tennessee", 0.7), ("South Carolina", 0.7), ("Alabama", 0.5), ("Alaska", 0.5),
+    ("Arkansas", 0.4), ("Delaware", 0.3), ("Hawaii", 0.3), ("Kansas", 0.5),
+    ("Louisiana", 0.4), ("Mississippi", 0.2), ("Nebraska", 0.5), ("Nevada", 0.5),
+    ("New Hampshire", 0.6), ("North Dakota", 0.2), ("Rhode Island", 0.3),
+    ("South Dakota", 0.3), ("West Virginia", 0.3), ("Wyoming", 0.3),
+    ("Scotland", 0.3), ("Ireland", 0.3), ("Singapore", 0.1),
+]
+COUNTRIES = {"Scotland": "Scotland", "Ireland": "Ireland", "Singapore": "Singapore"}
+BREWERY_TYPES = [
+    ("micro", 55.0), ("brewpub", 30.0), ("planning", 6.0), ("regional", 2.5),
+    ("contract", 2.0), ("proprietor", 1.5), ("large", 1.0), ("closed", 1.5),
+    ("nano", 0.3), ("taproom", 0.1), ("bar", 0.1),
+]
+CITY_WORDS = ["Spring", "Oak", "River", "Lake", "Green", "Cedar", "Fair", "Mill", "Pine", "Rock"]
+CITY_SUFFIXES = ["field", "ville", "town", "wood", " Falls", " City", "ford", "port"]
+NAME_WORDS = ["Hop", "Barrel", "Copper", "Wild", "Iron", "Golden", "Stone", "Foggy", "Lost", "Old"]
+NAME_SUFFIXES = ["Brewing Co", "Brewery", "Beer Works", "Ale House", "Brewpub", "Craft Beer"]
+
+def generate_breweries(count, seed=42):
+    """
+    Generate Open Brewery DB shaped records with a realistic skew across states and types.
+
+    Args:
+        count (int): Number of records to generate.
+        seed (int): Seed for the random generator, so runs are reproducible.
+
+    Yields:
+        dict: A brewery record with the same fields as the real API.
+    """
+    rng = random.Random(seed)
+    states, state_weights = zip(*STATES)
+    types, type_weights = zip(*BREWERY_TYPES)
+    for _ in range(count):
+        state = rng.choices(states, state_weights)[0]
+        city = f"{rng.choice(CITY_WORDS)}{rng.choice(CITY_SUFFIXES)}"
+        street = f"{rng.randint(1, 9999)} {rng.choice(CITY_WORDS)} St"
+        yield {
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "name": f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {rng.choice(NAME_SUFFIXES)}",
+            "brewery_type": rng.choices(types, type_weights)[0],
+            "address_1": street,
+            "address_2": None,
+            "address_3": None,
+            "city": city,
+            "state_province": state,
+            "postal_code": f"{rng.randint(10000, 99999)}",
+            "country": COUNTRIES.get(state, "United States"),
+            "longitude": f"{rng.uniform(-124, -67):.8f}" if rng.random() > 0.1 else None,
+            "latitude": f"{rng.uniform(25, 49):.8f}" if rng.random() > 0.1 else None,
+            "phone": f"{rng.randint(2000000000, 9999999999)}" if rng.random() > 0.2 else None,
+            "website_url": f"http://www.{rng.choice(NAME_WORDS).lower()}{rng.randint(1, 999)}.com" if rng.random() > 0.3 else None,
+            "state": state,
+            "street": street,
+        }
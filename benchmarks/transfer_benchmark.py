@@ -0,0 +1,88 @@
+"""
+Compare multipart transfer settings for large bronze and silver objects against a local MinIO.
+
+    docker compose up -d minio
+    python -m benchmarks.transfer_benchmark --bronze-mb 256 --silver-rows 2000000
+    python -m benchmarks.transfer_benchmark --chunksizes 8 16 64 --concurrency 1 4 10 32 --no-threads
+
+A bronze NDJSON object and a silver Parquet object are generated once from synthetic
+records, then uploaded with `upload_file` for every combination of chunk size and
+concurrency (the multipart threshold follows the chunk size). Each upload is deleted
+right after it is timed, so the bucket does not grow.
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_breweries
+from dags.conn.minio_conn import get_cached_boto3_client
+from dags.conn.object_store import transfer_kwargs
+
+MIB = 1024 * 1024
+
+def write_bronze(path, size_mb, unique=100000):
+    block = b"".join(json.dumps(record).encode("utf-8") + b"\n" for record in generate_breweries(unique))
+    with open(path, "wb") as f:
+        written = 0
+        while written < size_mb * MIB:
+            f.write(block)
+            written += len(block)
+
+def write_silver(path, rows):
+    pd.json_normalize(list(generate_breweries(rows))).to_parquet(path, index=False)
+
+def ensure_bucket(client, bucket_name):
+    existing = [bucket["Name"] for bucket in client.list_buckets().get("Buckets", [])]
+    if bucket_name not in existing:
+        client.create_bucket(Bucket=bucket_name)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoint", default=os.getenv("MINIO_ENDPOINT", "http://localhost:9003"))
+    parser.add_argument("--access-key", default=os.getenv("MINIO_ACCESS_KEY", "testtamura"))
+    parser.add_argument("--secret-key", default=os.getenv("MINIO_SECRET_KEY", "testtamura"))
+    parser.add_argument("--bucket", default="transfer-benchmark")
+    parser.add_argument("--bronze-mb", type=int, default=256, help="Size of the bronze NDJSON object in MiB.")
+    parser.add_argument("--silver-rows", type=int, default=2000000, help="Rows of the silver Parquet object.")
+    parser.add_argument("--chunksizes", type=int, nargs="+", default=[8, 16, 64], help="Part sizes in MiB.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10, 32])
+    parser.add_argument("--no-threads", action="store_true", help="Also time use_threads=False (parts one by one).")
+    args = parser.parse_args()
+
+    client = get_cached_boto3_client(args.endpoint, args.access_key, args.secret_key,
+                                     max_pool_connections=max(args.concurrency))
+    ensure_bucket(client, args.bucket)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        objects = {"bronze": os.path.join(tmp, "bronze.jsonl"), "silver": os.path.join(tmp, "silver.parquet")}
+        write_bronze(objects["bronze"], args.bronze_mb)
+        write_silver(objects["silver"], args.silver_rows)
+
+        settings = [
+            {"multipart_threshold": chunk * MIB, "multipart_chunksize": chunk * MIB, "max_concurrency": workers, "use_threads": True}
+            for chunk, workers in itertools.product(args.chunksizes, args.concurrency)
+        ]
+        if args.no_threads:
+            settings += [{"multipart_threshold": chunk * MIB, "multipart_chunksize": chunk * MIB, "max_concurrency": 1, "use_threads": False}
+                         for chunk in args.chunksizes]
+
+        print(f"{'object':>7} {'MiB':>7} {'chunk':>6} {'workers':>8} {'threads':>8} {'seconds':>8} {'MiB/s':>8}")
+        for name, path in objects.items():
+            size_mb = os.path.getsize(path) / MIB
+            for transfer_config in settings:
+                key = f"benchmark/{name}"
+                start = time.perf_counter()
+                client.upload_file(path, args.bucket, key, **transfer_kwargs(transfer_config))
+                elapsed = time.perf_counter() - start
+                client.delete_object(Bucket=args.bucket, Key=key)
+                print(f"{name:>7} {size_mb:>7.1f} {transfer_config['multipart_chunksize'] // MIB:>6} "
+                      f"{transfer_config['max_concurrency']:>8} {str(transfer_config['use_threads']):>8} "
+                      f"{elapsed:>8.2f} {size_mb / elapsed:>8.1f}")
+
+if __name__ == "__main__":
+    main()
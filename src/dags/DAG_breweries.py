@@ -1,61 +1,228 @@
 from datetime import datetime, timedelta
 from airflow import DAG
-from airflow.operators.python import PythonOperator
-from etl.extract import fetch_breweries
-from etl.transform import clean_data
-from etl.load import create_bronze_layer, create_silver_layer, create_gold_layer
-from conn.minio_conn import get_boto3_client
-from conn.minio_bucket import create_bucket
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
+from dags.etl.extract import iter_brewery_pages, record_api_stats
+from dags.etl.http_client import ApiClient, ConditionalCache
+from dags.etl.transform import clean_data
+from dags.etl.load import (stream_bronze_shards, create_silver_layer, merge_silver_delta, create_gold_layer, CUBE_GROUPING_SETS,
+                      prune_objects, plan_state_shards, route_state_shards, build_silver_shard, commit_silver_shards)
+from dags.etl.incremental import stream_bronze_delta, save_fingerprint_index, pending_index_key, promote_fingerprint_index, delta_changed
+from dags.etl.fused import clean_to_silver
+from dags.etl.snapshot import bronze_changed, save_published_snapshot
+from dags.etl.checkpoint import PageCheckpoints
+from dags.conn.minio_conn import get_cached_boto3_client, get_arrow_filesystem
+from dags.conn.minio_bucket import create_bucket
+from dags.etl.telemetry import traced_task, instrument_client, stage_span
+from dags.etl.profiling import profiled_task
+from dags.settings import (INCREMENTAL, BRONZE_CODEC, PAGE_CHECKPOINTS, API_RATE_LIMIT, API_CONDITIONAL_REQUESTS, CLEAN_ENGINE, CLEAN_WORKERS,
+                           SILVER_IN_MEMORY, BRONZE_SHARD_RECORDS, SILVER_SHARDS, FUSED_CLEAN_SILVER, FUSED_CLEANED_OUTPUT, SILVER_WRITER,
+                           SILVER_DATASET_OPTIONS, SILVER_STREAM_OPTIONS, SILVER_MANIFEST, GOLD_PARTIALS, GOLD_CUBE, MINIO_CLIENT_CONFIG,
+                           S3_CLIENT_SETTINGS, TRANSFER_CONFIG, TELEMETRY_EXPORTER, TELEMETRY_FILE, PROFILE)
 
-# Task to fetch brewery data from external source
-def fetch_breweries_task():
+traced = traced_task(TELEMETRY_EXPORTER, TELEMETRY_FILE)
+
+def profiling_enabled():
     """
-    Extract brewery data by calling the fetch_breweries function.
-    Returns the breweries data in JSON format.
+    Profile the tasks when `BREWERY_PROFILE` is true or the run was triggered with `{"profile": true}`.
+    Both are read without querying the metadata database, so tasks that are not profiled pay nothing.
     """
-    breweries = fetch_breweries()  # Fetch the brewery data
-    return breweries
+    if PROFILE:
+        return True
+    from airflow.operators.python import get_current_context
+    conf = get_current_context()['dag_run'].conf or {}
+    return str(conf.get('profile', 'false')).lower() in ('1', 'true', 'yes')
+
+# cProfile, tracemalloc and RSS report of each task, written to `_profiles/<dag_id>/<run_id>/<task_id>/try-<n>/`
+profiled = profiled_task(profiling_enabled, lambda: get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS), bucket_name='datalake-case')
 
 # Task to create the MinIO bucket for data storage
+@traced
+@profiled
 def create_bucket_task():
     """
     Create the MinIO bucket where all data layers will be stored.
     """
-    boto3_client = get_boto3_client('http://minio:9000', access_key='testtamura', secret_key='testtamura')
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
     create_bucket(boto3_client, bucket_name='datalake-case')  # Create bucket in MinIO
 
-# Task to load the raw brewery data into the bronze layer
-def bronze_layer_task(breweries):
+# Task to extract brewery data and stream it into the bronze layer
+@traced
+@profiled
+def fetch_breweries_task(ds_nodash, run_id):
+    """
+    Extract the whole brewery catalogue with concurrent paginated requests and
+    stream the pages into MinIO's bronze layer as newline-delimited JSON.
+    In incremental mode only the changes since the previous run are written.
+    Fetched pages are checkpointed per run, so a retry resumes at the first missing page;
+    the checkpoints are removed once the bronze objects are written. The incremental
+    fingerprint index of the delta is saved as pending and only published by the gold
+    task: until the run succeeds, retries and later runs diff against the previous index.
+    Requests are rate limited and, in full runs, conditional: pages unchanged since the previous
+    run come back as 304s and are read back from the bronze shards they were written to.
+    Returns only the keys of the bronze objects (one per shard), so no data goes through XCom.
+    """
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    checkpoints = PageCheckpoints(boto3_client, run_id, bucket_name='datalake-case', codec=BRONZE_CODEC) if PAGE_CHECKPOINTS else None
+    # A delta only holds the changed breweries, so incremental runs cannot answer a 304 from bronze
+    cache = ConditionalCache.load(boto3_client, bucket_name='datalake-case') if API_CONDITIONAL_REQUESTS and not INCREMENTAL else None
+    api_client = ApiClient(pool_size=8, rate=API_RATE_LIMIT or None)
+    # The pages are fetched while the bronze stage consumes them, so the extract span encloses it
+    with stage_span('extract', **{'brewery.bucket': 'datalake-case'}) as extract_stats:
+        def pages():
+            for _, breweries in iter_brewery_pages(per_page=200, max_workers=8, session=api_client, checkpoints=checkpoints, cache=cache):
+                # Counted on the extract stage only, the bronze stage counts its own rows
+                extract_stats['rows_out'] += len(breweries)
+                yield breweries
+
+        try:
+            if INCREMENTAL:
+                delta_key, index = stream_bronze_delta(boto3_client, pages(), bucket_name='datalake-case', file_name=f"bronze_breweries_delta_{ds_nodash}.jsonl",
+                                                       part_size=TRANSFER_CONFIG['multipart_chunksize'], codec=BRONZE_CODEC)
+                keys = [delta_key]
+            else:
+                keys = stream_bronze_shards(boto3_client, pages(), bucket_name='datalake-case', file_name="bronze_breweries.jsonl",
+                                            records_per_shard=BRONZE_SHARD_RECORDS, part_size=TRANSFER_CONFIG['multipart_chunksize'], codec=BRONZE_CODEC,
+                                            skip_unchanged=True)
+        finally:
+            api_client.close()
+            record_api_stats(api_client)
+    if cache is not None:
+        cache.save(keys, BRONZE_SHARD_RECORDS)
+    if checkpoints is not None:
+        checkpoints.clear()
+    if INCREMENTAL:
+        # Published by the gold task: a run failing after this point keeps the previous index
+        save_fingerprint_index(boto3_client, index, bucket_name='datalake-case', index_key=pending_index_key(delta_key))
+    return keys
+
+# Task to stop the run when the bronze snapshot did not change since the last complete run
+@traced
+@profiled
+def check_bronze_task(bronze_keys):
     """
-    Uploads raw brewery data to MinIO's bronze layer.
+    Compare the ETags of the bronze objects with the snapshot published by the last complete run,
+    or, in incremental mode, check that the delta holds any change.
+    Returns the snapshot id, or None, which makes the ShortCircuitOperator skip every downstream task.
     """
-    boto3_client = get_boto3_client('http://minio:9000', access_key='testtamura', secret_key='testtamura')
-    create_bronze_layer(boto3_client, breweries, bucket_name='datalake-case', file_name="bronze_breweries.json")
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    if INCREMENTAL:
+        return delta_changed(boto3_client, bronze_keys, bucket_name='datalake-case')
+    return bronze_changed(boto3_client, bronze_keys, bucket_name='datalake-case')
 
 # Task to clean the brewery data (e.g., handle missing values, format data)
-def clean_data_task():
+@traced
+@profiled
+def clean_data_task(bronze_key):
     """
     Clean brewery data by normalizing column names, filling missing values,
-    and ensuring correct data formatting.
+    and ensuring correct data formatting. Mapped: one task instance per raw shard.
     """
-    boto3_client = get_boto3_client('http://minio:9000', access_key='testtamura', secret_key='testtamura')
-    clean_data(boto3_client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw', cleaned_dir='bronze_layer/cleaned')
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    cleaned_dir = 'bronze_layer/cleaned_delta' if INCREMENTAL else 'bronze_layer/cleaned'
+    return clean_data(boto3_client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw', cleaned_dir=cleaned_dir, keys=[bronze_key], engine=CLEAN_ENGINE,
+                      max_workers=CLEAN_WORKERS, client_config=MINIO_CLIENT_CONFIG, transfer_config=TRANSFER_CONFIG, codec=BRONZE_CODEC)
+
+# Task to split the silver build into mapped tasks
+@traced
+@profiled
+def plan_silver_task(cleaned_keys):
+    """
+    Plan the mapped silver tasks: groups of states with similar row counts for the sharded
+    'pandas' build, each with its own inputs routed from the cleaned objects, otherwise a single
+    shard running the whole-layer writer (or the incremental merge).
+    """
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    # One list of cleaned keys per mapped clean task
+    cleaned_keys = sorted(key for keys in cleaned_keys for key in keys)
+    if INCREMENTAL:
+        return [{'cleaned_keys': cleaned_keys, 'states': None}]
+    # Cleaned shards of a previous run with more raw shards would be read by the whole-layer writers
+    prune_objects(boto3_client, cleaned_keys, bucket_name='datalake-case', prefix='bronze_layer/cleaned/')
+    if SILVER_WRITER != 'pandas' or SILVER_SHARDS < 1:
+        return [{'cleaned_keys': cleaned_keys, 'states': None}]
+    state_groups = plan_state_shards(boto3_client, cleaned_keys, shard_count=SILVER_SHARDS, bucket_name='datalake-case')
+    # Route the rows to their shard once, so each mapped task only reads its own states
+    shard_keys = route_state_shards(boto3_client, cleaned_keys, state_groups, bucket_name='datalake-case')
+    return [{'cleaned_keys': keys, 'states': states} for keys, states in zip(shard_keys, state_groups)]
 
 # Task to transform cleaned data to the silver layer (parquet format)
-def silver_layer_task():
+@traced
+@profiled
+def silver_layer_task(cleaned_keys, states=None):
     """
     Transforms and stores the cleaned data in the Silver Layer (Parquet format).
+    Mapped: each task instance writes the partitions of a group of states, or the whole
+    layer when `states` is None. In incremental mode the cleaned delta is merged into the
+    partitions it touches.
     """
-    boto3_client = get_boto3_client('http://minio:9000', access_key='testtamura', secret_key='testtamura')
-    create_silver_layer(boto3_client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/')
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    if INCREMENTAL:
+        return {'changed': merge_silver_delta(boto3_client, bucket_name='datalake-case', silver_dir='silver_layer/', keys=cleaned_keys, use_manifest=SILVER_MANIFEST)}
+    if states is not None:
+        return build_silver_shard(boto3_client, cleaned_keys, states, bucket_name='datalake-case', silver_dir='silver_layer/', use_manifest=SILVER_MANIFEST,
+                                  transfer_config=TRANSFER_CONFIG)
+    if SILVER_WRITER == 'dataset':
+        changed_states = create_silver_layer(boto3_client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/',
+                                             writer='dataset', dataset_options=SILVER_DATASET_OPTIONS, filesystem=get_arrow_filesystem(**MINIO_CLIENT_CONFIG),
+                                             use_manifest=SILVER_MANIFEST, transfer_config=TRANSFER_CONFIG)
+    elif SILVER_WRITER == 'stream':
+        changed_states = create_silver_layer(boto3_client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/',
+                                             writer='stream', stream_options=SILVER_STREAM_OPTIONS, use_manifest=SILVER_MANIFEST, transfer_config=TRANSFER_CONFIG)
+    else:
+        changed_states = create_silver_layer(boto3_client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/',
+                                             in_memory=SILVER_IN_MEMORY, use_manifest=SILVER_MANIFEST, transfer_config=TRANSFER_CONFIG)
+    return {'changed': changed_states}
+
+# Task to combine the mapped silver tasks
+@traced
+@profiled
+def commit_silver_task(shard_results):
+    """
+    Update the silver manifest once every mapped silver task succeeded, so concurrent
+    shards never write it, and return the changed states for the gold layer.
+    """
+    shard_results = list(shard_results)
+    if any('partitions' in result for result in shard_results):
+        boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+        return commit_silver_shards(boto3_client, shard_results, bucket_name='datalake-case', silver_dir='silver_layer/', use_manifest=SILVER_MANIFEST)
+    return sorted(state for result in shard_results for state in result['changed'])
+
+# Task to clean the raw shards and write the silver layer in one pass (fused mode)
+@traced
+@profiled
+def clean_silver_task(bronze_keys):
+    """
+    Clean the raw shards in memory and write the silver partitions directly,
+    optionally keeping the cleaned objects as a side output.
+    """
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    return clean_to_silver(boto3_client, bucket_name='datalake-case', silver_dir='silver_layer/', keys=bronze_keys, engine=CLEAN_ENGINE,
+                           cleaned_dir='bronze_layer/cleaned' if FUSED_CLEANED_OUTPUT else None, use_manifest=SILVER_MANIFEST,
+                           transfer_config=TRANSFER_CONFIG, codec=BRONZE_CODEC)
 
 # Task to create the gold layer with aggregated brewery data (by type and state)
-def gold_layer_task():
+@traced
+@profiled
+def gold_layer_task(changed_states, snapshot, bronze_keys):
     """
-    Creates the Gold Layer with aggregated brewery data, storing it as both CSV and Parquet files.
+    Creates the Gold Layer with aggregated brewery data as Parquet tables: the counts by brewery type
+    and state and, with `BREWERY_GOLD_CUBE`, the other grouping sets computed in the same pass.
+    With `BREWERY_GOLD_PARTIALS` the counts are rebuilt from per-file partials cached by silver ETag;
+    otherwise, in incremental mode only the states changed by the delta are re-aggregated,
+    and in full mode only the states the silver manifest marks as dirty.
+    Then publishes the bronze snapshot, so an identical next snapshot skips the run,
+    and in incremental mode the fingerprint index of the delta.
     """
-    boto3_client = get_boto3_client('http://minio:9000', access_key='testtamura', secret_key='testtamura')
-    create_gold_layer(boto3_client, bucket_name='datalake-case', silver_dir='silver_layer/', gold_dir='golden_layer/')
+    boto3_client = instrument_client(get_cached_boto3_client(**MINIO_CLIENT_CONFIG, **S3_CLIENT_SETTINGS))
+    states = changed_states if INCREMENTAL else None
+    # A hive-partitioned silver layer is read through pyarrow, with partition and column pruning
+    filesystem = get_arrow_filesystem(**MINIO_CLIENT_CONFIG) if SILVER_WRITER == 'dataset' and not INCREMENTAL else None
+    create_gold_layer(boto3_client, bucket_name='datalake-case', silver_dir='silver_layer/', gold_dir='golden_layer/', states=states, filesystem=filesystem,
+                      use_manifest=SILVER_MANIFEST, use_partials=GOLD_PARTIALS, grouping_sets=CUBE_GROUPING_SETS if GOLD_CUBE else None,
+                      transfer_config=TRANSFER_CONFIG)
+    save_published_snapshot(boto3_client, snapshot, bucket_name='datalake-case')
+    if INCREMENTAL:
+        promote_fingerprint_index(boto3_client, bronze_keys[0], bucket_name='datalake-case')
 
 # Default arguments for the DAG
 default_args = {
@@ -80,52 +247,87 @@ dag = DAG(
 
 # Define task sequence and dependencies
 
-fetch_task = PythonOperator(
-    task_id='fetch_breweries',
-    python_callable=fetch_breweries_task,  # Task to fetch the data
-    dag=dag,
-    retries=3,  # Retry task 3 times if it fails
-    retry_delay=timedelta(minutes=5)  # Retry after 5 minutes if task fails
-)
-
 create_bucket_task = PythonOperator(
     task_id='bucket_creation',
     python_callable=create_bucket_task,  # Task to create the bucket
     dag=dag
 )
 
-bronze_layer_task = PythonOperator(
-    task_id='load_bronze_layer',
-    python_callable=bronze_layer_task,  # Task to load data into the bronze layer
+fetch_task = PythonOperator(
+    task_id='fetch_breweries',
+    python_callable=fetch_breweries_task,  # Task to fetch the data and stream it to the bronze layer
     dag=dag,
-    retries=3,
-    retry_delay=timedelta(minutes=5),
-    op_args=[fetch_task.output]
+    retries=3,  # Retry task 3 times if it fails
+    retry_delay=timedelta(minutes=5)  # Retry after 5 minutes if task fails
 )
 
-clean_data_task = PythonOperator(
-    task_id='clean_data',
-    python_callable=clean_data_task,  # Task to clean the data
+# Skips clean, silver and gold when the raw data is the one of the last complete run
+check_bronze_task = ShortCircuitOperator(
+    task_id='check_bronze_changed',
+    python_callable=check_bronze_task,  # Task to compare the bronze snapshot with the published one
     dag=dag,
-    retries=3,
-    retry_delay=timedelta(minutes=5)
+    op_args=[fetch_task.output]
 )
 
-silver_layer_task = PythonOperator(
-    task_id='create_silver_layer',
-    python_callable=silver_layer_task,  # Task to create the silver layer
-    dag=dag,
-    retries=3,
-    retry_delay=timedelta(minutes=5)
-)
+if FUSED_CLEAN_SILVER:
+    clean_silver_task = PythonOperator(
+        task_id='clean_and_create_silver_layer',
+        python_callable=clean_silver_task,  # Task to clean the data and create the silver layer
+        dag=dag,
+        retries=3,
+        retry_delay=timedelta(minutes=5),
+        op_args=[fetch_task.output]
+    )
+    silver_output = clean_silver_task.output
+else:
+    # One mapped clean task per raw shard: a failure only retries its shard
+    clean_data_task = PythonOperator.partial(
+        task_id='clean_data',
+        python_callable=clean_data_task,  # Task to clean the data
+        dag=dag,
+        retries=3,
+        retry_delay=timedelta(minutes=5),
+    ).expand(op_args=fetch_task.output.map(lambda bronze_key: [bronze_key]))  # Only the bronze object keys travel through XCom
+
+    plan_silver_task = PythonOperator(
+        task_id='plan_silver_layer',
+        python_callable=plan_silver_task,  # Task to group the states into silver shards
+        dag=dag,
+        retries=3,
+        retry_delay=timedelta(minutes=5),
+        op_args=[clean_data_task.output]
+    )
+
+    # One mapped silver task per group of states
+    silver_layer_task = PythonOperator.partial(
+        task_id='create_silver_layer',
+        python_callable=silver_layer_task,  # Task to create the silver layer
+        dag=dag,
+        retries=3,
+        retry_delay=timedelta(minutes=5),
+    ).expand(op_kwargs=plan_silver_task.output)
+
+    commit_silver_task = PythonOperator(
+        task_id='commit_silver_layer',
+        python_callable=commit_silver_task,  # Task to update the silver manifest
+        dag=dag,
+        retries=3,
+        retry_delay=timedelta(minutes=5),
+        op_args=[silver_layer_task.output]
+    )
+    silver_output = commit_silver_task.output
 
 gold_layer_task = PythonOperator(
     task_id='create_gold_layer',
     python_callable=gold_layer_task,  # Task to create the gold layer
     dag=dag,
     retries=3,
-    retry_delay=timedelta(minutes=5)
+    retry_delay=timedelta(minutes=5),
+    op_args=[silver_output, check_bronze_task.output, fetch_task.output]
 )
 
 # Set up task dependencies in the correct order
-fetch_task >> create_bucket_task >> bronze_layer_task >> clean_data_task >> silver_layer_task >> gold_layer_task
+if FUSED_CLEAN_SILVER:
+    create_bucket_task >> fetch_task >> check_bronze_task >> clean_silver_task >> gold_layer_task
+else:
+    create_bucket_task >> fetch_task >> check_bronze_task >> clean_data_task >> plan_silver_task >> silver_layer_task >> commit_silver_task >> gold_layer_task
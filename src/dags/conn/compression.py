@@ -0,0 +1,140 @@
+import gzip
+import io
+import os
+import zlib
+import pyarrow as pa
+
+# Codecs of the bronze JSON objects; the codec of an object is recorded in its key suffix
+COMPRESSION_CODECS = ('none', 'gzip', 'zstd')
+CODEC_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+def codec_suffix(codec):
+    """
+    Key suffix of a codec: '' for 'none', '.gz' for 'gzip' and '.zst' for 'zstd'.
+    """
+    if codec not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown compression codec '{codec}', expected one of {COMPRESSION_CODECS}.")
+    return CODEC_SUFFIXES.get(codec, '')
+
+def split_codec(key):
+    """
+    Split the codec suffix off an object key.
+
+    Returns:
+        tuple: `(key without the codec suffix, codec)`, e.g. `('raw/a.jsonl', 'gzip')` for 'raw/a.jsonl.gz'.
+    """
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if key.endswith(suffix):
+            return key[:-len(suffix)], codec
+    return key, 'none'
+
+def codec_suffixes(suffixes):
+    """
+    Extend key suffixes with their compressed variants, for listings filtered by suffix.
+
+    Args:
+        suffixes (str or tuple): Suffixes of the uncompressed objects, e.g. ('.json', '.jsonl').
+
+    Returns:
+        tuple: The suffixes followed by each of them with every codec suffix.
+    """
+    suffixes = (suffixes,) if isinstance(suffixes, str) else tuple(suffixes)
+    return suffixes + tuple(suffix + codec for suffix in suffixes for codec in CODEC_SUFFIXES.values())
+
+def object_stem(key):
+    """
+    File name of an object without its codec suffix nor its extension, e.g. 'a' for 'raw/a.jsonl.zst'.
+    """
+    return os.path.splitext(os.path.basename(split_codec(key)[0]))[0]
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Writable stream keeping what is written until it is drained; closing it keeps the data.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+class Compressor:
+    """
+    Incremental compressor producing one gzip member or one zstd frame.
+
+    gzip output comes from zlib with an empty header (mtime 0, no file name), so the same
+    content always compresses to the same bytes; zstd goes through pyarrow's codec, at its
+    default level.
+
+    Args:
+        codec (str): One of `COMPRESSION_CODECS`.
+    """
+
+    def __init__(self, codec='none'):
+        codec_suffix(codec)
+        self.codec = codec
+        self._stream = self._sink = None
+        if codec == 'gzip':
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif codec == 'zstd':
+            self._sink = _ChunkSink()
+            self._stream = pa.CompressedOutputStream(self._sink, 'zstd')
+
+    def compress(self, data):
+        """
+        Feed `data` and return the compressed bytes available so far (possibly none).
+        """
+        if self.codec == 'gzip':
+            return self._zlib.compress(data)
+        if self.codec == 'zstd':
+            self._stream.write(data)
+            return self._sink.drain()
+        return data
+
+    def flush(self):
+        """
+        End the stream and return the remaining compressed bytes.
+        """
+        if self.codec == 'gzip':
+            return self._zlib.flush()
+        if self.codec == 'zstd':
+            self._stream.close()
+            return self._sink.drain()
+        return b''
+
+def compress_bytes(data, codec='none'):
+    """
+    Compress `data` in one go, with the same output as a `Compressor`.
+    """
+    compressor = Compressor(codec)
+    return compressor.compress(data) + compressor.flush()
+
+def open_decompressed(fileobj, codec='none'):
+    """
+    Wrap a binary stream, e.g. a `get_object` body, so reads return the decompressed bytes.
+    The stream is decompressed while it is read, without downloading it first.
+    """
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if codec == 'zstd':
+        # Buffered, so the body can be read line by line like a gzip one
+        return io.BufferedReader(pa.CompressedInputStream(fileobj, 'zstd'))
+    codec_suffix(codec)
+    return fileobj
+
+def decompress_bytes(data, codec='none'):
+    """
+    Decompress the content of an object.
+    """
+    if codec == 'none':
+        return data
+    return open_decompressed(io.BytesIO(data), codec).read()
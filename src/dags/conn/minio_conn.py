@@ -1,8 +1,42 @@
+import os
+import threading
 import boto3
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, ClientError
 
+# Sized for the concurrent stages sharing one client (downloads, uploads and multipart transfers)
+DEFAULT_MAX_POOL_CONNECTIONS = 50
 
-def get_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1"):
+_client_cache = {}
+_client_cache_lock = threading.Lock()
+
+
+def build_client_config(max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, tcp_keepalive=True, connect_timeout=5,
+                        read_timeout=60, retry_mode="adaptive", max_attempts=5):
+    """
+    Build the botocore settings of the MinIO clients.
+
+    Args:
+        max_pool_connections (int): Size of the HTTP connection pool (botocore default: 10).
+        tcp_keepalive (bool): Enable TCP keep-alive on the pooled connections.
+        connect_timeout (float): Seconds to wait for a connection.
+        read_timeout (float): Seconds to wait for data on an open connection.
+        retry_mode (str): botocore retry mode, "adaptive" also rate-limits the client when throttled.
+        max_attempts (int): Maximum attempts per request, including the first one.
+
+    Returns:
+        botocore.config.Config: The client settings.
+    """
+    return Config(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        retries={"mode": retry_mode, "max_attempts": max_attempts},
+    )
+
+
+def get_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1", config=None):
     """
     Initialize and return a boto3 client for MinIO.
 
@@ -11,6 +45,7 @@ def get_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1"):
         access_key (str): Access key for MinIO.
         secret_key (str): Secret key for MinIO.
         region_name (str): AWS region name (default: "us-east-1").
+        config (botocore.config.Config): Optional client settings, e.g. from `build_client_config`.
 
     Returns:
         boto3.client: Boto3 client for MinIO.
@@ -26,13 +61,15 @@ def get_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1"):
     if not secret_key:
         raise ValueError("The 'secret_key' parameter is required and cannot be empty.")
 
+    kwargs = {'config': config} if config is not None else {}
     try:
         client = boto3.client(
             's3',
             endpoint_url=endpoint,
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            region_name=region_name
+            region_name=region_name,
+            **kwargs
         )
         print("Successfully initialized boto3 client for MinIO.")
         return client
@@ -41,4 +78,66 @@ def get_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1"):
         raise ValueError("Missing credentials for MinIO.")
     except ClientError as e:
         print(f"Client error occurred: {e}")
-        raise ValueError(f"Client error: {e}")
\ No newline at end of file
+        raise ValueError(f"Client error: {e}")
+
+
+def get_cached_boto3_client(endpoint, access_key, secret_key, region_name="us-east-1", **settings):
+    """
+    Return a pooled boto3 client for MinIO, created once per process and connection settings.
+
+    boto3 clients are thread-safe, so the concurrent stages of a task share the
+    client and its connection pool instead of each paying for a new session,
+    endpoint resolution and service model load. The process id is part of the
+    cache key, so forked workers never reuse the connections of their parent.
+
+    Args:
+        endpoint (str): MinIO server endpoint.
+        access_key (str): Access key for MinIO.
+        secret_key (str): Secret key for MinIO.
+        region_name (str): AWS region name (default: "us-east-1").
+        **settings: Keyword arguments of `build_client_config` (max_pool_connections, tcp_keepalive,
+            connect_timeout, read_timeout, retry_mode, max_attempts).
+
+    Returns:
+        boto3.client: Boto3 client for MinIO.
+    """
+    cache_key = (os.getpid(), endpoint, access_key, secret_key, region_name, tuple(sorted(settings.items())))
+    with _client_cache_lock:
+        client = _client_cache.get(cache_key)
+        if client is None:
+            client = get_boto3_client(endpoint, access_key, secret_key, region_name, config=build_client_config(**settings))
+            _client_cache[cache_key] = client
+        return client
+
+def get_arrow_filesystem(endpoint, access_key, secret_key, region_name="us-east-1"):
+    """
+    Initialize and return a pyarrow S3 filesystem for MinIO, used to read and write
+    Parquet datasets directly in the bucket (paths are `<bucket>/<key>`).
+
+    Args:
+        endpoint (str): MinIO server endpoint, e.g. "http://minio:9000".
+        access_key (str): Access key for MinIO.
+        secret_key (str): Secret key for MinIO.
+        region_name (str): AWS region name (default: "us-east-1").
+
+    Returns:
+        pyarrow.fs.S3FileSystem: Filesystem for MinIO.
+
+    Raises:
+        ValueError: If credentials or endpoint are invalid.
+    """
+    from pyarrow import fs
+
+    if not endpoint:
+        raise ValueError("The 'endpoint' parameter is required and cannot be empty.")
+    if not access_key or not secret_key:
+        raise ValueError("The 'access_key' and 'secret_key' parameters are required and cannot be empty.")
+
+    scheme, _, address = endpoint.rpartition("://")
+    return fs.S3FileSystem(
+        access_key=access_key,
+        secret_key=secret_key,
+        region=region_name,
+        endpoint_override=address,
+        scheme=scheme or "https",
+    )
@@ -0,0 +1,314 @@
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+DEFAULT_TAIL_SIZE = 64 * 1024
+
+def _ordered_map(func, items, max_workers):
+    """
+    Apply `func` to `items` in a thread pool and yield `(item, result)` in input order,
+    keeping at most `2 * max_workers` items in flight so memory stays bounded.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            for item in items:
+                pending.append((item, executor.submit(func, item)))
+                return
+
+        for _ in range(2 * max_workers):
+            submit_next()
+
+        while pending:
+            item, future = pending.popleft()
+            result = future.result()
+            submit_next()
+            yield item, result
+
+def build_transfer_config(multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024, max_concurrency=10,
+                          use_threads=True):
+    """
+    Build the managed transfer settings of `upload_file` and `upload_fileobj`.
+
+    Args:
+        multipart_threshold (int): Objects from this size on are uploaded in parts (boto3 default: 8 MiB).
+        multipart_chunksize (int): Size of each part (boto3 default: 8 MiB, S3 minimum: 5 MiB).
+        max_concurrency (int): Parts uploaded at the same time (boto3 default: 10).
+        use_threads (bool): Upload parts from a thread pool; False uploads them one by one.
+
+    Returns:
+        boto3.s3.transfer.TransferConfig: The transfer settings.
+    """
+    return TransferConfig(
+        multipart_threshold=multipart_threshold,
+        multipart_chunksize=multipart_chunksize,
+        max_concurrency=max_concurrency,
+        use_threads=use_threads,
+    )
+
+def transfer_kwargs(transfer_config=None):
+    """
+    Return the extra keyword arguments of `upload_file`/`upload_fileobj` for the given settings.
+
+    Transfer settings are passed around as a dict of `build_transfer_config` arguments,
+    which, unlike `TransferConfig`, can be sent to worker processes.
+
+    Args:
+        transfer_config (dict): Keyword arguments of `build_transfer_config`; None keeps boto3's defaults.
+
+    Returns:
+        dict: `{'Config': TransferConfig}`, or an empty dict.
+    """
+    if transfer_config is None:
+        return {}
+    return {'Config': build_transfer_config(**transfer_config)}
+
+def iter_objects(client, bucket_name, prefix, suffix=None):
+    """
+    List every object under a prefix, following `ContinuationToken` past the 1000-key pages.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        prefix (str): Prefix to list.
+        suffix (str or tuple): Only yield objects whose key ends with this suffix.
+
+    Yields:
+        dict: The listing entry of each object (`Key`, `ETag`, `Size`, ...).
+    """
+    kwargs = {'Bucket': bucket_name, 'Prefix': prefix}
+    while True:
+        response = client.list_objects_v2(**kwargs)
+        for obj in response.get('Contents', []):
+            if suffix is None or obj['Key'].endswith(suffix):
+                yield obj
+        if not response.get('IsTruncated'):
+            break
+        kwargs['ContinuationToken'] = response['NextContinuationToken']
+
+def iter_keys(client, bucket_name, prefix, suffix=None):
+    """
+    List every object key under a prefix, across all listing pages.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        prefix (str): Prefix to list.
+        suffix (str or tuple): Only yield keys ending with this suffix.
+
+    Yields:
+        str: Object keys, in listing order.
+    """
+    for obj in iter_objects(client, bucket_name, prefix, suffix):
+        yield obj['Key']
+
+def object_missing(error):
+    """
+    Whether a `ClientError` means that the requested object does not exist.
+
+    Args:
+        error (botocore.exceptions.ClientError): Error raised by a GET or HEAD request.
+
+    Returns:
+        bool: True for `NoSuchKey` (GET) and `404` / `NotFound` (HEAD) errors.
+    """
+    return error.response['Error']['Code'] in ('NoSuchKey', '404', 'NotFound')
+
+def delete_keys(client, bucket_name, keys):
+    """
+    Delete objects with batched `delete_objects` requests of up to 1000 keys.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        keys (list): Keys to delete.
+
+    Returns:
+        int: Number of deleted keys.
+
+    Raises:
+        RuntimeError: When S3 reports keys it could not delete, listed with their error codes,
+            so stale objects are never left behind silently.
+    """
+    keys = list(keys)
+    errors = []
+    for start in range(0, len(keys), 1000):
+        response = client.delete_objects(Bucket=bucket_name, Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]]})
+        # A 200 answer still lists the keys that failed, one by one
+        errors += response.get('Errors', [])
+    if errors:
+        failed = [f"{error.get('Key')} ({error.get('Code')})" for error in errors]
+        raise RuntimeError(f"{len(errors)} of {len(keys)} objects could not be deleted from {bucket_name}: {failed}")
+    return len(keys)
+
+def read_object(client, bucket_name, key):
+    """
+    Download the whole content of an object.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        key (str): Object key.
+
+    Returns:
+        bytes: The object content.
+    """
+    return client.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+
+def fetch_objects(client, bucket_name, keys, max_workers=8, as_file=False):
+    """
+    Download many objects concurrently and yield them in the order of `keys`.
+
+    boto3 clients are thread-safe, so a single client is shared by the pool. At most
+    `2 * max_workers` objects are downloading or waiting to be consumed, which bounds
+    memory to a few objects regardless of how many keys are given.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        keys (iterable): Keys of the objects to download.
+        max_workers (int): Number of concurrent downloads.
+        as_file (bool): Yield `io.BytesIO` objects instead of bytes.
+
+    Yields:
+        tuple: `(key, content)` for every key.
+    """
+    for key, content in _ordered_map(lambda key: read_object(client, bucket_name, key), keys, max_workers):
+        yield key, io.BytesIO(content) if as_file else content
+
+def upload_objects(client, bucket_name, objects, max_workers=8, transfer_config=None):
+    """
+    Upload many in-memory objects concurrently.
+
+    `objects` is consumed lazily, so the caller can serialise the next objects
+    while the previous ones upload; at most `2 * max_workers` are held at once.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        objects (iterable): `(key, file-like)` pairs, e.g. `io.BytesIO` buffers.
+        max_workers (int): Number of concurrent uploads.
+        transfer_config (dict): Multipart settings, see `build_transfer_config`.
+
+    Returns:
+        list: The uploaded keys, in input order.
+    """
+    extra = transfer_kwargs(transfer_config)
+
+    def upload(item):
+        key, fileobj = item
+        fileobj.seek(0)
+        client.upload_fileobj(fileobj, bucket_name, key, **extra)
+
+    return [key for (key, _), _ in _ordered_map(upload, objects, max_workers)]
+
+class RangeReader(io.RawIOBase):
+    """
+    Seekable, read-only file over an object that fetches only the byte ranges that are read.
+
+    The first access fetches the last `tail_size` bytes with a suffix range request,
+    which also reveals the object size. For Parquet this tail holds the footer, so
+    reading the metadata costs one request and the column chunks are then fetched
+    with `Range` requests; objects smaller than the tail are fetched whole at once.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        key (str): Object key.
+        tail_size (int): Bytes fetched from the end of the object on first access.
+
+    Attributes:
+        bytes_fetched (int): Bytes downloaded so far.
+        requests (int): Number of GET requests made so far.
+    """
+
+    def __init__(self, client, bucket_name, key, tail_size=DEFAULT_TAIL_SIZE):
+        super().__init__()
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.tail_size = tail_size
+        self.size = None
+        self.bytes_fetched = 0
+        self.requests = 0
+        self._position = 0
+        self._tail = b''
+        self._tail_start = 0
+
+    def _get(self, byte_range):
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=self.key, Range=byte_range)
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidRange':
+                raise
+            return None, b''  # empty object
+        data = response['Body'].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        return response, data
+
+    def _load_tail(self):
+        if self.size is not None:
+            return
+        response, data = self._get(f'bytes=-{self.tail_size}')
+        if response is not None and 'ContentRange' in response:
+            self.size = int(response['ContentRange'].rsplit('/', 1)[1])
+        else:
+            # The range was not applied, so the body is the whole object
+            self.size = len(data)
+        self._tail = data
+        self._tail_start = self.size - len(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._load_tail()
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._position
+
+    def readinto(self, buffer):
+        self._load_tail()
+        length = min(len(buffer), self.size - self._position)
+        if length <= 0:
+            return 0
+        start, end = self._position, self._position + length
+        if start >= self._tail_start:
+            data = self._tail[start - self._tail_start:end - self._tail_start]
+        else:
+            _, data = self._get(f'bytes={start}-{end - 1}')
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+def open_object(client, bucket_name, key, tail_size=DEFAULT_TAIL_SIZE):
+    """
+    Open an object as a seekable file that downloads only the ranges that are read.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        key (str): Object key.
+        tail_size (int): Bytes fetched from the end of the object on first access.
+
+    Returns:
+        RangeReader: The file-like object.
+    """
+    return RangeReader(client, bucket_name, key, tail_size=tail_size)
@@ -0,0 +1,97 @@
+import json
+import re
+from botocore.exceptions import ClientError
+from ..conn.object_store import iter_keys, delete_keys, object_missing
+from ..conn.compression import codec_suffix, compress_bytes, decompress_bytes
+
+CHECKPOINT_PREFIX = 'bronze_layer/_checkpoints'
+PAGE_KEY_PATTERN = re.compile(r'page-(\d+)\.jsonl')
+
+class PageCheckpoints:
+    """
+    Pages of one extraction run persisted to the bucket as they are fetched, so a retried
+    task only requests the pages that are still missing.
+
+    Each page is stored as `<prefix>/<run_id>/page-NNNNN.jsonl` (plus the codec suffix),
+    next to `_meta.json`, which keeps the catalogue size the page numbers were computed
+    from: a resumed run keeps the same pages even if the catalogue grew in between.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        run_id (str): Airflow run id (or any id shared by the tries of one run).
+        bucket_name (str): MinIO bucket name.
+        prefix (str): Root prefix of the checkpoints.
+        codec (str): Compression of the pages, 'none', 'gzip' or 'zstd'.
+    """
+
+    def __init__(self, client, run_id, bucket_name='datalake-case', prefix=CHECKPOINT_PREFIX, codec='gzip'):
+        self.client = client
+        self.bucket_name = bucket_name
+        # Run ids hold characters such as ':' and '+' that are awkward in keys
+        self.run_prefix = f"{prefix}/{re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)}/"
+        self.codec = codec
+        self._suffix = codec_suffix(codec)
+
+    def page_key(self, page):
+        return f"{self.run_prefix}page-{page:05d}.jsonl{self._suffix}"
+
+    def load_total(self, per_page):
+        """
+        Catalogue size recorded by a previous try of the run, or None when there is none
+        or it was fetched with another page size.
+        """
+        try:
+            meta = json.loads(self.client.get_object(Bucket=self.bucket_name, Key=f"{self.run_prefix}_meta.json")['Body'].read())
+        except ClientError as e:
+            if object_missing(e):
+                return None
+            raise
+        return meta['total'] if meta['per_page'] == per_page else None
+
+    def reset(self, total, per_page):
+        """
+        Start the checkpoints of the run over: drop pages left with another page size and
+        record the catalogue size the page numbers are computed from.
+        """
+        self.clear()
+        body = json.dumps({'total': total, 'per_page': per_page}).encode('utf-8')
+        self.client.put_object(Bucket=self.bucket_name, Key=f"{self.run_prefix}_meta.json", Body=body, ContentType='application/json')
+
+    def completed_pages(self):
+        """
+        Page numbers already checkpointed by the run, with this codec.
+        """
+        pages = set()
+        for key in iter_keys(self.client, self.bucket_name, self.run_prefix, suffix=f'.jsonl{self._suffix}'):
+            match = PAGE_KEY_PATTERN.fullmatch(key[len(self.run_prefix):len(key) - len(self._suffix)])
+            if match:
+                pages.add(int(match.group(1)))
+        return pages
+
+    def save(self, page, breweries):
+        """
+        Persist a fetched page.
+        """
+        body = b''.join(json.dumps(brewery).encode('utf-8') + b'\n' for brewery in breweries)
+        self.client.put_object(Bucket=self.bucket_name, Key=self.page_key(page), Body=compress_bytes(body, self.codec))
+
+    def load(self, page):
+        """
+        Read a checkpointed page back.
+
+        Returns:
+            list: The breweries of the page.
+        """
+        body = self.client.get_object(Bucket=self.bucket_name, Key=self.page_key(page))['Body'].read()
+        return [json.loads(line) for line in decompress_bytes(body, self.codec).splitlines() if line.strip()]
+
+    def clear(self):
+        """
+        Delete every checkpoint of the run, once its pages are committed to the bronze layer.
+
+        Returns:
+            int: Number of deleted objects.
+        """
+        count = delete_keys(self.client, self.bucket_name, iter_keys(self.client, self.bucket_name, self.run_prefix))
+        print(f"{count} checkpoint objects removed from {self.bucket_name}/{self.run_prefix}.")
+        return count
@@ -1,23 +1,214 @@
-import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import requests
+from .http_client import ApiClient, ConditionalCache
+from .telemetry import traced_stage, record_stage
 
-def fetch_breweries(per_page=200):
+BREWERIES_URL = "https://api.openbrewerydb.org/v1/breweries"
+MAX_PER_PAGE = 200
+
+@traced_stage('extract')
+def fetch_breweries(per_page=200, client=None, timeout=30):
     """
     Fetch breweries data from the Open Brewery API.
 
     Args:
         per_page (int): Number of breweries per page. Default is 200.
+        client (ApiClient): Optional API client; one is created when omitted.
+        timeout (float): Request timeout in seconds.
 
     Returns:
         list: A list of brewery data.
     """
-    url = f"https://api.openbrewerydb.org/v1/breweries?per_page={per_page}"
+    own_client = client is None
+    if own_client:
+        client = ApiClient(pool_size=1, timeout=timeout)
 
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx and 5xx)
-        breweries = response.json()
+        breweries = client.get_json(BREWERIES_URL, params={"per_page": per_page}, timeout=timeout)
+        record_stage(rows_out=len(breweries))
         return breweries
     except requests.exceptions.RequestException as e:
         print(f"An error occurred: {e}")
-        raise
\ No newline at end of file
+        raise
+    finally:
+        if own_client:
+            client.close()
+
+def record_api_stats(client):
+    """
+    Add the counters of an `ApiClient` to the running stages: the response bodies as bytes
+    read, and the requests, 304s and throttled retries. Called once the pages are consumed,
+    so the stages fed by the pages, e.g. the bronze writer, do not count them.
+
+    Args:
+        client (ApiClient): Client of the extraction.
+    """
+    record_stage(bytes_read=client.stats['bytes'], api_requests=client.stats['requests'],
+                 api_not_modified=client.stats['not_modified'], api_retries=client.stats['retries'])
+
+def fetch_breweries_metadata(client, base_url=BREWERIES_URL, timeout=30):
+    """
+    Fetch the catalogue size from the API's `/breweries/meta` endpoint.
+
+    Args:
+        client (ApiClient): Client used for the request.
+        base_url (str): Breweries endpoint of the API.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        int: Total number of breweries in the catalogue.
+    """
+    # The API returns the counters as strings, e.g. {"total": "8355", ...}
+    return int(client.get_json(f"{base_url}/meta", timeout=timeout)["total"])
+
+def fetch_page(client, page, per_page=MAX_PER_PAGE, base_url=BREWERIES_URL, timeout=30, cache=None):
+    """
+    Fetch a single page of breweries.
+
+    With a `ConditionalCache`, the request carries the validators of the previous run and
+    a 304 is answered with the records read back from the bronze snapshot; when they are
+    no longer there as they were fetched, the page is requested again without validators.
+
+    Args:
+        client (ApiClient): Client used for the request.
+        page (int): Page number, starting at 1.
+        per_page (int): Number of breweries per page.
+        base_url (str): Breweries endpoint of the API.
+        timeout (float): Request timeout in seconds.
+        cache (ConditionalCache): Optional cache of the page validators.
+
+    Returns:
+        list: The breweries of the requested page.
+    """
+    params = {"page": page, "per_page": per_page}
+    if cache is None:
+        return client.get_json(base_url, params=params, timeout=timeout)
+
+    key = ConditionalCache.key(base_url, params)
+    response = client.get(base_url, params=params, timeout=timeout, headers=cache.validators(key))
+    if response.status_code == 304:
+        breweries = cache.body(key)
+        if breweries is not None:
+            return breweries
+        print(f"{base_url} page {page} was not modified but its records are no longer in bronze, requesting it again.")
+        cache.forget(key)
+        response = client.get(base_url, params=params, timeout=timeout)
+    breweries = response.json()
+    # Pages are written to bronze back to back, so page p starts at record (p - 1) * per_page
+    cache.store(key, response.headers, breweries, (page - 1) * per_page)
+    return breweries
+
+def iter_brewery_pages(per_page=MAX_PER_PAGE, max_workers=8, base_url=BREWERIES_URL, session=None, timeout=30, checkpoints=None,
+                       cache=None):
+    """
+    Fetch every page of the catalogue concurrently and yield them in page order.
+
+    The total is read from `/breweries/meta`, then the pages are requested by a
+    bounded thread pool sharing one `ApiClient` (keep-alive session, rate limit,
+    `Retry-After` handling and conditional requests). At most `2 * max_workers`
+    pages are in flight or waiting to be consumed, so memory stays bounded even
+    when the consumer is slower than the API.
+
+    With `checkpoints`, every fetched page is persisted as soon as it arrives, and
+    the pages a previous try of the run already persisted are read back from the
+    bucket instead of being requested again, so a retry resumes at the first
+    missing page.
+
+    With `cache`, page requests are conditional (see `fetch_page`); the entries of the
+    pages restored from checkpoints are kept while they still match their records.
+
+    Args:
+        per_page (int): Number of breweries per page (the API caps it at 200).
+        max_workers (int): Number of concurrent requests.
+        base_url (str): Breweries endpoint of the API.
+        session (requests.Session or ApiClient): Optional session or client; a client is created when omitted.
+        timeout (float): Request timeout in seconds.
+        checkpoints (PageCheckpoints): Optional page checkpoints of the run.
+        cache (ConditionalCache): Optional cache of the page validators, saved by the caller once bronze is written.
+
+    Yields:
+        tuple: `(page_number, breweries)` for every page, in ascending page order.
+    """
+    if per_page < 1 or per_page > MAX_PER_PAGE:
+        raise ValueError(f"per_page must be between 1 and {MAX_PER_PAGE}, got {per_page}.")
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}.")
+
+    client = session if isinstance(session, ApiClient) else ApiClient(session=session, pool_size=max_workers, timeout=timeout)
+
+    try:
+        total = checkpoints.load_total(per_page) if checkpoints is not None else None
+        if total is None:
+            total = fetch_breweries_metadata(client, base_url=base_url, timeout=timeout)
+            if checkpoints is not None:
+                checkpoints.reset(total, per_page)
+        page_count = math.ceil(total / per_page)
+        restored = checkpoints.completed_pages() if checkpoints is not None else set()
+        print(f"Fetching {total} breweries in {page_count} pages with {max_workers} workers "
+              f"({len(restored & set(range(1, page_count + 1)))} pages restored from checkpoints).")
+
+        def get_page(page):
+            if page in restored:
+                breweries = checkpoints.load(page)
+                if cache is not None:
+                    cache.keep(ConditionalCache.key(base_url, {"page": page, "per_page": per_page}), breweries)
+                return breweries
+            breweries = fetch_page(client, page, per_page, base_url, timeout, cache)
+            if checkpoints is not None:
+                checkpoints.save(page, breweries)
+            return breweries
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            pages = iter(range(1, page_count + 1))
+
+            def submit_next():
+                page = next(pages, None)
+                if page is not None:
+                    pending.append((page, executor.submit(get_page, page)))
+
+            for _ in range(2 * max_workers):
+                submit_next()
+
+            while pending:
+                page, future = pending.popleft()
+                breweries = future.result()
+                submit_next()
+                yield page, breweries
+        print(f"{client.stats['requests']} API requests, {client.stats['not_modified']} not modified, "
+              f"{client.stats['retries']} retried.")
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred: {e}")
+        raise
+    finally:
+        if client is not session:
+            client.close()
+
+@traced_stage('extract')
+def fetch_all_breweries(per_page=MAX_PER_PAGE, max_workers=8, base_url=BREWERIES_URL, session=None, timeout=30):
+    """
+    Fetch the whole brewery catalogue using concurrent paginated requests.
+
+    Args:
+        per_page (int): Number of breweries per page (the API caps it at 200).
+        max_workers (int): Number of concurrent requests.
+        base_url (str): Breweries endpoint of the API.
+        session (requests.Session or ApiClient): Optional session or client; a client is created when omitted.
+        timeout (float): Request timeout in seconds.
+
+    Returns:
+        list: Every brewery of the catalogue, in API order.
+    """
+    client = session if isinstance(session, ApiClient) else ApiClient(session=session, pool_size=max_workers, timeout=timeout)
+    breweries = []
+    try:
+        for _, page in iter_brewery_pages(per_page, max_workers, base_url, client, timeout):
+            breweries.extend(page)
+    finally:
+        if client is not session:
+            client.close()
+    record_stage(rows_out=len(breweries))
+    record_api_stats(client)
+    return breweries
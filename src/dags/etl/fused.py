@@ -0,0 +1,121 @@
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+from ..conn.object_store import iter_keys, fetch_objects, upload_objects
+from ..conn.compression import codec_suffix, compress_bytes, object_stem
+from .transform import CLEAN_ENGINES, RAW_SUFFIXES, load_records, clean_dataframe, read_raw_table, clean_table
+from .silver_dataset import remove_other_layout
+from .silver_manifest import partition_hash, load_silver_manifest, diff_partitions, apply_partition_changes
+from .telemetry import traced_stage, record_stage
+
+def clean_raw_object(content, file_key, engine='python', serialize=False, codec='none'):
+    """
+    Clean the content of one raw object in memory.
+
+    Args:
+        content (bytes): Content of the raw object.
+        file_key (str): Key of the object; `.jsonl` objects are read as newline-delimited JSON.
+        engine (str): Cleaning engine, see `clean_data`.
+        serialize (bool): Also serialise the cleaned records the way `clean_data` stores them:
+            a JSON array for the pandas engines, Parquet for 'arrow'.
+        codec (str): Compression of the serialised records, see `clean_data`.
+
+    Returns:
+        tuple: `(cleaned DataFrame, (file name, bytes))`, the second item being None unless `serialize` is set.
+    """
+    stem = object_stem(file_key)
+    if engine == 'arrow':
+        table = clean_table(read_raw_table(content, file_key))
+        cleaned = None
+        if serialize:
+            buffer = io.BytesIO()
+            pq.write_table(table, buffer, **({} if codec == 'none' else {'compression': codec}))
+            cleaned = (f'{stem}.parquet', buffer.getvalue())
+        return table.to_pandas(), cleaned
+
+    df = clean_dataframe(pd.json_normalize(load_records(io.BytesIO(content), file_key)), engine=engine)
+    cleaned = (f'{stem}.json{codec_suffix(codec)}', compress_bytes(df.to_json(orient='records').encode('utf-8'), codec)) if serialize else None
+    return df, cleaned
+
+@traced_stage('clean_silver')
+def clean_to_silver(client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw', silver_dir='silver_layer/', keys=None, engine='python',
+                    cleaned_dir=None, max_workers=8, use_manifest=False, transfer_config=None, codec='none'):
+    """
+    Clean the raw objects and write the silver partitions in one pass, without the cleaned layer round trip.
+
+    `clean_data` followed by `create_silver_layer` serialises every cleaned object, uploads it,
+    downloads it again and parses it back. Here the raw objects are downloaded concurrently,
+    cleaned in memory and partitioned by state straight away; the partitions are serialised
+    to in-memory Parquet buffers and uploaded concurrently. The partitions are the same as
+    the ones of the two separate steps with the 'pandas' writer, so both modes can share a manifest.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        raw_prefix (str): Prefix of the raw layer folder in the bucket.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        keys (list): Raw object keys to clean. When omitted, every object under `raw_prefix` is cleaned.
+        engine (str): Cleaning engine, see `clean_data`.
+        cleaned_dir (str): When set, also upload the cleaned objects under this prefix, as `clean_data` does.
+        max_workers (int): Number of objects downloaded and uploaded concurrently.
+        use_manifest (bool): Rewrite only the partitions whose hash changed, see `create_silver_layer`.
+        transfer_config (dict): Multipart settings of the uploads, see `build_transfer_config`.
+        codec (str): Compression of the cleaned side output, see `clean_data`.
+
+    Returns:
+        list: The states whose partitions were rewritten or removed.
+    """
+    if engine not in CLEAN_ENGINES:
+        raise ValueError(f"Unknown cleaning engine '{engine}', expected one of {CLEAN_ENGINES}.")
+
+    try:
+        if keys is None:
+            keys = list(iter_keys(client, bucket_name, raw_prefix))
+            if not keys:
+                raise ValueError(f"No files found in the raw layer: {raw_prefix}")
+        keys = [file_key for file_key in keys if file_key.endswith(RAW_SUFFIXES)]
+
+        df_list, cleaned_objects = [], []
+        for file_key, content in fetch_objects(client, bucket_name, keys, max_workers=max_workers):
+            df, cleaned = clean_raw_object(content, file_key, engine, serialize=cleaned_dir is not None, codec=codec)
+            if len(df) and 'state' not in df.columns:
+                raise ValueError(f"'state' column is missing in the file: {file_key}")
+            df_list.append(df)
+            if cleaned is not None:
+                cleaned_objects.append((f'{cleaned_dir}/{cleaned[0]}', io.BytesIO(cleaned[1])))
+        if not df_list:
+            raise ValueError(f"No raw objects found under {bucket_name}/{raw_prefix}")
+
+        if cleaned_objects:
+            # Optional side output, for consumers of the cleaned layer
+            uploaded = upload_objects(client, bucket_name, cleaned_objects, max_workers=max_workers, transfer_config=transfer_config)
+            print(f"{len(uploaded)} cleaned objects uploaded to {bucket_name}/{cleaned_dir}/.")
+
+        final_df = pd.concat(df_list, ignore_index=True)
+        record_stage(rows_in=len(final_df))
+
+        partitions = {state: partition_df for state, partition_df in final_df.groupby('state')} if len(final_df) else {}
+        if use_manifest:
+            manifest = load_silver_manifest(client, bucket_name, silver_dir)
+            partition_stats = {state: {'hash': partition_hash(partition_df), 'rows': len(partition_df)} for state, partition_df in partitions.items()}
+            changed_states, removed_states = diff_partitions(manifest, partition_stats)
+        else:
+            changed_states, removed_states = sorted(partitions), []
+
+        def partition_buffers():
+            for state in changed_states:
+                buffer = io.BytesIO()
+                partitions[state].to_parquet(buffer, index=False)
+                yield f"{silver_dir}{state}/breweries_{state}.parquet", buffer
+
+        uploaded = upload_objects(client, bucket_name, partition_buffers(), max_workers=max_workers, transfer_config=transfer_config)
+        remove_other_layout(client, changed_states, False, bucket_name, silver_dir)
+        record_stage(rows_out=sum(len(partitions[state]) for state in changed_states))
+        print(f"{len(final_df)} rows of {len(keys)} raw objects cleaned; {len(uploaded)} of {len(partitions)} partitions uploaded to {bucket_name}/{silver_dir}.")
+
+        if use_manifest:
+            apply_partition_changes(client, manifest, partition_stats, changed_states, removed_states, bucket_name, silver_dir)
+        return changed_states + removed_states
+    except Exception as e:
+        print(f"Error in fused clean and silver processing: {e}")
+        raise
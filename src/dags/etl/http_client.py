@@ -0,0 +1,355 @@
+import hashlib
+import itertools
+import json
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from botocore.exceptions import ClientError
+from ..conn.object_store import object_missing
+from ..conn.compression import compress_bytes, decompress_bytes, open_decompressed, split_codec
+
+HTTP_CACHE_KEY = 'bronze_layer/_state/http_cache.json.gz'
+# Statuses answered by waiting: rate limiting and transient gateway errors
+RETRY_STATUSES = (429, 502, 503, 504)
+
+def create_session(pool_size=8):
+    """
+    Create a requests Session whose connection pool is sized for concurrent page fetches.
+
+    Connection and read errors are retried by the adapter; error statuses are left to
+    `ApiClient`, which shares the wait between all the workers.
+
+    Args:
+        pool_size (int): Number of keep-alive connections kept open to the API host.
+
+    Returns:
+        requests.Session: Session shared by all the page requests of one extraction.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                          max_retries=Retry(connect=3, read=3, status=0, backoff_factor=0.5))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def retry_after_seconds(value, default):
+    """
+    Parse a `Retry-After` header, given either in seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value, or None when the response has none.
+        default (float): Delay used when the header is missing or unreadable.
+
+    Returns:
+        float: Seconds to wait, never negative.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class TokenBucket:
+    """
+    Token bucket shared by the threads of an extraction: each request takes a token, tokens
+    come back at `rate` per second up to `capacity`, and `pause` stops every thread until
+    the server's `Retry-After` has elapsed.
+
+    Args:
+        rate (float): Requests per second; None only honours pauses.
+        capacity (int): Burst size, defaults to one second of requests.
+        clock (callable): Monotonic clock, in seconds.
+        sleep (callable): Function used to wait.
+    """
+
+    def __init__(self, rate=None, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate or 1))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._resume_at = self._updated
+
+    def acquire(self):
+        """
+        Wait until a request may be sent.
+        """
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._resume_at:
+                    wait = self._resume_at - now
+                elif self.rate is None:
+                    return
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Hold every request back for `seconds`, then let a single request through before
+        tokens come back at the normal rate, so the server is not hit by a burst.
+        """
+        with self._lock:
+            self._resume_at = max(self._resume_at, self._clock() + seconds)
+            self._tokens = 1.0
+            self._updated = self._resume_at
+
+class ConditionalCache:
+    """
+    `ETag` and `Last-Modified` validators of the page responses, with the place of their
+    records in the bronze snapshot, so page requests can be made conditional and a
+    `304 Not Modified` answered by reading the page back from the previous bronze shards.
+
+    Only the validators, the record offset and count and a content hash are kept per page,
+    never the records themselves: memory does not grow with the catalogue and bronze is
+    not stored twice. A page that cannot be read back unchanged (shards rewritten with
+    another layout, or removed) is requested again without validators.
+
+    Only the entries used by the current run (pages fetched, answered by a 304 or restored
+    from a checkpoint, see `keep`) are saved back, so pages that disappeared from the
+    catalogue do not linger in the bucket.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO, used to read the bronze shards.
+        entries (dict): Maps request keys to `{'etag', 'last_modified', 'offset', 'count', 'hash'}`.
+        snapshot (dict): `{'keys', 'records_per_shard'}` of the bronze snapshot the offsets refer to.
+        bucket_name (str): MinIO bucket name.
+    """
+
+    def __init__(self, client, entries=None, snapshot=None, bucket_name='datalake-case'):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.snapshot = snapshot
+        self._entries = dict(entries or {})
+        self._used = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url, params=None):
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    @staticmethod
+    def records_hash(records):
+        return hashlib.blake2b(json.dumps(records, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+    def validators(self, key):
+        """
+        Conditional headers for a request, empty when the page is not in the bronze snapshot.
+        """
+        with self._lock:
+            entry = self._entries.get(key) if self.snapshot else None
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _read_snapshot(self, offset, count):
+        keys, records_per_shard = self.snapshot['keys'], self.snapshot['records_per_shard']
+        records = []
+        shard, skip = divmod(offset, records_per_shard)
+        while len(records) < count and shard < len(keys):
+            body = open_decompressed(self.client.get_object(Bucket=self.bucket_name, Key=keys[shard])['Body'], split_codec(keys[shard])[1])
+            lines = body.iter_lines() if hasattr(body, 'iter_lines') else body
+            # Stop at the last line of the page, so at most one page is held in memory
+            for line in itertools.islice(lines, skip, skip + count - len(records)):
+                records.append(json.loads(line))
+            shard, skip = shard + 1, 0
+        return records
+
+    def body(self, key):
+        """
+        Read the records of a page that was not modified back from the bronze snapshot.
+
+        Returns:
+            list: The records, or None when they are no longer in bronze as they were fetched.
+        """
+        with self._lock:
+            entry = self._entries[key]
+        try:
+            records = self._read_snapshot(entry['offset'], entry['count'])
+        except ClientError as e:
+            if not object_missing(e):
+                raise
+            return None
+        if self.records_hash(records) != entry['hash']:
+            return None
+        with self._lock:
+            self._used.add(key)
+        return records
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def keep(self, key, records):
+        """
+        Keep the entry of a page whose records did not come from the API this time, e.g. a page
+        restored from the checkpoint of a previous try, as long as it still validates these records.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['hash'] == self.records_hash(records):
+                self._used.add(key)
+            else:
+                self._entries.pop(key, None)
+
+    def store(self, key, headers, body, offset):
+        """
+        Keep the validators of a page response and where its records will be in bronze.
+        """
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        with self._lock:
+            self._used.add(key)
+            if etag or last_modified:
+                self._entries[key] = {'etag': etag, 'last_modified': last_modified, 'offset': offset, 'count': len(body),
+                                      'hash': self.records_hash(body)}
+            else:
+                self._entries.pop(key, None)
+
+    @classmethod
+    def load(cls, client, bucket_name='datalake-case', key=HTTP_CACHE_KEY):
+        """
+        Read the cache saved by a previous run, or start an empty one.
+        """
+        try:
+            body = client.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+        except ClientError as e:
+            if object_missing(e):
+                return cls(client, bucket_name=bucket_name)
+            raise
+        saved = json.loads(decompress_bytes(body, 'gzip'))
+        return cls(client, saved['entries'], saved['snapshot'], bucket_name)
+
+    def save(self, bronze_keys, records_per_shard, key=HTTP_CACHE_KEY):
+        """
+        Save the entries used by this run for the next one, with the layout of the bronze
+        snapshot the pages were just written to.
+
+        Args:
+            bronze_keys (list): Keys of the bronze shards, in record order.
+            records_per_shard (int): Records per shard, see `stream_bronze_shards`.
+            key (str): Key of the cache object.
+
+        Returns:
+            int: Number of saved entries.
+        """
+        with self._lock:
+            entries = {url: entry for url, entry in self._entries.items() if url in self._used}
+        saved = {'snapshot': {'keys': list(bronze_keys), 'records_per_shard': records_per_shard}, 'entries': entries}
+        self.client.put_object(Bucket=self.bucket_name, Key=key, Body=compress_bytes(json.dumps(saved).encode('utf-8'), 'gzip'),
+                               ContentType='application/json')
+        print(f"{len(entries)} HTTP cache entries saved to {self.bucket_name}/{key}.")
+        return len(entries)
+
+class ApiClient:
+    """
+    JSON client for the brewery API, shared by the threads of an extraction.
+
+    Requests go through one pooled session and a `TokenBucket`. A 429 or a transient
+    5xx pauses every thread for the `Retry-After` of the response (or an exponential
+    backoff) before the request is retried.
+
+    Args:
+        session (requests.Session): Optional session; one is created (and closed by `close`) when omitted.
+        pool_size (int): Keep-alive connections of the created session.
+        rate (float): Requests per second, None for no client-side limit.
+        burst (int): Requests that may be sent at once after an idle period.
+        max_retries (int): Retries of a throttled or failing request before its error is raised.
+        backoff (float): First backoff delay in seconds, doubled on every retry, when there is no `Retry-After`.
+        max_wait (float): Longest single wait: a farther `Retry-After` fails the task instead of stalling it, and backoffs are capped to it.
+        timeout (float): Request timeout in seconds.
+        bucket (TokenBucket): Optional token bucket, e.g. with a test clock.
+    """
+
+    def __init__(self, session=None, pool_size=8, rate=None, burst=None, max_retries=5, backoff=1.0, max_wait=120.0,
+                 timeout=30, bucket=None):
+        self._own_session = session is None
+        self.session = create_session(pool_size) if session is None else session
+        self.bucket = bucket or TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.stats = {'requests': 0, 'not_modified': 0, 'retries': 0, 'bytes': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        """
+        GET a resource, waiting out throttling and transient errors.
+
+        Args:
+            url (str): URL of the resource.
+            params (dict): Query parameters.
+            timeout (float): Request timeout in seconds, defaults to the client's.
+            headers (dict): Request headers, e.g. `If-None-Match` / `If-Modified-Since` validators.
+
+        Returns:
+            requests.Response: A successful response, or a 304 when the validators still match.
+
+        Raises:
+            requests.exceptions.HTTPError: When the response is an error once the retries are exhausted, the
+                server asks to wait longer than `max_wait`, or a 304 answers a request without validators.
+        """
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self._count('requests')
+            response = self.session.get(url, params=params, timeout=timeout or self.timeout, headers=headers or {})
+            self._count('bytes', len(response.content or b''))
+            if response.status_code == 304:
+                if not headers:
+                    raise requests.exceptions.HTTPError(f"{url} answered 304 Not Modified to a request without validators.",
+                                                        response=response)
+                self._count('not_modified')
+                return response
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After')
+                delay = retry_after_seconds(retry_after, self.backoff * 2 ** attempt)
+                if retry_after and delay > self.max_wait:
+                    raise requests.exceptions.HTTPError(f"{url} answered {response.status_code} with a Retry-After of {delay:.0f}s, "
+                                                        f"longer than the {self.max_wait:.0f}s the task may wait.", response=response)
+                # Only the backoff, which grows with every attempt, is capped
+                delay = min(self.max_wait, delay)
+                print(f"{url} answered {response.status_code}, retrying in {delay:.1f}s.")
+                self._count('retries')
+                self.bucket.pause(delay)
+                attempt += 1
+                continue
+            response.raise_for_status()
+            return response
+
+    def get_json(self, url, params=None, timeout=None):
+        """
+        GET a JSON resource, see `get`.
+
+        Returns:
+            The decoded body.
+        """
+        return self.get(url, params, timeout).json()
+
+    def close(self):
+        if self._own_session:
+            self.session.close()
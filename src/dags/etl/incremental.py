@@ -0,0 +1,203 @@
+import hashlib
+import json
+from botocore.exceptions import ClientError
+from ..conn.object_store import iter_keys, delete_keys, object_missing
+from ..conn.compression import codec_suffix, compress_bytes, decompress_bytes, open_decompressed, split_codec
+from .load import BronzeStreamWriter, DEFAULT_PART_SIZE
+from .snapshot import snapshot_id
+
+FINGERPRINT_INDEX_KEY = 'bronze_layer/_state/fingerprints.json.gz'
+# Indexes of deltas whose run has not published its gold layer yet, one per delta
+PENDING_INDEX_PREFIX = 'bronze_layer/_state/pending_fingerprints'
+
+def record_fingerprint(record):
+    """
+    Compute a compact content hash for a brewery record.
+
+    Args:
+        record (dict): Raw brewery record.
+
+    Returns:
+        str: 16 hex characters (64-bit BLAKE2b digest) identifying the record content.
+    """
+    payload = json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+def load_fingerprint_index(client, bucket_name='datalake-case', index_key=FINGERPRINT_INDEX_KEY):
+    """
+    Load the fingerprint index saved by the previous incremental run.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        index_key (str): Key of the gzip-compressed index object.
+
+    Returns:
+        dict: Maps brewery `id` to `[fingerprint, state]`; empty on the first run.
+    """
+    try:
+        file_obj = client.get_object(Bucket=bucket_name, Key=index_key)
+    except ClientError as e:
+        if object_missing(e):
+            print(f"No fingerprint index found at {index_key}, starting from scratch.")
+            return {}
+        raise
+    return json.loads(decompress_bytes(file_obj['Body'].read(), 'gzip'))
+
+def save_fingerprint_index(client, index, bucket_name='datalake-case', index_key=FINGERPRINT_INDEX_KEY):
+    """
+    Save the fingerprint index as gzip-compressed JSON.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        index (dict): Maps brewery `id` to `[fingerprint, state]`.
+        bucket_name (str): MinIO bucket name.
+        index_key (str): Key of the index object.
+    """
+    body = compress_bytes(json.dumps(index, separators=(',', ':')).encode('utf-8'), 'gzip')
+    client.put_object(Bucket=bucket_name, Key=index_key, Body=body)
+    print(f"Fingerprint index with {len(index)} records saved to {bucket_name}/{index_key}.")
+
+def pending_index_key(delta_key, pending_prefix=PENDING_INDEX_PREFIX):
+    """
+    Key the fingerprint index of a delta waits under until its run is published.
+
+    Args:
+        delta_key (str): Key of the bronze delta object.
+        pending_prefix (str): Prefix of the pending indexes in the bucket.
+
+    Returns:
+        str: `<pending_prefix>/<delta file stem>.json.gz`.
+    """
+    stem = split_codec(delta_key)[0].rsplit('/', 1)[-1]
+    return f"{pending_prefix}/{stem.rsplit('.', 1)[0]}.json.gz"
+
+def promote_fingerprint_index(client, delta_key, bucket_name='datalake-case', index_key=FINGERPRINT_INDEX_KEY,
+                              pending_prefix=PENDING_INDEX_PREFIX):
+    """
+    Make the pending index of a delta the one the next run diffs against, once every stage
+    of its run succeeded, and drop the pending indexes of earlier runs that never got there.
+
+    Until then the next run keeps diffing against the last published index, so the changes of
+    a run that failed after the extraction are part of the next delta instead of being lost.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        delta_key (str): Key of the bronze delta object of the run.
+        bucket_name (str): MinIO bucket name.
+        index_key (str): Key of the published index.
+        pending_prefix (str): Prefix of the pending indexes in the bucket.
+
+    Returns:
+        bool: False when there was no pending index, e.g. on a retry after the promotion.
+    """
+    pending_key = pending_index_key(delta_key, pending_prefix)
+    try:
+        body = client.get_object(Bucket=bucket_name, Key=pending_key)['Body'].read()
+    except ClientError as e:
+        if object_missing(e):
+            print(f"No pending fingerprint index at {pending_key}, nothing to promote.")
+            return False
+        raise
+    client.put_object(Bucket=bucket_name, Key=index_key, Body=body)
+    delete_keys(client, bucket_name, iter_keys(client, bucket_name, f"{pending_prefix}/"))
+    print(f"Fingerprint index {pending_key} promoted to {bucket_name}/{index_key}.")
+    return True
+
+def iter_delta_pages(pages, previous_index, current_index):
+    """
+    Compare extracted pages with the previous fingerprint index and yield only the changes.
+
+    New and changed records are yielded with `_deleted` set to False. Records that
+    disappeared from the source, and the old location of records that moved to
+    another state, are yielded as `{"id", "state", "_deleted": True}` markers so the
+    silver layer knows which partition to remove them from.
+
+    Args:
+        pages (iterable): Iterable of brewery lists.
+        previous_index (dict): Index of the previous run (`id` -> `[fingerprint, state]`).
+        current_index (dict): Filled with the index of this run while pages are consumed.
+
+    Yields:
+        list: Delta records, one list per input page plus a final list of deletions.
+    """
+    for page in pages:
+        delta = []
+        for record in page:
+            fingerprint = record_fingerprint(record)
+            state = record.get('state')
+            current_index[record['id']] = [fingerprint, state]
+            previous = previous_index.get(record['id'])
+            if previous is not None and previous[0] == fingerprint:
+                continue
+            if previous is not None and previous[1] != state:
+                delta.append({'id': record['id'], 'state': previous[1], '_deleted': True})
+            delta.append(dict(record, _deleted=False))
+        if delta:
+            yield delta
+
+    deleted = [
+        {'id': brewery_id, 'state': previous[1], '_deleted': True}
+        for brewery_id, previous in previous_index.items()
+        if brewery_id not in current_index
+    ]
+    if deleted:
+        yield deleted
+
+def stream_bronze_delta(client, pages, bucket_name='datalake-case', file_name='bronze_breweries_delta.jsonl',
+                        delta_prefix='bronze_layer/delta', index_key=FINGERPRINT_INDEX_KEY,
+                        part_size=DEFAULT_PART_SIZE, codec='none'):
+    """
+    Stream only new, changed and deleted breweries to a bronze delta object.
+
+    The new fingerprint index is returned, not saved: the caller stores it under
+    `pending_index_key` and `promote_fingerprint_index` publishes it once the gold layer
+    of the run is written, so the changes of a run that fails later are not lost.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        pages (iterable): Iterable of brewery lists, e.g. the pages of the extractor.
+        bucket_name (str): MinIO bucket name.
+        file_name (str): File name of the delta object.
+        delta_prefix (str): Prefix of the bronze delta folder in the bucket.
+        index_key (str): Key of the fingerprint index of the previous run.
+        part_size (int): Size of each multipart part in bytes.
+        codec (str): Compression of the delta object, 'none', 'gzip' or 'zstd', appended to the key as '.gz' or '.zst'.
+
+    Returns:
+        tuple: The key of the delta object and the fingerprint index of this run.
+    """
+    key = f'{delta_prefix}/{file_name}{codec_suffix(codec)}'
+    try:
+        previous_index = load_fingerprint_index(client, bucket_name, index_key)
+        current_index = {}
+        with BronzeStreamWriter(client, bucket_name, key, part_size=part_size, codec=codec) as writer:
+            for delta in iter_delta_pages(pages, previous_index, current_index):
+                writer.write_records(delta)
+        print(f"Delta of {writer.record_count} records out of {len(current_index)} streamed to {bucket_name}/{key}.")
+        return key, current_index
+    except Exception as e:
+        print(f"Error streaming bronze delta: {e}")
+        raise
+
+def delta_changed(client, keys, bucket_name='datalake-case'):
+    """
+    Incremental counterpart of `bronze_changed`: the delta key holds the run date, so its
+    snapshot never matches a published one, and the downstream stages are skipped when
+    the delta is empty instead.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (list): Keys of the bronze delta objects of the run.
+        bucket_name (str): MinIO bucket name.
+
+    Returns:
+        str or None: The snapshot id when a delta holds records, None when nothing changed.
+    """
+    for key in keys:
+        body = open_decompressed(client.get_object(Bucket=bucket_name, Key=key)['Body'], split_codec(key)[1])
+        # A single byte tells an empty delta apart, without downloading it
+        if body.read(1):
+            return snapshot_id(client, keys, bucket_name)
+    print(f"Bronze delta {keys} is empty, skipping the downstream stages.")
+    return None
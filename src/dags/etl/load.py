@@ -1,10 +1,31 @@
 import os
 import json
+import hashlib
 import pandas as pd
 import boto3
 import io
+import tempfile
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+from ..conn.object_store import (iter_keys, iter_objects, read_object, fetch_objects, upload_objects, open_object, transfer_kwargs,
+                                 delete_keys, object_missing)
+from ..conn.compression import Compressor, codec_suffix, codec_suffixes, compress_bytes, decompress_bytes, split_codec
+from .silver_dataset import partition_state, partition_values, write_silver_dataset, remove_other_layout
+from .silver_manifest import partition_hash, load_silver_manifest, save_silver_manifest, diff_partitions, apply_partition_changes
+from .silver_stream import write_silver_stream, upload_silver_files
+from .snapshot import expected_etag, file_etag, stored_etag
+from .telemetry import traced_stage, record_stage
 
-def create_bronze_layer(client, breweries, bucket_name='datalake-case', file_name='bronze_breweries.json'):
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+@traced_stage('bronze')
+def create_bronze_layer(client, breweries, bucket_name='datalake-case', file_name='bronze_breweries.json', transfer_config=None, codec='none',
+                        skip_unchanged=False):
     """
     Upload raw brewery data to MinIO bucket as a JSON file.
     
@@ -13,22 +34,290 @@ def create_bronze_layer(client, breweries, bucket_name='datalake-case', file_nam
         breweries (list): List of brewery data.
         bucket_name (str): MinIO bucket name.
         file_name (str): File name to save in the bucket.
+        transfer_config (dict): Multipart settings of the upload, see `build_transfer_config`.
+        codec (str): Compression of the object, 'none', 'gzip' or 'zstd', appended to the file name as '.gz' or '.zst'.
+        skip_unchanged (bool): Compare the ETag the file would get with the stored object's and skip
+            the upload when they match.
+
+    Returns:
+        bool: False when the upload was skipped because the stored object is identical.
     """
 
     # Save data to a temporary file
+    file_name = f"{file_name}{codec_suffix(codec)}"
     file_path = f"/tmp/{file_name}"
     os.makedirs(os.path.dirname(file_path), exist_ok=True) 
-    with open(file_path, "w") as f:
-        json.dump(breweries, f)
+    if codec == 'none':
+        with open(file_path, "w") as f:
+            json.dump(breweries, f)
+    else:
+        with open(file_path, "wb") as f:
+            f.write(compress_bytes(json.dumps(breweries).encode('utf-8'), codec))
+    record_stage(rows_in=len(breweries), rows_out=len(breweries))
 
     try:
-        client.upload_file(file_path, bucket_name, f'/bronze_layer/raw/{file_name}')
+        key = f'/bronze_layer/raw/{file_name}'
+        if skip_unchanged and stored_etag(client, bucket_name, key) == file_etag(file_path, transfer_config):
+            print(f"File {file_name} is unchanged in {bucket_name}, upload skipped.")
+            return False
+        client.upload_file(file_path, bucket_name, key, **transfer_kwargs(transfer_config))
         print(f"File {file_name} uploaded successfully to {bucket_name}.")
+        return True
     except Exception as e:
         print(f"Error uploading file: {e}")
         raise
 
-def create_silver_layer(client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/'):
+class BronzeStreamWriter:
+    """
+    Stream brewery records to a MinIO object as newline-delimited JSON.
+
+    Records are encoded as they arrive and buffered only until a multipart part is
+    full, so memory stays around one part (plus the page being written) no matter
+    how large the object gets. Objects smaller than one part are sent with a single
+    `put_object` when the writer is closed. With a codec, the records are compressed
+    as they arrive and the parts hold compressed bytes.
+
+    The ETag of the object is computed from the MD5 of each part while writing. With
+    `skip_unchanged`, it is compared with the ETag of the stored object when the writer
+    is closed: if they match, the pending upload is aborted (or never sent) and
+    `unchanged` is set, so an identical snapshot does not rewrite the object.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        key (str): Object key to write, including the codec suffix (see `codec_suffix`).
+        part_size (int): Size of each multipart part in bytes (S3 minimum is 5 MiB).
+        codec (str): Compression of the object, 'none', 'gzip' or 'zstd'.
+        skip_unchanged (bool): Do not rewrite the object when its content did not change.
+    """
+
+    def __init__(self, client, bucket_name, key, part_size=DEFAULT_PART_SIZE, codec='none', skip_unchanged=False):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes, got {part_size}.")
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.part_size = part_size
+        self.record_count = 0
+        self.bytes_written = 0
+        self.raw_bytes = 0
+        self.skip_unchanged = skip_unchanged
+        self.etag = None
+        self.unchanged = False
+        self._compressor = Compressor(codec)
+        self._part_digests = []
+        self._buffer = io.BytesIO()
+        self._upload_id = None
+        self._parts = []
+
+    def write_records(self, records):
+        """
+        Append records to the object, uploading a part whenever the buffer is full.
+
+        Args:
+            records (list): Brewery records to append.
+        """
+        data = b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in records)
+        self.record_count += len(records)
+        self.raw_bytes += len(data)
+        self._buffer.write(self._compressor.compress(data))
+        if self._buffer.tell() >= self.part_size:
+            self._flush_part()
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket_name, Key=self.key)
+            self._upload_id = response['UploadId']
+        part_number = len(self._parts) + 1
+        body = self._buffer.getvalue()
+        self._part_digests.append(hashlib.md5(body).digest())
+        response = self.client.upload_part(
+            Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=body
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.bytes_written += len(body)
+        self._buffer = io.BytesIO()
+
+    def close(self):
+        """
+        Upload the remaining buffer and complete the object.
+
+        Returns:
+            str: The key of the written object.
+        """
+        self._buffer.write(self._compressor.flush())
+        if self._upload_id is None:
+            body = self._buffer.getvalue()
+            self.etag = expected_etag([hashlib.md5(body).digest()], multipart=False)
+            if self.skip_unchanged and stored_etag(self.client, self.bucket_name, self.key) == self.etag:
+                self.unchanged = True
+            else:
+                self.client.put_object(Bucket=self.bucket_name, Key=self.key, Body=body)
+                self.bytes_written += len(body)
+        else:
+            if self._buffer.tell():
+                self._flush_part()
+            self.etag = expected_etag(self._part_digests)
+            if self.skip_unchanged and stored_etag(self.client, self.bucket_name, self.key) == self.etag:
+                self.unchanged = True
+                self.abort()
+            else:
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id,
+                    MultipartUpload={'Parts': self._parts}
+                )
+        self._buffer = io.BytesIO()
+        return self.key
+
+    def abort(self):
+        """
+        Discard the parts uploaded so far.
+        """
+        if self._upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+        self._buffer = io.BytesIO()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+@traced_stage('bronze')
+def stream_bronze_layer(client, pages, bucket_name='datalake-case', file_name='bronze_breweries.jsonl',
+                        raw_prefix='bronze_layer/raw', part_size=DEFAULT_PART_SIZE, codec='none', skip_unchanged=False):
+    """
+    Stream pages of raw brewery data to the bronze layer as newline-delimited JSON.
+
+    Pages are written while they are being extracted, so neither the full dataset
+    nor a local copy of it is ever held by the task. Only the object key is returned,
+    which keeps the Airflow XCom payload small.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        pages (iterable): Iterable of brewery lists, e.g. the pages of the extractor.
+        bucket_name (str): MinIO bucket name.
+        file_name (str): File name to save in the bucket.
+        raw_prefix (str): Prefix of the raw bronze layer folder in the bucket.
+        part_size (int): Size of each multipart part in bytes.
+        codec (str): Compression of the object, 'none', 'gzip' or 'zstd', appended to the key as '.gz' or '.zst'.
+        skip_unchanged (bool): Keep the stored object when its ETag matches the new content, see `BronzeStreamWriter`.
+
+    Returns:
+        str: The key of the bronze object.
+    """
+    key = f'{raw_prefix}/{file_name}{codec_suffix(codec)}'
+    try:
+        with BronzeStreamWriter(client, bucket_name, key, part_size=part_size, codec=codec, skip_unchanged=skip_unchanged) as writer:
+            for page in pages:
+                writer.write_records(page)
+        record_stage(rows_in=writer.record_count, rows_out=writer.record_count)
+        print(f"Streamed {writer.record_count} records ({writer.raw_bytes} bytes, {writer.bytes_written} stored) to {bucket_name}/{key}.")
+        return key
+    except Exception as e:
+        print(f"Error streaming bronze layer: {e}")
+        raise
+
+@traced_stage('bronze')
+def stream_bronze_shards(client, pages, bucket_name='datalake-case', file_name='bronze_breweries.jsonl', raw_prefix='bronze_layer/raw',
+                         records_per_shard=2000, part_size=DEFAULT_PART_SIZE, codec='none', skip_unchanged=False):
+    """
+    Stream pages of raw brewery data to the bronze layer as several newline-delimited JSON
+    objects of at most `records_per_shard` records (`<stem>-00000.jsonl`, `<stem>-00001.jsonl`, ...),
+    so the cleaning can be spread over one mapped task per object.
+
+    Shards left by a previous, larger extraction (or written with another codec) are deleted,
+    so the shards under the prefix always form one snapshot. At least one (possibly empty)
+    shard is written.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        pages (iterable): Iterable of brewery lists, e.g. the pages of the extractor.
+        bucket_name (str): MinIO bucket name.
+        file_name (str): File name the shard names are derived from.
+        raw_prefix (str): Prefix of the raw bronze layer folder in the bucket.
+        records_per_shard (int): Maximum records per object.
+        part_size (int): Size of each multipart part in bytes.
+        codec (str): Compression of the shards, 'none', 'gzip' or 'zstd', appended to the keys as '.gz' or '.zst'.
+        skip_unchanged (bool): Keep the stored shards whose ETag matches the new content, see `BronzeStreamWriter`.
+
+    Returns:
+        list: The keys of the shards, in record order.
+    """
+    if records_per_shard < 1:
+        raise ValueError(f"records_per_shard must be at least 1, got {records_per_shard}.")
+    stem, extension = os.path.splitext(file_name)
+    keys = []
+    record_count = 0
+    writer = None
+
+    def next_writer():
+        return BronzeStreamWriter(client, bucket_name, f'{raw_prefix}/{stem}-{len(keys):05d}{extension}{codec_suffix(codec)}', part_size=part_size, codec=codec,
+                                  skip_unchanged=skip_unchanged)
+
+    unchanged = 0
+    try:
+        for page in pages:
+            position = 0
+            while position < len(page):
+                writer = writer or next_writer()
+                take = records_per_shard - writer.record_count
+                writer.write_records(page[position:position + take])
+                position += take
+                if writer.record_count >= records_per_shard:
+                    keys.append(writer.close())
+                    record_count += writer.record_count
+                    unchanged += writer.unchanged
+                    writer = None
+        if writer is not None or not keys:
+            writer = writer or next_writer()
+            keys.append(writer.close())
+            record_count += writer.record_count
+            unchanged += writer.unchanged
+            writer = None
+    except Exception as e:
+        if writer is not None:
+            writer.abort()
+        print(f"Error streaming bronze shards: {e}")
+        raise
+
+    stale = [key for key in iter_keys(client, bucket_name, f'{raw_prefix}/{stem}-', suffix=codec_suffixes(extension)) if key not in keys]
+    delete_keys(client, bucket_name, stale)
+    record_stage(rows_in=record_count, rows_out=record_count)
+    print(f"Streamed {record_count} records into {len(keys)} shards under {bucket_name}/{raw_prefix}/ "
+          f"({unchanged} unchanged and kept, {len(stale)} stale shards removed).")
+    return keys
+
+def read_cleaned_frame(content, file_key):
+    """
+    Read a cleaned bronze object into a DataFrame.
+
+    Args:
+        content (bytes): Content of the object.
+        file_key (str): Key of the object; `.parquet` objects come from the Arrow cleaning
+            engine, `.json` objects (possibly `.json.gz` or `.json.zst`) from the pandas engines.
+
+    Returns:
+        pd.DataFrame: The cleaned records.
+    """
+    if file_key.endswith('.parquet'):
+        return pd.read_parquet(io.BytesIO(content))
+    return pd.DataFrame(json.loads(decompress_bytes(content, split_codec(file_key)[1])))
+
+# Keys of the cleaned objects, with the compressed variants of the JSON ones
+CLEANED_SUFFIXES = codec_suffixes('.json') + ('.parquet',)
+
+SILVER_WRITERS = ('pandas', 'dataset', 'stream')
+
+@traced_stage('silver')
+def create_silver_layer(client, bucket_name='datalake-case', bronze_cleaned_prefix='bronze_layer/cleaned', silver_dir='silver_layer/', max_workers=8,
+                        in_memory=False, writer='pandas', dataset_options=None, filesystem=None, use_manifest=False, transfer_config=None,
+                        stream_options=None):
     """
     Transform raw brewery data from the bronze layer (cleaned) to columnar storage (Parquet) and partition by state.
     Save the transformed files locally in the Docker container under `/tmp/`.
@@ -38,26 +327,42 @@ def create_silver_layer(client, bucket_name='datalake-case', bronze_cleaned_pref
         bucket_name (str): MinIO bucket name.
         bronze_cleaned_prefix (str): Prefix of the cleaned bronze layer folder in the bucket.
         silver_dir (str): Local directory to store transformed Parquet files.
+        max_workers (int): Number of cleaned files downloaded (and, in memory mode, partitions uploaded) concurrently.
+        in_memory (bool): Serialise each partition to an in-memory buffer and upload the buffers concurrently
+            instead of staging them under `/tmp/` and uploading them one by one.
+        writer (str): 'pandas' writes one `<state>/breweries_<state>.parquet` file per state; 'dataset' writes a
+            hive-partitioned dataset (`state=<state>/part-<n>.parquet`) with `write_silver_dataset`; 'stream' writes
+            the 'pandas' layout with bounded memory, see `create_silver_layer_stream`.
+        dataset_options (dict): Parquet options of the 'dataset' writer (compression, compression_level,
+            row_group_size, use_dictionary, max_rows_per_file).
+        filesystem (pyarrow.fs.FileSystem): Write the 'dataset' writer output directly to this filesystem.
+        use_manifest (bool): Keep `<silver_dir>_manifest.json` with the hash, row count and size of every
+            partition, rewrite only the partitions whose hash changed, remove the ones that disappeared
+            and mark both as dirty for the gold layer.
+        transfer_config (dict): Multipart settings of the partition uploads, see `build_transfer_config`.
+        stream_options (dict): Options of the 'stream' writer (batch_size, row_group_size, max_buffered_rows).
+
+    Returns:
+        list: The states whose partitions were rewritten or removed.
     """
     try:
-        # List all files in the cleaned bronze layer
-        response = client.list_objects_v2(Bucket=bucket_name, Prefix=bronze_cleaned_prefix)
-        if 'Contents' not in response:
-            raise ValueError(f"No files found in the cleaned bronze layer: {bronze_cleaned_prefix}")
-        
+        if writer not in SILVER_WRITERS:
+            raise ValueError(f"Unknown silver writer '{writer}', expected one of {SILVER_WRITERS}")
+
+        # List all JSON and Parquet files in the cleaned bronze layer, across every listing page
+        keys = iter_keys(client, bucket_name, bronze_cleaned_prefix, suffix=CLEANED_SUFFIXES)
+
+        if writer == 'stream':
+            keys = list(keys)
+            if not keys:
+                raise ValueError(f"No cleaned objects found under {bucket_name}/{bronze_cleaned_prefix}")
+            return create_silver_layer_stream(client, keys, bucket_name, silver_dir, max_workers, use_manifest, transfer_config, **(stream_options or {}))
+
         df_list = []
 
-        for obj in response['Contents']:
-            file_key = obj['Key']
-            if not file_key.endswith('.json'):
-                continue  # Skip non-JSON files
-            
-            # Download the JSON file
-            file_obj = client.get_object(Bucket=bucket_name, Key=file_key)
-            breweries = json.load(file_obj['Body'])
-            
-            # Convert the JSON list to a Pandas DataFrame
-            df = pd.DataFrame(breweries)
+        # Download the cleaned files concurrently and convert them to Pandas DataFrames
+        for file_key, content in fetch_objects(client, bucket_name, keys, max_workers=max_workers):
+            df = read_cleaned_frame(content, file_key)
 
             # Check if 'state' column exists for partitioning
             if 'state' not in df.columns:
@@ -68,103 +373,731 @@ def create_silver_layer(client, bucket_name='datalake-case', bronze_cleaned_pref
 
         # Concatenate all DataFrames in df_list into a single DataFrame
         final_df = pd.concat(df_list, ignore_index=True)
+        record_stage(rows_in=len(final_df))
 
-        # Partition data by 'state' and save as Parquet
-        for state, partition_df in final_df.groupby('state'):
-            # Create directory structure for partition
-            partition_path = os.path.join('/tmp/', state)
-            os.makedirs(partition_path, exist_ok=True)
-            
-            # Generate file path for partitioned data
-            partition_file_name = f"breweries_{state}.parquet"
-            partition_file_path = os.path.join(partition_path, partition_file_name)
-            
-            # Save the partitioned data locally as Parquet
-            partition_df.to_parquet(partition_file_path, index=False)
-            print(f"Partition saved locally: {partition_file_path}")
-            
-            # Upload the partition to MinIO
-            try:
-                # Prepare the S3 key (path) for MinIO
-                s3_key = f"{silver_dir}{state}/{os.path.basename(partition_file_path)}"
-                client.upload_file(partition_file_path, bucket_name, s3_key)
-                print(f"Partition {s3_key} uploaded successfully to {bucket_name}.")
-            except Exception as e:
-                print(f"Error uploading partition {state}: {e}")
-                raise
-
-        print("Silver layer transformation and local storage completed successfully.")
+        # With a manifest, only the partitions whose content hash changed are rewritten
+        if use_manifest:
+            manifest = load_silver_manifest(client, bucket_name, silver_dir)
+            partition_stats = {
+                state: {'hash': partition_hash(partition_df), 'rows': len(partition_df)}
+                for state, partition_df in final_df.groupby('state')
+            }
+            changed_states, removed_states = diff_partitions(manifest, partition_stats)
+            final_df = final_df[final_df['state'].isin(changed_states)]
+        else:
+            changed_states = sorted(final_df['state'].unique())
+            removed_states = []
+
+        record_stage(rows_out=len(final_df))
+        if final_df.empty:
+            print("No partition to rewrite.")
+        elif writer == 'dataset':
+            table = pa.Table.from_pandas(final_df, preserve_index=False)
+            write_silver_dataset(client, table, bucket_name, silver_dir, filesystem=filesystem,
+                                 max_workers=max_workers, transfer_config=transfer_config, **(dataset_options or {}))
+            print("Silver layer transformation completed successfully.")
+        elif in_memory:
+            # Serialise partitions lazily while the previous ones upload, without touching the local disk
+            def partition_buffers():
+                for state, partition_df in final_df.groupby('state'):
+                    buffer = io.BytesIO()
+                    partition_df.to_parquet(buffer, index=False)
+                    yield f"{silver_dir}{state}/breweries_{state}.parquet", buffer
+
+            uploaded = upload_objects(client, bucket_name, partition_buffers(), max_workers=max_workers, transfer_config=transfer_config)
+            print(f"{len(uploaded)} partitions uploaded from memory to {bucket_name}/{silver_dir}.")
+            print("Silver layer transformation completed successfully.")
+        else:
+            # Partition data by 'state' and save as Parquet
+            for state, partition_df in final_df.groupby('state'):
+                # Create directory structure for partition
+                partition_path = os.path.join('/tmp/', state)
+                os.makedirs(partition_path, exist_ok=True)
+
+                # Generate file path for partitioned data
+                partition_file_name = f"breweries_{state}.parquet"
+                partition_file_path = os.path.join(partition_path, partition_file_name)
+
+                # Save the partitioned data locally as Parquet
+                partition_df.to_parquet(partition_file_path, index=False)
+                print(f"Partition saved locally: {partition_file_path}")
+
+                # Upload the partition to MinIO
+                try:
+                    # Prepare the S3 key (path) for MinIO
+                    s3_key = f"{silver_dir}{state}/{os.path.basename(partition_file_path)}"
+                    client.upload_file(partition_file_path, bucket_name, s3_key, **transfer_kwargs(transfer_config))
+                    print(f"Partition {s3_key} uploaded successfully to {bucket_name}.")
+                except Exception as e:
+                    print(f"Error uploading partition {state}: {e}")
+                    raise
+
+            print("Silver layer transformation and local storage completed successfully.")
+
+        if not final_df.empty:
+            remove_other_layout(client, final_df['state'].unique(), writer == 'dataset', bucket_name, silver_dir)
+        if use_manifest:
+            apply_partition_changes(client, manifest, partition_stats, changed_states, removed_states, bucket_name, silver_dir)
+
+        return changed_states + removed_states
     except Exception as e:
         print(f"Error in silver layer processing: {e}")
         raise
 
-def create_gold_layer(client, bucket_name='datalake-case', silver_dir='silver_layer/', gold_dir='golden_layer/'):
+def create_silver_layer_stream(client, keys, bucket_name='datalake-case', silver_dir='silver_layer/', max_workers=8, use_manifest=False,
+                               transfer_config=None, **stream_options):
+    """
+    Build the silver layer with bounded memory: the cleaned objects are read in record batches
+    and routed to one Parquet writer per state (see `write_silver_stream`), whose files are
+    staged in a temporary directory and uploaded once complete.
+
+    With a manifest, partitions are compared by the hash of their Parquet file rather than by
+    `partition_hash`, which needs the whole partition in memory, so switching between the
+    stream and the other writers rewrites every partition once.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (iterable): Keys of the cleaned objects.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        max_workers (int): Number of partitions uploaded concurrently.
+        use_manifest (bool): Upload only the partitions whose file hash changed, see `create_silver_layer`.
+        transfer_config (dict): Multipart settings of the partition uploads, see `build_transfer_config`.
+        **stream_options: batch_size, row_group_size and max_buffered_rows of `write_silver_stream`.
+
+    Returns:
+        list: The states whose partitions were rewritten or removed.
+    """
+    with tempfile.TemporaryDirectory() as local_dir:
+        files = write_silver_stream(client, keys, local_dir, bucket_name, **stream_options)
+        partition_stats = {state: {'hash': file_info['hash'], 'rows': file_info['rows']} for state, file_info in files.items()}
+        record_stage(rows_in=sum(stats['rows'] for stats in partition_stats.values()))
+
+        if use_manifest:
+            manifest = load_silver_manifest(client, bucket_name, silver_dir)
+            changed_states, removed_states = diff_partitions(manifest, partition_stats)
+        else:
+            changed_states, removed_states = sorted(files), []
+
+        record_stage(rows_out=sum(partition_stats[state]['rows'] for state in changed_states))
+        if changed_states:
+            upload_silver_files(client, {state: files[state] for state in changed_states}, bucket_name, silver_dir, max_workers, transfer_config)
+            remove_other_layout(client, changed_states, False, bucket_name, silver_dir)
+        else:
+            print("No partition to rewrite.")
+
+    if use_manifest:
+        apply_partition_changes(client, manifest, partition_stats, changed_states, removed_states, bucket_name, silver_dir)
+    print("Silver layer transformation completed successfully.")
+    return changed_states + removed_states
+
+def prune_objects(client, keep_keys, bucket_name='datalake-case', prefix='bronze_layer/cleaned'):
+    """
+    Delete the objects under `prefix` that are not in `keep_keys`, e.g. cleaned shards
+    left by a previous run that had more raw shards.
+
+    Returns:
+        list: The deleted keys.
+    """
+    keep_keys = set(keep_keys)
+    stale = [key for key in iter_keys(client, bucket_name, prefix) if key not in keep_keys]
+    delete_keys(client, bucket_name, stale)
+    if stale:
+        print(f"{len(stale)} stale objects removed from {bucket_name}/{prefix}.")
+    return stale
+
+def plan_state_shards(client, keys, shard_count=8, bucket_name='datalake-case', max_workers=8):
+    """
+    Split the states of the cleaned objects into at most `shard_count` groups of similar row
+    counts, one per mapped silver task. Only the `state` column is read from Parquet objects.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (list): Keys of the cleaned objects.
+        shard_count (int): Maximum number of groups.
+        bucket_name (str): MinIO bucket name.
+        max_workers (int): Number of objects read concurrently.
+
+    Returns:
+        list: Non-empty lists of states, largest group first.
+    """
+    def read_states(file_key):
+        if file_key.endswith('.parquet'):
+            return read_parquet_columns(client, bucket_name, file_key, ['state'])[0].column('state').to_pandas()
+        return read_cleaned_frame(read_object(client, bucket_name, file_key), file_key)['state']
+
+    rows = pd.Series(dtype='int64')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for states in executor.map(read_states, keys):
+            rows = rows.add(states.value_counts(), fill_value=0)
+
+    # Largest states first, each into the group with the fewest rows so far
+    groups = [{'states': [], 'rows': 0} for _ in range(max(1, min(shard_count, len(rows))))]
+    for state, count in sorted(rows.items(), key=lambda item: (-item[1], item[0])):
+        group = min(groups, key=lambda group: group['rows'])
+        group['states'].append(state)
+        group['rows'] += int(count)
+    return [sorted(group['states']) for group in sorted(groups, key=lambda group: -group['rows']) if group['states']]
+
+SILVER_SHARD_INPUTS_PREFIX = 'bronze_layer/silver_shards'
+
+@traced_stage('silver')
+def route_state_shards(client, keys, state_groups, bucket_name='datalake-case', shard_prefix=SILVER_SHARD_INPUTS_PREFIX, max_workers=8):
+    """
+    Split the cleaned objects once into the inputs of the mapped silver tasks, so each shard
+    reads only the rows of its own states instead of every cleaned object.
+
+    Each cleaned object is read once and the rows of each group are written as
+    `<shard_prefix>/shard-NNNNN/part-NNNNN.parquet`; inputs left by a previous run are deleted first.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (list): Keys of the cleaned objects.
+        state_groups (list): Lists of states, e.g. the groups of `plan_state_shards`.
+        bucket_name (str): MinIO bucket name.
+        shard_prefix (str): Prefix of the shard inputs in the bucket.
+        max_workers (int): Number of objects downloaded and uploaded concurrently.
+
+    Returns:
+        list: For each group, the keys of its inputs, to be passed to `build_silver_shard`.
+    """
+    delete_keys(client, bucket_name, iter_keys(client, bucket_name, f"{shard_prefix}/"))
+    shard_of_state = {state: shard for shard, states in enumerate(state_groups) for state in states}
+    shard_keys = [[] for _ in state_groups]
+
+    def shard_buffers():
+        for part, (file_key, content) in enumerate(fetch_objects(client, bucket_name, keys, max_workers=max_workers)):
+            df = read_cleaned_frame(content, file_key)
+            if 'state' not in df.columns:
+                raise ValueError(f"'state' column is missing in the file: {file_key}")
+            for shard, shard_df in df.groupby(df['state'].map(shard_of_state)):
+                key = f"{shard_prefix}/shard-{int(shard):05d}/part-{part:05d}.parquet"
+                shard_keys[int(shard)].append(key)
+                buffer = io.BytesIO()
+                shard_df.to_parquet(buffer, index=False)
+                yield key, buffer
+
+    upload_objects(client, bucket_name, shard_buffers(), max_workers=max_workers)
+    print(f"{len(keys)} cleaned objects routed to {len(state_groups)} silver shards under {bucket_name}/{shard_prefix}/.")
+    return [sorted(group_keys) for group_keys in shard_keys]
+
+@traced_stage('silver')
+def build_silver_shard(client, keys, states, bucket_name='datalake-case', silver_dir='silver_layer/', max_workers=8, use_manifest=False,
+                       transfer_config=None):
+    """
+    Write the silver partitions of some states, for one mapped task of a sharded silver build.
+
+    Reads the shard inputs written by `route_state_shards` (any cleaned objects work, only
+    the rows of `states` are kept). With a manifest,
+    partitions whose hash did not change are skipped; the manifest itself is only read,
+    `commit_silver_shards` updates it once every shard is done.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (list): Keys of the shard inputs, see `route_state_shards`.
+        states (list): States of the shard, e.g. one group of `plan_state_shards`.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        max_workers (int): Number of objects downloaded and partitions uploaded concurrently.
+        use_manifest (bool): Skip the partitions whose hash matches the silver manifest.
+        transfer_config (dict): Multipart settings of the partition uploads, see `build_transfer_config`.
+
+    Returns:
+        dict: `partitions` maps each state of the shard to its `hash` and `rows`; `changed` lists the rewritten states.
+    """
+    df_list = []
+    for file_key, content in fetch_objects(client, bucket_name, keys, max_workers=max_workers):
+        df = read_cleaned_frame(content, file_key)
+        if 'state' not in df.columns:
+            raise ValueError(f"'state' column is missing in the file: {file_key}")
+        df_list.append(df[df['state'].isin(states)])
+    shard_df = pd.concat(df_list, ignore_index=True)
+    record_stage(rows_in=len(shard_df))
+
+    partitions = {state: partition_df for state, partition_df in shard_df.groupby('state')}
+    partition_stats = {state: {'hash': partition_hash(partition_df), 'rows': len(partition_df)} for state, partition_df in partitions.items()}
+    manifest = load_silver_manifest(client, bucket_name, silver_dir) if use_manifest else {'partitions': {}}
+    changed_states = [
+        state for state in sorted(partitions)
+        if manifest['partitions'].get(state, {}).get('hash') != partition_stats[state]['hash']
+    ]
+
+    def partition_buffers():
+        for state in changed_states:
+            buffer = io.BytesIO()
+            partitions[state].to_parquet(buffer, index=False)
+            yield f"{silver_dir}{state}/breweries_{state}.parquet", buffer
+
+    upload_objects(client, bucket_name, partition_buffers(), max_workers=max_workers, transfer_config=transfer_config)
+    remove_other_layout(client, changed_states, False, bucket_name, silver_dir)
+    record_stage(rows_out=sum(partition_stats[state]['rows'] for state in changed_states))
+    print(f"{len(changed_states)} of {len(partitions)} partitions of the shard rewritten.")
+    return {'partitions': partition_stats, 'changed': changed_states}
+
+def commit_silver_shards(client, shard_results, bucket_name='datalake-case', silver_dir='silver_layer/', use_manifest=False):
+    """
+    Combine the results of `build_silver_shard` and, with a manifest, remove the partitions of
+    the states no shard produced and record the rewritten ones (see `apply_partition_changes`).
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        shard_results (iterable): Results of `build_silver_shard`.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        use_manifest (bool): Update the silver manifest.
+
+    Returns:
+        list: The states whose partitions were rewritten or removed.
+    """
+    partition_stats, changed_states = {}, []
+    for result in shard_results:
+        partition_stats.update(result['partitions'])
+        changed_states += result['changed']
+    changed_states = sorted(changed_states)
+    if not use_manifest:
+        return changed_states
+
+    manifest = load_silver_manifest(client, bucket_name, silver_dir)
+    removed_states = sorted(set(manifest['partitions']) - set(partition_stats))
+    apply_partition_changes(client, manifest, partition_stats, changed_states, removed_states, bucket_name, silver_dir)
+    return changed_states + removed_states
+
+@traced_stage('silver')
+def merge_silver_delta(client, bucket_name='datalake-case', delta_cleaned_prefix='bronze_layer/cleaned_delta', silver_dir='silver_layer/', keys=None, max_workers=8,
+                       use_manifest=False):
+    """
+    Apply cleaned delta objects to the silver layer, rewriting only the state partitions they touch.
+
+    Rows whose `id` appears in the delta are removed from the partition, then the
+    new and changed records (`_deleted` is False) are appended. Partitions left
+    without rows are deleted.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        delta_cleaned_prefix (str): Prefix of the cleaned delta folder in the bucket.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        keys (list): Cleaned delta keys to apply. When omitted, every object under `delta_cleaned_prefix` is applied.
+        max_workers (int): Number of objects downloaded concurrently.
+        use_manifest (bool): Update the silver manifest entries of the rewritten partitions and mark them dirty.
+
+    Returns:
+        list: The states whose partitions were rewritten or deleted.
+    """
+    try:
+        if keys is None:
+            keys = iter_keys(client, bucket_name, delta_cleaned_prefix)
+        keys = [file_key for file_key in keys if file_key.endswith(CLEANED_SUFFIXES)]
+
+        df_list = []
+        for file_key, content in fetch_objects(client, bucket_name, keys, max_workers=max_workers):
+            df = read_cleaned_frame(content, file_key)
+            if df.empty:
+                continue
+            if 'state' not in df.columns or '_deleted' not in df.columns:
+                raise ValueError(f"'state' or '_deleted' column is missing in the delta file: {file_key}")
+            df_list.append(df)
+
+        if not df_list:
+            print("No changes found in the delta, silver layer left untouched.")
+            return []
+
+        delta_df = pd.concat(df_list, ignore_index=True)
+        record_stage(rows_in=len(delta_df))
+        changed_states = []
+        manifest = load_silver_manifest(client, bucket_name, silver_dir) if use_manifest else None
+
+        for state, state_delta in delta_df.groupby('state'):
+            s3_key = f"{silver_dir}{state}/breweries_{state}.parquet"
+            upserts = state_delta[~state_delta['_deleted'].astype(bool)].drop(columns='_deleted')
+
+            try:
+                file_obj = client.get_object(Bucket=bucket_name, Key=s3_key)
+                existing = pd.read_parquet(io.BytesIO(file_obj['Body'].read()))
+                existing = existing[~existing['id'].isin(state_delta['id'])]
+                partition_df = pd.concat([existing, upserts], ignore_index=True)
+            except ClientError as e:
+                if not object_missing(e):
+                    raise
+                partition_df = upserts
+
+            if partition_df.empty:
+                client.delete_object(Bucket=bucket_name, Key=s3_key)
+                print(f"Partition {s3_key} is now empty and was removed.")
+                if manifest is not None:
+                    manifest['partitions'].pop(state, None)
+            else:
+                buffer = io.BytesIO()
+                partition_df.to_parquet(buffer, index=False)
+                client.put_object(Bucket=bucket_name, Key=s3_key, Body=buffer.getvalue())
+                record_stage(rows_out=len(partition_df))
+                print(f"Partition {s3_key} rewritten with {len(partition_df)} rows.")
+                if manifest is not None:
+                    manifest['partitions'][state] = {
+                        'hash': partition_hash(partition_df), 'rows': len(partition_df),
+                        'bytes': buffer.getbuffer().nbytes, 'keys': [s3_key],
+                    }
+            changed_states.append(state)
+
+        if manifest is not None:
+            manifest['dirty'] += changed_states
+            save_silver_manifest(client, manifest, bucket_name, silver_dir)
+
+        print(f"Silver delta applied to {len(changed_states)} partitions.")
+        return changed_states
+    except Exception as e:
+        print(f"Error applying silver delta: {e}")
+        raise
+
+GOLD_TABLE_NAME = 'brewery_aggregated_by_type_and_location'
+GOLD_COLUMNS = ['brewery_type', 'state']
+GOLD_PARTIALS_NAME = '_partials/partials.parquet'
+GOLD_BASE_NAME = '_cube/base.parquet'
+# Grouping sets of the gold layer: each entry is written as the gold table `<name>.parquet`
+DEFAULT_GROUPING_SETS = {GOLD_TABLE_NAME: GOLD_COLUMNS}
+CUBE_GROUPING_SETS = {
+    GOLD_TABLE_NAME: ['brewery_type', 'state'],
+    'brewery_count_by_country': ['country'],
+    'brewery_count_by_city': ['city'],
+    'brewery_count_by_type': ['brewery_type'],
+    'brewery_count_by_country_and_type': ['country', 'brewery_type'],
+}
+
+def grouping_keys(grouping_sets):
+    """
+    Return the finest grain every grouping set can be rolled up from: the union of their
+    columns, plus `state`, the silver partition column, so partitions can be recomputed alone.
+
+    Args:
+        grouping_sets (dict): Maps gold table names to the columns they count by.
+
+    Returns:
+        list: Columns in first-seen order.
+    """
+    keys = []
+    for columns in list(grouping_sets.values()) + [['state']]:
+        keys += [column for column in columns if column not in keys]
+    return keys
+
+def count_rows(table, keys):
+    """
+    Count the rows of a table per combination of `keys` in one columnar pass.
+
+    String keys are dictionary-encoded (Parquet dictionary pages are read as such
+    already), so the hash grouping works on small integer indices.
+
+    Args:
+        table (pa.Table): Table holding the key columns.
+        keys (list): Columns to group by.
+
+    Returns:
+        pd.DataFrame: The key columns and `brewery_count`.
+    """
+    for key in keys:
+        column = table[key]
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            table = table.set_column(table.schema.get_field_index(key), key, pc.dictionary_encode(column))
+    counts = table.group_by(keys).aggregate([([], 'count_all')])
+    columns = []
+    for key in keys:
+        column = counts[key]
+        columns.append(pc.cast(column, column.type.value_type) if pa.types.is_dictionary(column.type) else column)
+    columns.append(counts['count_all'])
+    return pa.Table.from_arrays(columns, names=keys + ['brewery_count']).to_pandas()
+
+def rollup(counts, columns):
+    """
+    Roll finer-grained counts up to a grouping set.
+
+    Args:
+        counts (pd.DataFrame): Counts at a grain that includes `columns`.
+        columns (list): Columns of the grouping set.
+
+    Returns:
+        pd.DataFrame: `columns` and the summed `brewery_count`.
+    """
+    return counts.groupby(columns, as_index=False, dropna=False, sort=True)['brewery_count'].sum()
+
+def read_parquet_columns(client, bucket_name, file_key, columns):
+    """
+    Read some columns of a Parquet object, downloading only its footer and their column chunks.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        file_key (str): Key of the Parquet object.
+        columns (list): Columns to read; the ones missing from the file are skipped.
+
+    Returns:
+        tuple: `(pa.Table, bytes downloaded)`; string columns are read dictionary-encoded.
+    """
+    source = open_object(client, bucket_name, file_key)
+    metadata = pq.read_metadata(source)
+    present = [column for column in columns if column in metadata.schema.to_arrow_schema().names]
+    parquet_file = pq.ParquetFile(source, metadata=metadata, pre_buffer=True, read_dictionary=present)
+    table = parquet_file.read(columns=present)
+    return table, source.bytes_fetched
+
+def read_silver_dataset_counts(filesystem, bucket_name, silver_dir, states=None, keys=GOLD_COLUMNS):
+    """
+    Count breweries per combination of `keys` straight from a hive-partitioned silver dataset.
+
+    Partitions are discovered from the `state=` directories, so the `states` filter
+    prunes whole directories and only the key columns are read from the files.
+
+    Args:
+        filesystem (pyarrow.fs.FileSystem): Filesystem holding the bucket, e.g. from `get_arrow_filesystem`.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        states (list): Only count these states.
+        keys (list): Columns to count by.
+
+    Returns:
+        pd.DataFrame: The key columns and `brewery_count`.
+    """
+    dataset = ds.dataset(f"{bucket_name}/{silver_dir.rstrip('/')}", filesystem=filesystem, format='parquet',
+                         partitioning='hive')
+    missing = [key for key in keys if key not in dataset.schema.names]
+    if missing:
+        raise ValueError(f"Columns {missing} are missing in the silver dataset: {silver_dir}")
+    row_filter = ds.field('state').isin(list(states)) if states is not None else None
+    return count_rows(dataset.to_table(columns=keys, filter=row_filter), keys)
+
+def aggregate_silver_files(client, bucket_name, silver_dir, keys, max_workers=8, group_keys=GOLD_COLUMNS):
+    """
+    Count breweries per combination of `group_keys` in each silver file, reading only the
+    footer and the needed columns.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        keys (list): Keys of the silver files.
+        max_workers (int): Number of silver files read concurrently.
+        group_keys (list): Columns to count by.
+
+    Returns:
+        list: `(file_key, DataFrame)` pairs with the `group_keys` and `brewery_count` columns.
+
+    Raises:
+        ValueError: If a file lacks one of the `group_keys`.
+    """
+    aggregated_files = []
+    bytes_fetched = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda file_key: read_parquet_columns(client, bucket_name, file_key, group_keys), keys)
+        for file_key, (table, fetched) in zip(keys, results):
+            bytes_fetched += fetched
+
+            # Hive-partitioned files keep the partition columns in their key only
+            constants = {column: value for column, value in partition_values(file_key, silver_dir).items()
+                         if column in group_keys and column not in table.column_names}
+            missing = [key for key in group_keys if key not in table.column_names and key not in constants]
+            if missing:
+                print(f"Skipping {file_key} as it doesn't contain the columns {missing}.")
+                raise ValueError(f"Columns {missing} are missing in the file: {file_key}")
+
+            # Aggregating by every grouping column in one pass
+            aggregated = count_rows(table, [key for key in group_keys if key not in constants])
+            for column, value in constants.items():
+                aggregated[column] = value
+            aggregated_files.append((file_key, aggregated[group_keys + ['brewery_count']]))
+    if keys:
+        print(f"Read {bytes_fetched} bytes of {group_keys} from {len(keys)} silver files.")
+    return aggregated_files
+
+def aggregate_with_partials(client, bucket_name='datalake-case', silver_dir='silver_layer/', gold_dir='golden_layer/', max_workers=8,
+                            group_keys=GOLD_COLUMNS):
+    """
+    Count breweries per combination of `group_keys` from cached per-file partial aggregates.
+
+    The partial counts of every silver file are kept in `<gold_dir>_partials/partials.parquet`
+    together with the ETag of the file they were computed from. Only files whose ETag changed,
+    or that are new, are read again; partials of deleted files are dropped. The cost of a run
+    therefore depends on how much of the silver layer changed, not on its size. The cache is
+    discarded when `group_keys` change.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        gold_dir (str): The directory in the bucket where the gold layer files are stored.
+        max_workers (int): Number of silver files read concurrently.
+        group_keys (list): Columns to count by.
+
+    Returns:
+        pd.DataFrame: The `group_keys` and `brewery_count` columns, one row per combination.
+    """
+    partials_key = f"{gold_dir}{GOLD_PARTIALS_NAME}"
+    columns = ['silver_key', 'etag'] + list(group_keys) + ['brewery_count']
+    try:
+        file_obj = client.get_object(Bucket=bucket_name, Key=partials_key)
+        cached = pd.read_parquet(io.BytesIO(file_obj['Body'].read()))
+        if list(cached.columns) != columns:
+            print(f"Gold partials at {partials_key} were computed for other columns, computing every silver file.")
+            cached = pd.DataFrame(columns=columns)
+    except ClientError as e:
+        if not object_missing(e):
+            raise
+        print(f"No gold partials found at {partials_key}, computing every silver file.")
+        cached = pd.DataFrame(columns=columns)
+
+    etags = {obj['Key']: obj['ETag'] for obj in iter_objects(client, bucket_name, silver_dir, suffix='.parquet')}
+    if not etags:
+        raise ValueError(f"No files found in the silver layer: {silver_dir}")
+
+    reused = cached[cached['silver_key'].map(etags) == cached['etag']]
+    reused_keys = set(reused['silver_key'])
+    stale_keys = [file_key for file_key in etags if file_key not in reused_keys]
+
+    fresh = [
+        aggregated.assign(silver_key=file_key, etag=etags[file_key])
+        for file_key, aggregated in aggregate_silver_files(client, bucket_name, silver_dir, stale_keys, max_workers, group_keys)
+    ]
+    frames = ([reused] if not reused.empty else []) + fresh
+    partials = pd.concat(frames, ignore_index=True)[columns] if frames else cached
+    print(f"Gold partials: {len(reused_keys)} silver files reused, {len(stale_keys)} recomputed.")
+
+    if stale_keys or len(reused) != len(cached):
+        buffer = io.BytesIO()
+        partials.to_parquet(buffer, index=False)
+        client.put_object(Bucket=bucket_name, Key=partials_key, Body=buffer.getvalue())
+        print(f"Gold partials of {len(etags)} silver files saved to {bucket_name}/{partials_key}.")
+
+    return rollup(partials, list(group_keys))
+
+@traced_stage('gold')
+def create_gold_layer(client, bucket_name='datalake-case', silver_dir='silver_layer/', gold_dir='golden_layer/', states=None, max_workers=8,
+                      filesystem=None, use_manifest=False, use_partials=False, grouping_sets=None, transfer_config=None):
     """
     Create an aggregated view of the number of breweries per type and location.
     The aggregated data is saved as Parquet file in the Gold Layer.
 
+    With `grouping_sets`, every configured grouping is computed from a single pass over
+    silver: rows are counted once at the finest grain (see `grouping_keys`), and each
+    grouping set is rolled up from those counts and written as its own gold table.
+
     Args:
         client (boto3.client): The Boto3 client configured for MinIO.
         bucket_name (str): MinIO bucket name.
         silver_dir (str): The directory in the bucket where the silver layer files are stored.
         gold_dir (str): Local directory to store the aggregated files for the Gold Layer (Parquet).
+        states (list): Only recompute these state partitions (e.g. the ones touched by a delta) and
+            reuse the previous gold rows of every other state. When omitted, everything is recomputed.
+        max_workers (int): Number of silver files downloaded concurrently.
+        filesystem (pyarrow.fs.FileSystem): Read a hive-partitioned silver layer through `pyarrow.dataset`
+            on this filesystem, pruning partitions and columns, instead of downloading every file.
+        use_manifest (bool): When `states` is omitted, recompute only the states the silver manifest marks
+            as dirty, then clear them from the manifest. The manifest also records the grouping sets of
+            the run; when they differ from the requested ones, every state is recomputed.
+        use_partials (bool): Build the aggregate from the per-file partials cached by `aggregate_with_partials`,
+            recomputing only the silver files whose ETag changed. `states` and `filesystem` are then ignored.
+        grouping_sets (dict): Gold tables to write, as `{table name: columns}` (e.g. `CUBE_GROUPING_SETS`).
+            Defaults to `DEFAULT_GROUPING_SETS`, the counts by brewery type and state.
+        transfer_config (dict): Multipart settings of the gold uploads, see `build_transfer_config`.
     """
     try:
-        # List all files in the Silver layer
-        response = client.list_objects_v2(Bucket=bucket_name, Prefix=silver_dir)
-        if 'Contents' not in response:
-            raise ValueError(f"No files found in the silver layer: {silver_dir}")
+        grouping_sets = grouping_sets or DEFAULT_GROUPING_SETS
+        group_keys = grouping_keys(grouping_sets)
+
+        # The finest-grain counts are one of the gold tables, or are stored on their own
+        base_name = next((name for name, columns in grouping_sets.items() if set(columns) == set(group_keys)), None)
+        base_s3_key = f"{gold_dir}{base_name}.parquet" if base_name else f"{gold_dir}{GOLD_BASE_NAME}"
+
+        manifest = load_silver_manifest(client, bucket_name, silver_dir) if use_manifest else None
+        requested_sets = {name: list(columns) for name, columns in grouping_sets.items()}
+        if manifest is not None and manifest['partitions']:
+            # The tables of new grouping sets have no previous rows to reuse
+            if manifest.get('grouping_sets') != requested_sets:
+                print(f"Gold grouping sets changed to {sorted(requested_sets)}, recomputing every state.")
+                states = None
+            elif states is None:
+                states = list(manifest['dirty'])
+                print(f"Silver manifest marks {len(states)} dirty partitions: {states}")
+
+        # Reuse the previous aggregate for the states that did not change
+        previous_df = None
+        if states is not None and not use_partials:
+            try:
+                file_obj = client.get_object(Bucket=bucket_name, Key=base_s3_key)
+                previous_df = pd.read_parquet(io.BytesIO(file_obj['Body'].read()))
+                previous_df = previous_df[~previous_df['state'].isin(states)]
+            except ClientError as e:
+                if not object_missing(e):
+                    raise
+                print(f"No previous gold layer found at {base_s3_key}, recomputing every state.")
+                states = None
+            if previous_df is not None and not set(group_keys) <= set(previous_df.columns):
+                print(f"Previous gold layer at {base_s3_key} lacks columns {group_keys}, recomputing every state.")
+                previous_df, states = None, None
+
+        if states is not None and not states and not use_partials:
+            print("No silver partition changed, gold layer left untouched.")
+            return
 
         # Prepare to aggregate data from Silver layer
-        aggregated_data = []
+        aggregated_data = [previous_df[group_keys + ['brewery_count']]] if previous_df is not None else []
+
+        if use_partials:
+            aggregated_data = [aggregate_with_partials(client, bucket_name, silver_dir, gold_dir, max_workers, group_keys)]
+            keys = []
+        elif filesystem is not None:
+            aggregated_data.append(read_silver_dataset_counts(filesystem, bucket_name, silver_dir, states, group_keys))
+            keys = []
+        else:
+            # List all Parquet files in the Silver layer, across every listing page
+            keys = list(iter_keys(client, bucket_name, silver_dir, suffix='.parquet'))
+            if not keys and previous_df is None:
+                raise ValueError(f"No files found in the silver layer: {silver_dir}")
+
+            # Skip the partitions of the states that did not change
+            if states is not None:
+                keys = [file_key for file_key in keys if partition_state(file_key, silver_dir) in states]
+
+        for file_key, aggregated in aggregate_silver_files(client, bucket_name, silver_dir, keys, max_workers, group_keys):
+            aggregated_data.append(aggregated)
 
-        # Loop through each file in the Silver layer
-        for obj in response['Contents']:
-            file_key = obj['Key']
-            
-            # Skip files that are not Parquet
-            if file_key.endswith('.parquet'):
-                file_obj = client.get_object(Bucket=bucket_name, Key=file_key)
-                
-                # Read the content of the file into a BytesIO buffer
-                parquet_file = io.BytesIO(file_obj['Body'].read())
-                
-                # Now load the file into a DataFrame
-                df = pd.read_parquet(parquet_file)
-            
-            # Aggregating by brewery type and state (or location)
-            if 'brewery_type' in df.columns and 'state' in df.columns:
-                aggregated = df.groupby(['brewery_type', 'state']).size().reset_index(name='brewery_count')
-                aggregated_data.append(aggregated)
-            else:
-                print(f"Skipping {file_key} as it doesn't contain 'brewery_type' or 'state' columns.")
-                raise
-        
         # Combine all aggregated data into a single DataFrame
         if aggregated_data:
-            aggregated_df = pd.concat(aggregated_data, ignore_index=True)
+            # A state can be split over several silver files, so partial counts are summed
+            base_df = rollup(pd.concat(aggregated_data, ignore_index=True), group_keys)
+            record_stage(rows_in=int(base_df['brewery_count'].sum()))
 
             # Ensure the gold directory exists
             os.makedirs('/tmp/', exist_ok=True)
 
-            # Save the aggregated data as a Parquet file
-            gold_parquet_file_path = os.path.join('/tmp/', 'brewery_aggregated_by_type_and_location.parquet')
-            aggregated_df.to_parquet(gold_parquet_file_path, index=False)
-            print(f"Aggregated Parquet data saved locally: {gold_parquet_file_path}")
+            for name, columns in grouping_sets.items():
+                # Save the aggregated data of each grouping set as a Parquet file
+                gold_parquet_file_path = os.path.join('/tmp/', f'{name}.parquet')
+                gold_df = rollup(base_df, list(columns))
+                gold_df.to_parquet(gold_parquet_file_path, index=False)
+                record_stage(rows_out=len(gold_df))
+                print(f"Aggregated Parquet data saved locally: {gold_parquet_file_path}")
 
-            # Upload the aggregated Parquet file to the Gold Layer in MinIO
-            try:
-                parquet_s3_key = f"{gold_dir}brewery_aggregated_by_type_and_location.parquet"
-                client.upload_file(gold_parquet_file_path, bucket_name, parquet_s3_key)
-                print(f"Aggregated Parquet uploaded successfully to {bucket_name}/{parquet_s3_key}")
-            except Exception as e:
-                print(f"Error uploading aggregated Parquet file: {e}")
-                raise
+                # Upload the aggregated Parquet file to the Gold Layer in MinIO
+                parquet_s3_key = f"{gold_dir}{name}.parquet"
+                try:
+                    client.upload_file(gold_parquet_file_path, bucket_name, parquet_s3_key, **transfer_kwargs(transfer_config))
+                    print(f"Aggregated Parquet uploaded successfully to {bucket_name}/{parquet_s3_key}")
+                except Exception as e:
+                    print(f"Error uploading aggregated Parquet file: {e}")
+                    raise
+
+            if base_name is None:
+                buffer = io.BytesIO()
+                base_df.to_parquet(buffer, index=False)
+                client.put_object(Bucket=bucket_name, Key=base_s3_key, Body=buffer.getvalue())
+                print(f"Finest-grain counts saved to {bucket_name}/{base_s3_key}")
+
+            # The recomputed states are clean until the silver layer changes them again
+            if manifest is not None and manifest['partitions']:
+                manifest['dirty'] = [state for state in manifest['dirty'] if states is not None and state not in states]
+                manifest['grouping_sets'] = requested_sets
+                save_silver_manifest(client, manifest, bucket_name, silver_dir)
         
         else:
-            print("No valid aggregated data found.")
-            raise
+            raise ValueError("No valid aggregated data found.")
         
     except Exception as e:
         print(f"Error in gold layer processing: {e}")
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,202 @@
+import cProfile
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import psutil
+
+DEFAULT_PROFILES_PREFIX = '_profiles'
+
+class RssSampler:
+    """
+    Sample the resident set size of this process in a background thread and keep the peak.
+
+    Args:
+        interval (float): Seconds between samples.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start_rss = self.peak_rss = self.end_rss = self.process.memory_info().rss
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.end_rss = self.process.memory_info().rss
+        self.peak_rss = max(self.peak_rss, self.end_rss)
+
+def current_map_index():
+    """
+    Map index of the running Airflow task instance.
+
+    Returns:
+        int: The index of a mapped task instance, -1 for unmapped tasks or outside of Airflow.
+    """
+    try:
+        from airflow.operators.python import get_current_context
+        return get_current_context()['ti'].map_index
+    except Exception:
+        return -1
+
+def current_try_number():
+    """
+    Try number of the running Airflow task instance.
+
+    Returns:
+        int: The `AIRFLOW_CTX_TRY_NUMBER` exported to the task process, else the try number
+            of the task instance, 1 outside of Airflow.
+    """
+    try_number = os.getenv('AIRFLOW_CTX_TRY_NUMBER')
+    if try_number:
+        return int(try_number)
+    try:
+        from airflow.operators.python import get_current_context
+        return int(get_current_context()['ti'].try_number)
+    except Exception:
+        return 1
+
+def task_profile_prefix(task_name, prefix=DEFAULT_PROFILES_PREFIX):
+    """
+    Build the bucket prefix of a task report, `<prefix>/<dag_id>/<run_id>/<task_id>/try-<n>/`,
+    from the `AIRFLOW_CTX_*` variables Airflow exports to the task process. Mapped task
+    instances get a `<task_id>/<map_index>/try-<n>/` prefix, and each try its own report,
+    so a retry does not overwrite the profile of the failed try.
+
+    Args:
+        task_name (str): Used as task id outside of Airflow.
+        prefix (str): Root prefix of the reports.
+
+    Returns:
+        str: The prefix, ending with '/'.
+    """
+    dag_id = os.getenv('AIRFLOW_CTX_DAG_ID', 'manual')
+    run_id = os.getenv('AIRFLOW_CTX_DAG_RUN_ID', time.strftime('manual__%Y%m%dT%H%M%S'))
+    task_id = os.getenv('AIRFLOW_CTX_TASK_ID', task_name)
+    map_index = current_map_index()
+    if map_index >= 0:
+        # Each instance of a mapped task gets its own report
+        task_id = f"{task_id}/{map_index}"
+    return f"{prefix}/{dag_id}/{run_id}/{task_id}/try-{current_try_number()}/"
+
+def build_profile_report(profiler, snapshot, sampler, seconds, error=None, top=25):
+    """
+    Summarise a profiled run.
+
+    Args:
+        profiler (cProfile.Profile): Profiler of the run.
+        snapshot (tracemalloc.Snapshot): Allocations still alive at the end of the run, or None.
+        sampler (RssSampler): RSS samples of the run.
+        seconds (float): Wall time of the run.
+        error (str): The exception raised by the run, if any.
+        top (int): Number of functions and allocation sites listed.
+
+    Returns:
+        dict: `summary` (JSON-serialisable), `stats_text` (cProfile table by cumulative time)
+            and `pstats` (marshalled stats, readable with `pstats.Stats`).
+    """
+    stats_stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stats_stream)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+
+    summary = {
+        'seconds': seconds,
+        'error': error,
+        'rss_bytes': {'start': sampler.start_rss, 'end': sampler.end_rss, 'peak': sampler.peak_rss},
+    }
+    if snapshot is not None:
+        current, peak = tracemalloc.get_traced_memory()
+        summary['tracemalloc'] = {
+            'current_bytes': current,
+            'peak_bytes': peak,
+            'top_allocations': [
+                {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:top]
+            ],
+        }
+    return {'summary': summary, 'stats_text': stats_stream.getvalue(), 'pstats': marshal.dumps(stats.stats)}
+
+def upload_profile_report(client, report, bucket_name, report_prefix):
+    """
+    Upload a report of `build_profile_report` as `summary.json`, `profile.txt` and `profile.pstats`.
+
+    Returns:
+        list: The uploaded keys.
+    """
+    objects = {
+        'summary.json': (json.dumps(report['summary'], indent=1).encode('utf-8'), 'application/json'),
+        'profile.txt': (report['stats_text'].encode('utf-8'), 'text/plain'),
+        'profile.pstats': (report['pstats'], 'application/octet-stream'),
+    }
+    keys = []
+    for name, (body, content_type) in objects.items():
+        key = f"{report_prefix}{name}"
+        client.put_object(Bucket=bucket_name, Key=key, Body=body, ContentType=content_type)
+        keys.append(key)
+    print(f"Profile report uploaded to {bucket_name}/{report_prefix}")
+    return keys
+
+def profiled_task(enabled, client_factory, bucket_name='datalake-case', prefix=DEFAULT_PROFILES_PREFIX, trace_memory=True, top=25):
+    """
+    Decorator profiling an Airflow callable with cProfile, tracemalloc and psutil when enabled,
+    and uploading the report under `task_profile_prefix`. The report is uploaded whether the
+    callable succeeds or fails; a failing upload is logged and never fails the task.
+
+    Args:
+        enabled (callable): Called at run time, returns whether to profile (e.g. reads an Airflow Variable).
+        client_factory (callable): Returns the Boto3 client the report is uploaded with.
+        bucket_name (str): MinIO bucket name.
+        prefix (str): Root prefix of the reports.
+        trace_memory (bool): Also trace Python allocations with tracemalloc (slows the task down).
+        top (int): Number of functions and allocation sites listed in the report.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+
+            profiler = cProfile.Profile()
+            started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start()
+            error = None
+            start = time.perf_counter()
+            try:
+                with RssSampler() as sampler:
+                    profiler.enable()
+                    try:
+                        return func(*args, **kwargs)
+                    except BaseException as e:
+                        error = f"{type(e).__name__}: {e}"
+                        raise
+                    finally:
+                        profiler.disable()
+            finally:
+                seconds = time.perf_counter() - start
+                try:
+                    snapshot = tracemalloc.take_snapshot() if trace_memory else None
+                    report = build_profile_report(profiler, snapshot, sampler, seconds, error, top)
+                    upload_profile_report(client_factory(), report, bucket_name, task_profile_prefix(func.__name__, prefix))
+                except Exception as e:
+                    print(f"Error writing the profile report of {func.__name__}: {e}")
+                finally:
+                    if started_tracemalloc:
+                        tracemalloc.stop()
+        return wrapper
+    return decorator
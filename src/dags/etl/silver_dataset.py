@@ -0,0 +1,147 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow.dataset as ds
+from ..conn.object_store import iter_keys, transfer_kwargs, delete_keys
+
+DEFAULT_DATASET_OPTIONS = {
+    'compression': 'zstd',
+    'compression_level': None,
+    'row_group_size': 128 * 1024,
+    'use_dictionary': True,
+    'max_rows_per_file': None,
+}
+
+def partition_values(file_key, silver_dir):
+    """
+    Parse the hive-style partition values (`key=value` directories) of a silver object key.
+
+    Args:
+        file_key (str): Key of the silver object, e.g. `silver_layer/state=texas/part-0.parquet`.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+
+    Returns:
+        dict: Partition values found in the key, e.g. `{'state': 'texas'}`.
+    """
+    directories = file_key[len(silver_dir):].split('/')[:-1]
+    return dict(directory.split('=', 1) for directory in directories if '=' in directory)
+
+def partition_state(file_key, silver_dir):
+    """
+    Return the state a silver object belongs to, for both the hive (`state=texas/`)
+    and the legacy (`texas/`) layouts.
+    """
+    return partition_values(file_key, silver_dir).get('state', file_key[len(silver_dir):].split('/')[0])
+
+def remove_other_layout(client, states, hive, bucket_name='datalake-case', silver_dir='silver_layer/'):
+    """
+    Delete the objects of `states` kept in the other silver layout, e.g. the
+    `texas/breweries_texas.parquet` file of a state just written as `state=texas/`.
+
+    Both layouts map to the same state (see `partition_state`), so once the silver
+    writer is switched, a rewritten partition would otherwise be read twice by the gold layer.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        states (iterable): States whose partitions were just written.
+        hive (bool): Whether they were written in the hive layout (`state=<state>/`) rather than
+            the legacy one (`<state>/breweries_<state>.parquet`).
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+
+    Returns:
+        list: The deleted keys.
+    """
+    # One listing of the silver layer, rather than one per state
+    states = set(states)
+    stale = [
+        key for key in iter_keys(client, bucket_name, silver_dir, suffix='.parquet')
+        if partition_state(key, silver_dir) in states and ('state' in partition_values(key, silver_dir)) != hive
+    ]
+    delete_keys(client, bucket_name, stale)
+    if stale:
+        print(f"{len(stale)} objects of the other silver layout removed from {bucket_name}/{silver_dir}.")
+    return stale
+
+def write_silver_dataset(client, table, bucket_name='datalake-case', silver_dir='silver_layer/', filesystem=None,
+                         max_workers=8, transfer_config=None, **options):
+    """
+    Write the silver layer as a hive-partitioned Parquet dataset (`state=<state>/part-<n>.parquet`).
+
+    The files are written by `pyarrow.dataset.write_dataset`. With a `pyarrow.fs`
+    filesystem (e.g. from `get_arrow_filesystem`) they go straight to the bucket;
+    otherwise they are staged in a temporary directory and uploaded concurrently
+    with the Boto3 client. Either way, older files left in the rewritten partitions
+    are removed.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        table (pa.Table): Cleaned brewery records with a `state` column.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        filesystem (pyarrow.fs.FileSystem): Optional filesystem to write the dataset to directly.
+        max_workers (int): Number of concurrent uploads when staging locally.
+        transfer_config (dict): Multipart settings of the staged uploads, see `build_transfer_config`.
+        **options: Overrides of `DEFAULT_DATASET_OPTIONS`:
+            compression ('zstd', 'snappy', 'gzip', 'none', ...), compression_level,
+            row_group_size (maximum rows per row group), use_dictionary (bool or list of columns)
+            and max_rows_per_file (caps the file size, in rows).
+
+    Returns:
+        list: The keys of the written files.
+    """
+    unknown = set(options) - set(DEFAULT_DATASET_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown silver dataset options: {sorted(unknown)}")
+    if 'state' not in table.column_names:
+        raise ValueError("'state' column is missing in the cleaned data")
+    options = dict(DEFAULT_DATASET_OPTIONS, **options)
+
+    file_options = ds.ParquetFileFormat().make_write_options(
+        compression=options['compression'],
+        compression_level=options['compression_level'],
+        use_dictionary=options['use_dictionary'],
+    )
+    max_rows_per_file = options['max_rows_per_file'] or 0
+    # A row group cannot span files, so it is capped by the file size
+    row_group_size = min(options['row_group_size'], max_rows_per_file or options['row_group_size'])
+    write_kwargs = dict(
+        format='parquet',
+        partitioning=['state'],
+        partitioning_flavor='hive',
+        basename_template='part-{i}.parquet',
+        file_options=file_options,
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=row_group_size,
+        max_rows_per_file=max_rows_per_file,
+        existing_data_behavior='delete_matching',
+    )
+
+    written = []
+    if filesystem is not None:
+        ds.write_dataset(table, f"{bucket_name}/{silver_dir.rstrip('/')}", filesystem=filesystem,
+                         file_visitor=lambda written_file: written.append(written_file.path), **write_kwargs)
+        keys = sorted(path[len(bucket_name) + 1:] for path in written)
+        print(f"Silver dataset written directly with {len(keys)} files to {bucket_name}/{silver_dir}.")
+        return keys
+
+    with tempfile.TemporaryDirectory() as staging_dir:
+        ds.write_dataset(table, staging_dir, file_visitor=lambda written_file: written.append(written_file.path),
+                         **write_kwargs)
+        staged = {silver_dir + os.path.relpath(path, staging_dir).replace(os.sep, '/'): path for path in written}
+        keys = sorted(staged)
+        extra = transfer_kwargs(transfer_config)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda key: client.upload_file(staged[key], bucket_name, key, **extra), keys))
+
+    # Remove files of the rewritten partitions that this run did not produce
+    partitions = {key.rsplit('/', 1)[0] + '/' for key in keys}
+    stale = [
+        key for partition in sorted(partitions)
+        for key in iter_keys(client, bucket_name, partition)
+        if key not in staged
+    ]
+    delete_keys(client, bucket_name, stale)
+
+    print(f"Silver dataset with {len(keys)} files uploaded to {bucket_name}/{silver_dir} ({len(stale)} stale files removed).")
+    return keys
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import pandas as pd
+from botocore.exceptions import ClientError
+from ..conn.object_store import iter_objects, delete_keys, object_missing
+from .silver_dataset import partition_state
+
+SILVER_MANIFEST_NAME = '_manifest.json'
+
+def partition_hash(df):
+    """
+    Compute a content hash of a silver partition that does not depend on row or column order.
+
+    Args:
+        df (pd.DataFrame): Rows of one state partition.
+
+    Returns:
+        str: 32 hex characters (128-bit BLAKE2b digest).
+    """
+    df = df[sorted(df.columns)]
+    if 'id' in df.columns:
+        df = df.sort_values('id', kind='stable')
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[column, str(dtype)] for column, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def load_silver_manifest(client, bucket_name='datalake-case', silver_dir='silver_layer/'):
+    """
+    Load the manifest describing the silver partitions.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+
+    Returns:
+        dict: `partitions` maps each state to its `hash`, `rows`, `bytes` and `keys`; `dirty`
+            lists the states changed since the gold layer last consumed the manifest.
+            Both are empty when no manifest exists yet.
+    """
+    manifest_key = f"{silver_dir}{SILVER_MANIFEST_NAME}"
+    try:
+        file_obj = client.get_object(Bucket=bucket_name, Key=manifest_key)
+    except ClientError as e:
+        if object_missing(e):
+            print(f"No silver manifest found at {manifest_key}, every partition is considered changed.")
+            return {'partitions': {}, 'dirty': []}
+        raise
+    return json.loads(file_obj['Body'].read())
+
+def save_silver_manifest(client, manifest, bucket_name='datalake-case', silver_dir='silver_layer/'):
+    """
+    Save the silver manifest as JSON next to the partitions.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        manifest (dict): Manifest as returned by `load_silver_manifest`.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+    """
+    manifest_key = f"{silver_dir}{SILVER_MANIFEST_NAME}"
+    manifest['dirty'] = sorted(set(manifest['dirty']))
+    body = json.dumps(manifest, sort_keys=True, indent=1).encode('utf-8')
+    client.put_object(Bucket=bucket_name, Key=manifest_key, Body=body, ContentType='application/json')
+    print(f"Silver manifest with {len(manifest['partitions'])} partitions saved to {bucket_name}/{manifest_key}.")
+
+def list_partition_objects(client, bucket_name='datalake-case', silver_dir='silver_layer/'):
+    """
+    Group the Parquet objects of the silver layer by state.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+
+    Returns:
+        dict: Maps each state to `{'keys': [...], 'bytes': total size}`.
+    """
+    partitions = {}
+    for obj in iter_objects(client, bucket_name, silver_dir, suffix='.parquet'):
+        partition = partitions.setdefault(partition_state(obj['Key'], silver_dir), {'keys': [], 'bytes': 0})
+        partition['keys'].append(obj['Key'])
+        partition['bytes'] += obj['Size']
+    return partitions
+
+def diff_partitions(manifest, partition_stats):
+    """
+    Compare freshly computed partitions with the manifest.
+
+    Args:
+        manifest (dict): Manifest as returned by `load_silver_manifest`.
+        partition_stats (dict): Maps each state to its new `hash` and `rows`.
+
+    Returns:
+        tuple: `(changed_states, removed_states)`, both sorted.
+    """
+    changed_states = sorted(
+        state for state, stats in partition_stats.items()
+        if manifest['partitions'].get(state, {}).get('hash') != stats['hash']
+    )
+    removed_states = sorted(set(manifest['partitions']) - set(partition_stats))
+    print(f"{len(changed_states)} of {len(partition_stats)} partitions changed, {len(removed_states)} removed.")
+    return changed_states, removed_states
+
+def apply_partition_changes(client, manifest, partition_stats, changed_states, removed_states, bucket_name='datalake-case', silver_dir='silver_layer/'):
+    """
+    Delete the objects of the removed partitions, record the rewritten ones and mark both
+    as dirty, then save the manifest. Called once the changed partitions are uploaded.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        manifest (dict): Manifest as returned by `load_silver_manifest`.
+        partition_stats (dict): Maps each state to its new `hash` and `rows`.
+        changed_states (list): States whose partitions were rewritten.
+        removed_states (list): States that no longer have rows.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+    """
+    objects = list_partition_objects(client, bucket_name, silver_dir)
+    for state in removed_states:
+        delete_keys(client, bucket_name, objects.get(state, {}).get('keys', []))
+        del manifest['partitions'][state]
+        print(f"Partition {state} no longer has rows and was removed.")
+    for state in changed_states:
+        manifest['partitions'][state] = dict(partition_stats[state], **objects.get(state, {'keys': [], 'bytes': 0}))
+    manifest['dirty'] += changed_states + removed_states
+    save_silver_manifest(client, manifest, bucket_name, silver_dir)
@@ -0,0 +1,238 @@
+import codecs
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ..conn.object_store import open_object, transfer_kwargs
+from ..conn.compression import open_decompressed, split_codec
+
+DEFAULT_BATCH_SIZE = 64 * 1024
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+# Rows buffered across all the state writers before the largest buffer is flushed early
+DEFAULT_MAX_BUFFERED_ROWS = 512 * 1024
+
+def iter_json_array(fileobj, chunk_size=1024 * 1024):
+    """
+    Yield the elements of a JSON array one at a time, reading `fileobj` in chunks.
+
+    Args:
+        fileobj (file-like): Binary stream holding a JSON array, e.g. a `get_object` body.
+        chunk_size (int): Bytes read at a time.
+
+    Yields:
+        The decoded array elements.
+    """
+    decoder = json.JSONDecoder()
+    # Incremental, so a multi-byte character split between two chunks is decoded correctly
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer, position = '', 0
+    started = exhausted = False
+    while True:
+        # Skip whitespace and the punctuation between elements
+        while position < len(buffer) and buffer[position] in ' \t\r\n,' + ('' if started else '['):
+            started = started or buffer[position] == '['
+            position += 1
+        if position < len(buffer):
+            if not started:
+                raise ValueError("Expected a JSON array")
+            if buffer[position] == ']':
+                return
+            try:
+                element, position = decoder.raw_decode(buffer, position)
+                yield element
+                continue
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                if exhausted:
+                    raise
+        elif exhausted:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        chunk = fileobj.read(chunk_size)
+        exhausted = not chunk
+        buffer, position = buffer[position:] + text_decoder.decode(chunk, final=exhausted), 0
+
+def iter_cleaned_batches(client, bucket_name, file_key, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Read a cleaned bronze object in record batches, without holding the whole object.
+
+    Parquet objects (Arrow cleaning engine) are read one row group range at a time with
+    `open_object`; JSON arrays (pandas engines) are decompressed (`.gz`, `.zst`) and decoded
+    element by element from the response stream, and converted like `read_cleaned_frame` does.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        file_key (str): Key of the cleaned object.
+        batch_size (int): Maximum rows per batch.
+
+    Yields:
+        pa.Table: The records of the object, `batch_size` rows at a time.
+    """
+    if file_key.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(open_object(client, bucket_name, file_key))
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield pa.Table.from_batches([batch])
+        return
+
+    body = open_decompressed(client.get_object(Bucket=bucket_name, Key=file_key)['Body'], split_codec(file_key)[1])
+    records = []
+    for record in iter_json_array(body):
+        records.append(record)
+        if len(records) == batch_size:
+            yield pa.Table.from_pandas(pd.DataFrame(records), preserve_index=False)
+            records = []
+    if records:
+        yield pa.Table.from_pandas(pd.DataFrame(records), preserve_index=False)
+
+class PartitionWriter:
+    """
+    Write the rows of one state to a local Parquet file, one row group at a time.
+
+    Rows are buffered until `row_group_size` is reached. The schema is fixed by the
+    first batch (all-null columns are written as strings, the type `clean_data` fills
+    them with); later batches are aligned to it, missing columns becoming nulls.
+
+    Args:
+        path (str): Local file to write.
+        row_group_size (int): Rows per row group.
+    """
+
+    def __init__(self, path, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self.buffered_rows = 0
+        self._buffer = []
+        self._writer = None
+        self._schema = None
+
+    def _align(self, table):
+        if self._schema is None:
+            self._schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema.remove_metadata()
+            ])
+        extra = set(table.column_names) - set(self._schema.names)
+        if extra:
+            raise ValueError(f"Columns {sorted(extra)} are not in the schema of {self.path}")
+        columns = [
+            table.column(field.name).cast(field.type) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+            for field in self._schema
+        ]
+        return pa.Table.from_arrays(columns, schema=self._schema)
+
+    def write(self, table):
+        """
+        Buffer rows, flushing a row group whenever the buffer is full.
+        """
+        self._buffer.append(self._align(table))
+        self.buffered_rows += table.num_rows
+        if self.buffered_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered rows as row groups.
+        """
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(pa.concat_tables(self._buffer), row_group_size=self.row_group_size)
+        self.rows += self.buffered_rows
+        self._buffer, self.buffered_rows = [], 0
+
+    def close(self):
+        """
+        Flush the remaining rows and close the file.
+
+        Returns:
+            dict: `path`, `rows` and `hash` (BLAKE2b of the file) of the written file.
+        """
+        self.flush()
+        self._writer.close()
+        digest = hashlib.blake2b(digest_size=16)
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return {'path': self.path, 'rows': self.rows, 'hash': digest.hexdigest()}
+
+def write_silver_stream(client, keys, local_dir, bucket_name='datalake-case', batch_size=DEFAULT_BATCH_SIZE,
+                        row_group_size=DEFAULT_ROW_GROUP_SIZE, max_buffered_rows=DEFAULT_MAX_BUFFERED_ROWS):
+    """
+    Route the cleaned records to one local Parquet file per state, batch by batch.
+
+    Memory is bounded by `batch_size` plus `max_buffered_rows`, whatever the number of
+    cleaned objects or rows: when the buffers of all the states together exceed
+    `max_buffered_rows`, the largest one is flushed as a (smaller) row group.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (iterable): Keys of the cleaned objects, read one after the other.
+        local_dir (str): Directory of the files, written as `<state>/breweries_<state>.parquet`.
+        bucket_name (str): MinIO bucket name.
+        batch_size (int): Rows read at a time.
+        row_group_size (int): Rows per row group.
+        max_buffered_rows (int): Rows buffered across all the states before an early flush.
+
+    Returns:
+        dict: Maps each state to the `path`, `rows` and `hash` of its file.
+    """
+    writers = {}
+    rows_in = objects_read = 0
+    for file_key in keys:
+        objects_read += 1
+        for table in iter_cleaned_batches(client, bucket_name, file_key, batch_size):
+            if 'state' not in table.column_names:
+                raise ValueError(f"'state' column is missing in the file: {file_key}")
+            rows_in += table.num_rows
+            states = table.column('state')
+            for state in pc.unique(states).to_pylist():
+                writer = writers.get(state)
+                if writer is None:
+                    os.makedirs(os.path.join(local_dir, state), exist_ok=True)
+                    writer = writers[state] = PartitionWriter(os.path.join(local_dir, state, f"breweries_{state}.parquet"), row_group_size)
+                writer.write(table.filter(pc.equal(states, state)))
+
+            while sum(writer.buffered_rows for writer in writers.values()) > max_buffered_rows:
+                max(writers.values(), key=lambda writer: writer.buffered_rows).flush()
+
+    if not writers:
+        raise ValueError(f"No cleaned records found in the {objects_read} objects read from {bucket_name}")
+    files = {state: writer.close() for state, writer in sorted(writers.items())}
+    print(f"{rows_in} rows streamed into {len(files)} state partitions under {local_dir}.")
+    return files
+
+def upload_silver_files(client, files, bucket_name='datalake-case', silver_dir='silver_layer/', max_workers=8, transfer_config=None):
+    """
+    Upload the local partition files of `write_silver_stream` concurrently.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        files (dict): Maps each state to the result of `PartitionWriter.close`.
+        bucket_name (str): MinIO bucket name.
+        silver_dir (str): The directory in the bucket where the silver layer files are stored.
+        max_workers (int): Number of concurrent uploads.
+        transfer_config (dict): Multipart settings of the uploads, see `build_transfer_config`.
+
+    Returns:
+        list: The uploaded keys.
+    """
+    extra = transfer_kwargs(transfer_config)
+
+    def upload(item):
+        state, file_info = item
+        key = f"{silver_dir}{state}/breweries_{state}.parquet"
+        client.upload_file(file_info['path'], bucket_name, key, **extra)
+        return key
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        keys = list(executor.map(upload, sorted(files.items())))
+    print(f"{len(keys)} partitions uploaded to {bucket_name}/{silver_dir}.")
+    return keys
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+from botocore.exceptions import ClientError
+from ..conn.object_store import iter_objects, object_missing
+
+PUBLISHED_SNAPSHOT_KEY = 'bronze_layer/_state/published_snapshot.json'
+
+def expected_etag(part_digests, multipart=True):
+    """
+    ETag S3 and MinIO give an object, computed from the MD5 digests of its parts.
+
+    Args:
+        part_digests (list): MD5 digests (bytes) of the parts; a single digest for a `put_object` upload.
+        multipart (bool): Whether the object is a multipart upload, even of a single part.
+
+    Returns:
+        str: The quoted ETag: the MD5 of the content for single uploads, the MD5 of the
+            concatenated part digests followed by '-<number of parts>' for multipart uploads.
+    """
+    if not multipart:
+        return f'"{part_digests[0].hex()}"'
+    return f'"{hashlib.md5(b"".join(part_digests)).hexdigest()}-{len(part_digests)}"'
+
+def file_etag(path, transfer_config=None):
+    """
+    ETag `upload_file` will give a local file, following the multipart settings of the upload.
+
+    Args:
+        path (str): Local file.
+        transfer_config (dict): Multipart settings of the upload, see `build_transfer_config`.
+
+    Returns:
+        str: The quoted ETag, see `expected_etag`.
+    """
+    transfer_config = transfer_config or {}
+    threshold = transfer_config.get('multipart_threshold', 8 * 1024 * 1024)
+    chunksize = transfer_config.get('multipart_chunksize', 8 * 1024 * 1024)
+    with open(path, 'rb') as f:
+        if os.path.getsize(path) < threshold:
+            return expected_etag([hashlib.md5(f.read()).digest()], multipart=False)
+        return expected_etag([hashlib.md5(chunk).digest() for chunk in iter(lambda: f.read(chunksize), b'')])
+
+def stored_etag(client, bucket_name, key):
+    """
+    ETag of an object, or None when it does not exist.
+    """
+    try:
+        return client.head_object(Bucket=bucket_name, Key=key)['ETag']
+    except ClientError as e:
+        if object_missing(e):
+            return None
+        raise
+
+def snapshot_id(client, keys, bucket_name='datalake-case'):
+    """
+    Identify a bronze snapshot by the keys and ETags of its objects.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        keys (list): Keys of the bronze objects of the run.
+        bucket_name (str): MinIO bucket name.
+
+    Returns:
+        str: 32 hex characters, equal for two runs only if they wrote the same objects with the same content.
+    """
+    # One listing of the common prefix instead of one request per key
+    wanted = set(keys)
+    etags = {obj['Key']: obj['ETag'] for obj in iter_objects(client, bucket_name, os.path.commonprefix(list(keys))) if obj['Key'] in wanted}
+    missing = sorted(wanted - set(etags))
+    if missing:
+        raise ValueError(f"Bronze objects not found: {missing}")
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(sorted(etags.items())).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_published_snapshot(client, bucket_name='datalake-case', key=PUBLISHED_SNAPSHOT_KEY):
+    """
+    Id of the last bronze snapshot whose clean, silver and gold stages completed, or None.
+    """
+    try:
+        return json.loads(client.get_object(Bucket=bucket_name, Key=key)['Body'].read())['snapshot']
+    except ClientError as e:
+        if object_missing(e):
+            return None
+        raise
+
+def save_published_snapshot(client, snapshot, bucket_name='datalake-case', key=PUBLISHED_SNAPSHOT_KEY):
+    """
+    Record that every stage completed for a bronze snapshot, once the gold layer is written.
+    """
+    body = json.dumps({'snapshot': snapshot}).encode('utf-8')
+    client.put_object(Bucket=bucket_name, Key=key, Body=body, ContentType='application/json')
+    print(f"Bronze snapshot {snapshot} published.")
+
+def bronze_changed(client, keys, bucket_name='datalake-case', key=PUBLISHED_SNAPSHOT_KEY):
+    """
+    Compare the bronze snapshot of a run with the last published one, e.g. as the callable of a
+    ShortCircuitOperator: downstream stages only run when the raw data changed or when the
+    previous run did not get to the end.
+
+    Returns:
+        str or None: The snapshot id when it differs from the published one, None when nothing changed.
+    """
+    snapshot = snapshot_id(client, keys, bucket_name)
+    if snapshot == load_published_snapshot(client, bucket_name, key):
+        print(f"Bronze snapshot {snapshot} is unchanged and already published, skipping the downstream stages.")
+        return None
+    return snapshot
@@ -0,0 +1,267 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from opentelemetry import metrics, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+TELEMETRY_EXPORTERS = ('none', 'console', 'file', 'otlp')
+DEFAULT_TELEMETRY_FILE = '/tmp/brewery_telemetry.jsonl'
+# Counters accumulated by every stage; the S3 hooks fill the bytes and objects (bytes_read counts the
+# bodies of whole and ranged GETs only), the stages the rows, the extraction the API counters
+STAGE_COUNTERS = ('rows_in', 'rows_out', 'bytes_read', 'bytes_written', 'objects_read', 'objects_written', 's3_requests', 's3_retries',
+                  'api_requests', 'api_not_modified', 'api_retries')
+
+_tracer = trace.get_tracer('brewery.etl')
+_meter = metrics.get_meter('brewery.etl')
+
+_stage_duration = _meter.create_histogram('brewery.stage.duration', unit='s', description='Duration of a pipeline stage.')
+_stage_counters = {
+    name: _meter.create_counter(f'brewery.stage.{name}', description=f"{name.replace('_', ' ').capitalize()} of a pipeline stage.")
+    for name in STAGE_COUNTERS
+}
+_s3_duration = _meter.create_histogram('brewery.s3.duration', unit='s', description='Duration of an S3 call, retries included.')
+_s3_requests = _meter.create_counter('brewery.s3.requests', description='S3 calls by operation and HTTP status.')
+_s3_bytes = _meter.create_counter('brewery.s3.bytes', unit='By', description='Bytes sent and received by S3 calls.')
+_s3_retries = _meter.create_counter('brewery.s3.retries', description='Retried attempts of S3 calls.')
+
+# (counters, span) of the stages running in this process: S3 calls made from worker threads are
+# attributed to all of them, and their spans are parented to the innermost one
+_active_stages = []
+_active_stages_lock = threading.Lock()
+_providers = {}
+
+# Operations whose payload is an object body, counted as objects read or written by the stage
+READ_OPERATIONS = ('GetObject',)
+WRITE_OPERATIONS = ('PutObject', 'CompleteMultipartUpload')
+
+def build_exporters(exporter, path=None):
+    """
+    Build the span and metric exporters of a telemetry backend.
+
+    Args:
+        exporter (str): 'console' prints to stdout (the task log), 'file' appends one JSON document
+            per line to `path`, 'otlp' sends to the collector of the standard `OTEL_EXPORTER_OTLP_*`
+            environment variables.
+        path (str): File of the 'file' exporter, `DEFAULT_TELEMETRY_FILE` when omitted.
+
+    Returns:
+        tuple: `(span_exporter, metric_exporter)`.
+    """
+    if exporter == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+        return OTLPSpanExporter(), OTLPMetricExporter()
+    if exporter not in ('console', 'file'):
+        raise ValueError(f"Unknown telemetry exporter '{exporter}', expected one of {TELEMETRY_EXPORTERS}.")
+
+    from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    from opentelemetry.sdk.metrics.export import ConsoleMetricExporter
+
+    if exporter == 'file':
+        path = path or DEFAULT_TELEMETRY_FILE
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        out = open(path, 'a')
+    else:
+        out = None
+    # One JSON document per line, so the file can be read back with `pd.read_json(path, lines=True)`
+    span_kwargs = {'formatter': lambda span: span.to_json(indent=None) + os.linesep}
+    metric_kwargs = {'formatter': lambda data: data.to_json(indent=None) + os.linesep}
+    if out is not None:
+        span_kwargs['out'] = metric_kwargs['out'] = out
+    return ConsoleSpanExporter(**span_kwargs), ConsoleMetricExporter(**metric_kwargs)
+
+def configure_telemetry(exporter='none', path=None, service_name='brewery_data_pipeline'):
+    """
+    Install the OpenTelemetry tracer and meter providers of this process, once.
+
+    With 'none' nothing is installed, so the spans and instruments of the pipeline stay
+    no-ops. Telemetry buffered by the providers is exported by `flush_telemetry`.
+
+    Args:
+        exporter (str): One of `TELEMETRY_EXPORTERS`, see `build_exporters`.
+        path (str): File of the 'file' exporter.
+        service_name (str): `service.name` resource attribute of the exported telemetry.
+    """
+    if exporter == 'none' or _providers:
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+
+    span_exporter, metric_exporter = build_exporters(exporter, path)
+    resource = Resource.create({'service.name': service_name})
+    tracer_provider = TracerProvider(resource=resource)
+    tracer_provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    meter_provider = MeterProvider(resource=resource, metric_readers=[PeriodicExportingMetricReader(metric_exporter)])
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(meter_provider)
+    _providers.update(tracer=tracer_provider, meter=meter_provider)
+    print(f"Telemetry of {service_name} exported to {exporter}{f' ({path or DEFAULT_TELEMETRY_FILE})' if exporter == 'file' else ''}.")
+
+def flush_telemetry():
+    """
+    Export the buffered spans and metrics. Airflow task processes can exit without
+    running the exit handlers of the providers, so tasks flush before returning.
+    """
+    for provider in _providers.values():
+        provider.force_flush()
+
+def record_stage(**counts):
+    """
+    Add counts (see `STAGE_COUNTERS`) to every stage running in this process.
+    Does nothing outside of a stage.
+    """
+    with _active_stages_lock:
+        for stats, _ in _active_stages:
+            for name, value in counts.items():
+                stats[name] += value
+
+@contextmanager
+def stage_span(stage, **attributes):
+    """
+    Trace a pipeline stage and record its duration and counters.
+
+    Args:
+        stage (str): Stage name, used as span name and as the `stage` metric attribute.
+        **attributes: Extra span attributes, e.g. the bucket name.
+
+    Yields:
+        dict: The counters of the stage, also filled by `record_stage` and the S3 hooks.
+    """
+    stats = dict.fromkeys(STAGE_COUNTERS, 0)
+    start = time.perf_counter()
+    with _tracer.start_as_current_span(stage, attributes={k: v for k, v in attributes.items() if v is not None}) as span:
+        entry = (stats, span)
+        with _active_stages_lock:
+            _active_stages.append(entry)
+        try:
+            yield stats
+        finally:
+            with _active_stages_lock:
+                # By identity: the counters of two stages can be equal
+                _active_stages[:] = [active for active in _active_stages if active is not entry]
+            span.set_attributes({f'brewery.{name}': value for name, value in stats.items()})
+            metric_attributes = {'stage': stage}
+            _stage_duration.record(time.perf_counter() - start, metric_attributes)
+            for name, value in stats.items():
+                if value:
+                    _stage_counters[name].add(value, metric_attributes)
+
+def traced_stage(stage):
+    """
+    Decorator running a function inside `stage_span(stage)`.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_span(stage, **{'brewery.bucket': kwargs.get('bucket_name')}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_task(exporter='none', path=None):
+    """
+    Decorator for Airflow callables: configures telemetry, traces the callable as a
+    `task.<name>` stage and flushes the telemetry when it returns or fails.
+
+    Args:
+        exporter (str): One of `TELEMETRY_EXPORTERS`.
+        path (str): File of the 'file' exporter.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            configure_telemetry(exporter, path)
+            try:
+                with stage_span(f'task.{func.__name__}'):
+                    return func(*args, **kwargs)
+            finally:
+                flush_telemetry()
+        return wrapper
+    return decorator
+
+def _content_length(headers):
+    try:
+        return int(headers.get('Content-Length') or headers.get('content-length') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _before_parameter_build(params, model, context, **kwargs):
+    # Calls from worker threads have no current span: parent them to the innermost running stage
+    parent = None
+    if not trace.get_current_span().get_span_context().is_valid:
+        with _active_stages_lock:
+            if _active_stages:
+                parent = trace.set_span_in_context(_active_stages[-1][1])
+    context['brewery_telemetry'] = {
+        'start': time.perf_counter(),
+        'span': _tracer.start_span(f's3.{model.name}', context=parent, kind=SpanKind.CLIENT, attributes={
+            'rpc.system': 'aws-api', 'rpc.service': 'S3', 'rpc.method': model.name,
+            'aws.s3.bucket': params.get('Bucket') or '', 'aws.s3.key': params.get('Key') or '',
+        }),
+    }
+
+def _before_send(request, event_name, **kwargs):
+    # Sent once per attempt, with the final headers of the request
+    sent = _content_length(request.headers)
+    _s3_bytes.add(sent, {'operation': event_name.rsplit('.', 1)[-1], 'direction': 'sent'})
+    record_stage(bytes_written=sent)
+
+def _after_call(http_response, parsed, model, context, **kwargs):
+    telemetry = context.pop('brewery_telemetry', None)
+    status_code = http_response.status_code
+    # HEAD answers carry the Content-Length of the object, not of a body
+    received = _content_length(http_response.headers) if model.http.get('method') != 'HEAD' else 0
+    retries = parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+    operation = model.name
+
+    attributes = {'operation': operation, 'status_code': status_code}
+    _s3_requests.add(1, attributes)
+    _s3_bytes.add(received, {'operation': operation, 'direction': 'received'})
+    if retries:
+        _s3_retries.add(retries, {'operation': operation})
+    record_stage(
+        bytes_read=received if operation in READ_OPERATIONS else 0, s3_requests=1, s3_retries=retries,
+        objects_read=int(operation in READ_OPERATIONS and status_code < 300),
+        objects_written=int(operation in WRITE_OPERATIONS and status_code < 300),
+    )
+    if telemetry is not None:
+        _s3_duration.record(time.perf_counter() - telemetry['start'], attributes)
+        span = telemetry['span']
+        span.set_attributes({'http.response.status_code': status_code, 'aws.retry_attempts': retries, 'brewery.bytes_received': received})
+        if status_code >= 400:
+            span.set_status(Status(StatusCode.ERROR, parsed.get('Error', {}).get('Code', str(status_code))))
+        span.end()
+
+def _after_call_error(exception, context, **kwargs):
+    # Raised without a response, e.g. connection errors once the retries are exhausted
+    telemetry = context.pop('brewery_telemetry', None)
+    _s3_requests.add(1, {'operation': kwargs.get('event_name', '').rsplit('.', 1)[-1], 'status_code': 0})
+    if telemetry is not None:
+        span = telemetry['span']
+        span.record_exception(exception)
+        span.set_status(Status(StatusCode.ERROR, type(exception).__name__))
+        span.end()
+
+def instrument_client(client):
+    """
+    Trace every call of a boto3 S3 client and record its duration, bytes and retries.
+    Registering twice on the same client is a no-op.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+
+    Returns:
+        boto3.client: The same client.
+    """
+    events = client.meta.events
+    events.register('before-parameter-build.s3', _before_parameter_build, unique_id='brewery-telemetry-before-parameter-build')
+    events.register('before-send.s3', _before_send, unique_id='brewery-telemetry-before-send')
+    events.register('after-call.s3', _after_call, unique_id='brewery-telemetry-after-call')
+    events.register('after-call-error.s3', _after_call_error, unique_id='brewery-telemetry-after-call-error')
+    return client
@@ -1,9 +1,322 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+import io
 import os
 import json
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from ..conn.minio_conn import get_boto3_client
+from ..conn.object_store import iter_keys, transfer_kwargs, fetch_objects
+from ..conn.compression import codec_suffix, codec_suffixes, compress_bytes, decompress_bytes, object_stem, open_decompressed, split_codec
+from .telemetry import traced_stage, stage_span, record_stage, instrument_client
 
-def clean_data(client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw', cleaned_dir='bronze_layer/cleaned'):
+CLEAN_ENGINES = ('python', 'vectorized', 'arrow')
+# Keys of the raw objects, with their compressed variants
+RAW_SUFFIXES = codec_suffixes(('.json', '.jsonl'))
+
+# Python's `\s` on ASCII text, written for RE2 (pyarrow), whose own `\s` skips \v and \x1c-\x1f
+ASCII_WHITESPACE_PATTERN = r'[\t\n\x{0b}\x{0c}\r\x{1c}-\x{1f} ]+'
+
+# Every character matched by Python's `\s` on str, written for RE2
+UNICODE_WHITESPACE_PATTERN = (
+    r'[\t\n\x{0b}\x{0c}\r\x{1c}-\x{1f} \x{85}\x{a0}\x{1680}\x{2000}-\x{200a}'
+    r'\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}]+'
+)
+
+def load_records(body, file_key):
+    """
+    Parse the records of a raw bronze object.
+
+    Args:
+        body (file-like): Body of the object, e.g. the `Body` of `get_object`.
+        file_key (str): Key of the object; `.jsonl` objects are read as newline-delimited JSON,
+            `.gz` and `.zst` objects are decompressed while they are read.
+
+    Returns:
+        list: The records stored in the object.
+    """
+    file_key, codec = split_codec(file_key)
+    if codec != 'none':
+        body = open_decompressed(body, codec)
+    if file_key.endswith('.jsonl'):
+        lines = body.iter_lines() if hasattr(body, 'iter_lines') else body
+        return [json.loads(line) for line in lines if line.strip()]
+    return json.load(body)
+
+def normalize_value(value):
+    """
+    Lowercase a string and replace each run of whitespace with an underscore.
+    Non-string values are returned unchanged.
+    """
+    return re.sub(r'\s+', '_', str(value).lower()) if isinstance(value, str) else value
+
+def normalize_series_vectorized(series):
+    """
+    Vectorized equivalent of `series.map(normalize_value)` built on pyarrow compute kernels.
+
+    ASCII strings are lowercased and have their whitespace runs replaced by
+    `ascii_lower` and `replace_substring_regex`. The few non-ASCII strings go
+    through `normalize_value`, since Unicode lowercasing and whitespace rules
+    differ slightly between Python and Arrow. Non-string values are left as they
+    are and missing values come back as None.
+
+    Args:
+        series (pd.Series): Column of object dtype.
+
+    Returns:
+        pd.Series: The normalized column, with the same index.
+    """
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind == 'empty':
+        return series
+    is_string = None
+    if kind == 'string':
+        strings = series
+    else:
+        # Mixed column: only the string cells are normalized
+        is_string = series.map(lambda x: isinstance(x, str)).astype(bool)
+        if not is_string.any():
+            return series
+        strings = series[is_string]
+
+    array = pa.array(strings, type=pa.string(), from_pandas=True)
+    normalized = pc.replace_substring_regex(
+        pc.ascii_lower(array), pattern=ASCII_WHITESPACE_PATTERN, replacement='_'
+    ).to_pandas()
+    normalized.index = strings.index
+
+    non_ascii = pc.invert(pc.fill_null(pc.string_is_ascii(array), True)).to_numpy(zero_copy_only=False)
+    if non_ascii.any():
+        normalized[non_ascii] = strings[non_ascii].map(normalize_value)
+
+    if is_string is None:
+        return normalized
+    result = series.copy()
+    result[is_string] = normalized
+    return result
+
+def clean_dataframe(df, engine='python'):
+    """
+    Apply the bronze cleaning rules to a DataFrame.
+
+    Replaces spaces with underscores in column names, lowercases string values
+    and replaces whitespace runs in them with underscores, then fills nulls with 'unknown'.
+
+    Args:
+        df (pd.DataFrame): Normalized raw brewery data.
+        engine (str): 'python' maps a regex over every cell; 'vectorized' uses pyarrow
+            compute kernels and gives the same output.
+
+    Returns:
+        pd.DataFrame: The cleaned DataFrame.
+    """
+    if engine not in ('python', 'vectorized'):
+        raise ValueError(f"Unknown DataFrame cleaning engine '{engine}', expected 'python' or 'vectorized'.")
+
+    # Replace spaces in column names with underscores
+    df.columns = [col.replace(' ', '_') for col in df.columns]
+
+    # Replace spaces in data values with underscores and convert to lowercase
+    for column in df.select_dtypes(include='object').columns:  # Only string columns
+        if engine == 'vectorized':
+            df[column] = normalize_series_vectorized(df[column])
+        else:
+            df[column] = df[column].map(normalize_value)
+
+    # Replace null values with 'Unknown' (numeric columns with nulls become object columns)
+    df = df.astype({column: object for column in df.columns[df.isna().any()]}).fillna('unknown')
+    return df
+
+def read_raw_table(data, file_key):
+    """
+    Read a raw bronze object into an Arrow table.
+
+    Newline-delimited JSON is parsed by `pyarrow.json` without building Python
+    objects. Legacy JSON arrays are not supported by that reader, so they are
+    parsed with `json` and converted once.
+
+    Args:
+        data (bytes): Content of the raw object.
+        file_key (str): Key of the object; `.jsonl` objects are read as newline-delimited JSON,
+            `.gz` and `.zst` objects are decompressed first.
+
+    Returns:
+        pa.Table: The raw records, with nested objects as struct columns.
+    """
+    file_key, codec = split_codec(file_key)
+    data = decompress_bytes(data, codec)
+    if not data.strip():
+        return pa.table({})
+    if file_key.endswith('.jsonl'):
+        return pa_json.read_json(io.BytesIO(data))
+    records = json.loads(data)
+    if not records:
+        return pa.table({})
+    return pa.Table.from_struct_array(pa.array(records))
+
+def clean_table(table):
+    """
+    Apply the bronze cleaning rules to an Arrow table using only Arrow compute kernels.
+
+    Struct columns are flattened into `parent.child` columns (like `pd.json_normalize`),
+    spaces in column names become underscores, string values are lowercased with
+    `utf8_lower` and whitespace runs replaced by underscores, and nulls in string
+    columns become 'unknown'. All-null columns become 'unknown' strings; other typed
+    columns keep their nulls, since Parquet cannot mix strings into them.
+
+    `utf8_lower` maps one code point at a time, so a few characters lowercase
+    differently than with Python (e.g. 'İ' becomes 'i' instead of 'i̇').
+
+    Args:
+        table (pa.Table): Raw brewery records.
+
+    Returns:
+        pa.Table: The cleaned table.
+    """
+    while any(pa.types.is_struct(field.type) for field in table.schema):
+        table = table.flatten()
+
+    names = [name.replace(' ', '_') for name in table.column_names]
+    columns = []
+    for column in table.columns:
+        if pa.types.is_null(column.type):
+            column = pc.fill_null(column.cast(pa.string()), 'unknown')
+        elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            column = pc.replace_substring_regex(
+                pc.utf8_lower(column), pattern=UNICODE_WHITESPACE_PATTERN, replacement='_'
+            )
+            column = pc.fill_null(column, 'unknown')
+        columns.append(column)
+    return pa.table(columns, names=names)
+
+def clean_object_arrow(client, bucket_name, file_key, cleaned_dir, codec='none', content=None):
+    """
+    Clean one raw object with the Arrow engine and store it as Parquet in the cleaned layer.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        file_key (str): Key of the raw object.
+        cleaned_dir (str): Prefix of the cleaned layer folder in the bucket.
+        codec (str): 'gzip' or 'zstd' compress the Parquet pages (recorded in the file metadata,
+            so column and range reads still work); 'none' keeps the Parquet default.
+        content (bytes): Content of the raw object, when it was already downloaded.
+
+    Returns:
+        str: The key of the cleaned Parquet object.
+    """
+    if content is None:
+        content = client.get_object(Bucket=bucket_name, Key=file_key)['Body'].read()
+    table = clean_table(read_raw_table(content, file_key))
+    record_stage(rows_in=table.num_rows, rows_out=table.num_rows)
+
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, **({} if codec == 'none' else {'compression': codec}))
+    cleaned_key = f'{cleaned_dir}/{object_stem(file_key)}.parquet'
+    client.put_object(Bucket=bucket_name, Key=cleaned_key, Body=buffer.getvalue())
+    print(f"File {file_key} cleaned ({table.num_rows} rows) and uploaded to {bucket_name}/{cleaned_key}")
+    return cleaned_key
+
+def clean_object(client, bucket_name, file_key, cleaned_dir, engine='python', transfer_config=None, codec='none', content=None):
+    """
+    Clean one raw object and upload the result to the cleaned layer.
+
+    Args:
+        client (boto3.client): The Boto3 client configured for MinIO.
+        bucket_name (str): MinIO bucket name.
+        file_key (str): Key of the raw object.
+        cleaned_dir (str): Prefix of the cleaned layer folder in the bucket.
+        engine (str): Cleaning engine, see `clean_data`.
+        transfer_config (dict): Multipart settings of the upload, see `build_transfer_config`.
+        codec (str): Compression of the cleaned object, see `clean_data`.
+        content (bytes): Content of the raw object, when it was already downloaded (e.g. by `fetch_objects`).
+
+    Returns:
+        str: The key of the cleaned object.
+    """
+    if engine == 'arrow':
+        return clean_object_arrow(client, bucket_name, file_key, cleaned_dir, codec, content)
+
+    # Download the JSON file, unless it was prefetched
+    body = client.get_object(Bucket=bucket_name, Key=file_key)['Body'] if content is None else io.BytesIO(content)
+    breweries = load_records(body, file_key)
+
+    # Convert JSON data into a Pandas DataFrame and clean it
+    df = clean_dataframe(pd.json_normalize(breweries), engine=engine)
+    record_stage(rows_in=len(breweries), rows_out=len(df))
+
+    # Save cleaned data locally (always as a JSON array, whatever the raw format)
+    cleaned_file_name = object_stem(file_key) + '.json' + codec_suffix(codec)
+    cleaned_file_path = os.path.join("/tmp/", cleaned_file_name)
+    if codec == 'none':
+        df.to_json(cleaned_file_path, orient='records')
+    else:
+        with open(cleaned_file_path, 'wb') as f:
+            f.write(compress_bytes(df.to_json(orient='records').encode('utf-8'), codec))
+    print(f"Cleaned data saved locally: {cleaned_file_path}")
+
+    try:
+        client.upload_file(cleaned_file_path, bucket_name, f'{cleaned_dir}/{cleaned_file_name}', **transfer_kwargs(transfer_config))
+        print(f"File {file_key} uploaded successfully to {bucket_name}/{cleaned_dir}/")
+    except Exception as e:
+        print(f"Error uploading file: {e}")
+        raise
+    return f'{cleaned_dir}/{cleaned_file_name}'
+
+# S3 client owned by each worker process of the parallel mode (boto3 clients cannot be pickled)
+_worker_client = None
+
+def _init_clean_worker(client_config):
+    global _worker_client
+    _worker_client = instrument_client(get_boto3_client(**client_config))
+
+def _clean_object_in_worker(bucket_name, file_key, cleaned_dir, engine, transfer_config=None, codec='none'):
+    """
+    Clean one object in a worker process and report the outcome instead of raising,
+    so one bad object does not hide the results of the others. The stage counters of
+    the object are returned too, since the parent cannot see the worker's S3 calls.
+    """
+    start = time.perf_counter()
+    with stage_span('clean.object', **{'brewery.key': file_key}) as stats:
+        try:
+            cleaned_key = clean_object(_worker_client, bucket_name, file_key, cleaned_dir, engine, transfer_config, codec)
+            error = None
+        except Exception as e:
+            cleaned_key, error = None, f"{type(e).__name__}: {e}"
+    return {'key': file_key, 'cleaned_key': cleaned_key, 'error': error, 'seconds': time.perf_counter() - start, 'stats': stats}
+
+def clean_objects_parallel(keys, client_config, bucket_name='datalake-case', cleaned_dir='bronze_layer/cleaned', engine='python', max_workers=4,
+                           transfer_config=None, codec='none'):
+    """
+    Clean raw objects in a process pool, one object per task.
+
+    Each worker process builds its own S3 client from `client_config`.
+
+    Args:
+        keys (list): Keys of the raw objects to clean.
+        client_config (dict): Keyword arguments of `get_boto3_client` (endpoint, access_key, secret_key).
+        bucket_name (str): MinIO bucket name.
+        cleaned_dir (str): Prefix of the cleaned layer folder in the bucket.
+        engine (str): Cleaning engine, see `clean_data`.
+        max_workers (int): Number of worker processes.
+        transfer_config (dict): Multipart settings of the uploads, see `build_transfer_config`.
+        codec (str): Compression of the cleaned objects, see `clean_data`.
+
+    Returns:
+        list: One result per object, in input order: dicts with `key`, `cleaned_key`, `error`, `seconds`
+            and `stats` (the stage counters of the object, see `stage_span`).
+    """
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_clean_worker, initargs=(client_config,)) as executor:
+        futures = [executor.submit(_clean_object_in_worker, bucket_name, key, cleaned_dir, engine, transfer_config, codec) for key in keys]
+        return [future.result() for future in futures]
+
+@traced_stage('clean')
+def clean_data(client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw', cleaned_dir='bronze_layer/cleaned', keys=None, engine='python',
+               max_workers=1, client_config=None, transfer_config=None, codec='none', download_workers=8):
     """
     Clean raw JSON data from the specified MinIO bucket and save cleaned files locally.
     Replaces spaces with underscores in column names and data values.
@@ -13,54 +326,60 @@ def clean_data(client, bucket_name='datalake-case', raw_prefix='bronze_layer/raw
         bucket_name (str): MinIO bucket name.
         raw_prefix (str): Prefix of the raw layer folder in the bucket.
         cleaned_dir (str): Local directory to store cleaned JSON files.
+        keys (list): Raw object keys to clean. When omitted, every object under `raw_prefix` is cleaned.
+        engine (str): Cleaning engine, 'python' (default) or 'vectorized', which give the same JSON output,
+            or 'arrow', which skips pandas entirely and writes Parquet (see `clean_table`).
+        max_workers (int): Number of processes cleaning objects in parallel. Above 1, `client_config`
+            is required so each worker process can open its own S3 client.
+        client_config (dict): Keyword arguments of `get_boto3_client` used by the worker processes.
+        transfer_config (dict): Multipart settings of the uploads, see `build_transfer_config`.
+        codec (str): Compression of the cleaned objects: 'none', 'gzip' or 'zstd'. JSON objects get a
+            '.gz' or '.zst' suffix; Parquet objects of the 'arrow' engine use it as Parquet compression.
+            Raw objects are decompressed according to their own key suffix.
+        download_workers (int): Without worker processes, number of raw objects downloaded concurrently
+            while the current one is cleaned.
+
+    Returns:
+        list: The keys of the cleaned objects.
     """
+    if engine not in CLEAN_ENGINES:
+        raise ValueError(f"Unknown cleaning engine '{engine}', expected one of {CLEAN_ENGINES}.")
+    codec_suffix(codec)
+    if max_workers > 1 and not client_config:
+        raise ValueError("client_config is required to clean objects in parallel.")
+
     try:
         # Ensure the cleaned directory exists
         os.makedirs("tmp/cleaned", exist_ok=True)
 
-        # List all files in the raw layer
-        response = client.list_objects_v2(Bucket=bucket_name, Prefix=raw_prefix)
-        if 'Contents' not in response:
-            raise ValueError(f"No files found in the raw layer: {raw_prefix}")
-
-        for obj in response['Contents']:
-            file_key = obj['Key']
-            if not file_key.endswith('.json'):
-                continue  # Skip non-JSON files
-            
-            # Download the JSON file
-            file_obj = client.get_object(Bucket=bucket_name, Key=file_key)
-            breweries = json.load(file_obj['Body'])
-
-            # Convert JSON data into a Pandas DataFrame
-            df = pd.json_normalize(breweries)
-
-            # Replace spaces in column names with underscores
-            df.columns = [col.replace(' ', '_') for col in df.columns]
-
-            # Replace spaces in data values with underscores and convert to lowercase
-            # Use `map` to replace spaces in data values with underscores and convert to lowercase
-            for column in df.select_dtypes(include='object').columns:  # Apply `map` only to string columns
-                df[column] = df[column].map(
-                    lambda x: re.sub(r'\s+', '_', str(x).lower()) if isinstance(x, str) else x
-                )
-
-            # Replace null values with 'Unknown'
-            df.fillna('unknown', inplace=True)
-
-            # Save cleaned data locally
-            cleaned_file_path = os.path.join("/tmp/", os.path.basename(file_key))
-            df.to_json(cleaned_file_path, orient='records')
-            print(f"Cleaned data saved locally: {cleaned_file_path}")
-
-            try:
-                client.upload_file(cleaned_file_path, bucket_name, f'bronze_layer/cleaned/{os.path.basename(file_key)}')
-                print(f"File {file_key} uploaded successfully to {bucket_name}/bronze_layer/cleaned/")
-            except Exception as e:
-                print(f"Error uploading file: {e}")
-                raise
+        if keys is None:
+            # List all files in the raw layer, across every listing page
+            keys = list(iter_keys(client, bucket_name, raw_prefix))
+            if not keys:
+                raise ValueError(f"No files found in the raw layer: {raw_prefix}")
+
+        # Skip non-JSON files
+        keys = [file_key for file_key in keys if file_key.endswith(RAW_SUFFIXES)]
+
+        if max_workers > 1:
+            results = clean_objects_parallel(keys, client_config, bucket_name, cleaned_dir, engine, max_workers, transfer_config, codec)
+            for result in results:
+                record_stage(**result['stats'])
+                status = f"failed ({result['error']})" if result['error'] else f"-> {result['cleaned_key']}"
+                print(f"{result['key']} {status} in {result['seconds']:.2f}s")
+            failed = [result['key'] for result in results if result['error']]
+            if failed:
+                raise RuntimeError(f"{len(failed)} of {len(results)} objects failed to clean: {failed}")
+            cleaned_keys = [result['cleaned_key'] for result in results]
+        else:
+            # The next objects download while the current one is cleaned, in key order
+            cleaned_keys = [
+                clean_object(client, bucket_name, file_key, cleaned_dir, engine, transfer_config, codec, content)
+                for file_key, content in fetch_objects(client, bucket_name, keys, max_workers=download_workers)
+            ]
 
         print("All raw data cleaned and saved successfully.")
+        return cleaned_keys
     except Exception as e:
         print(f"Error cleaning data: {e}")
         raise
@@ -0,0 +1,74 @@
+import os
+
+# Settings of the brewery pipeline, read from the Airflow environment (`environment` block of compose.yaml).
+# Kept out of the DAG module so the benchmarks run the stages with the same settings without importing Airflow.
+
+# Incremental mode: only new, changed and deleted breweries flow through clean, silver and gold
+INCREMENTAL = os.getenv('BREWERY_INCREMENTAL', 'false').lower() in ('1', 'true', 'yes')
+# Compression of the raw and cleaned bronze objects: 'none', 'gzip' (.gz) or 'zstd' (.zst); readers pick the codec from the key
+BRONZE_CODEC = os.getenv('BREWERY_BRONZE_CODEC', 'gzip')
+# Persist fetched pages under bronze_layer/_checkpoints, so a retry of the fetch task only requests the missing pages
+PAGE_CHECKPOINTS = os.getenv('BREWERY_PAGE_CHECKPOINTS', 'true').lower() in ('1', 'true', 'yes')
+# Requests per second sent to the brewery API by all the fetch workers (0 disables the client-side limit);
+# 429 and 5xx answers pause every worker for the server's Retry-After
+API_RATE_LIMIT = float(os.getenv('BREWERY_API_RATE_LIMIT', '10'))
+# Send If-None-Match / If-Modified-Since with the validators of the previous run, kept in bronze_layer/_state/http_cache.json.gz;
+# unchanged pages are read back from the previous bronze shards, so it only applies to full (non-incremental) runs
+API_CONDITIONAL_REQUESTS = os.getenv('BREWERY_API_CONDITIONAL_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+# Cleaning engine: 'python', 'vectorized' (same JSON output, faster) or 'arrow' (Parquet output, no pandas)
+CLEAN_ENGINE = os.getenv('BREWERY_CLEAN_ENGINE', 'python')
+# Number of processes cleaning raw objects in parallel (1 keeps the sequential loop)
+CLEAN_WORKERS = int(os.getenv('BREWERY_CLEAN_WORKERS', '1'))
+# Serialise silver partitions in memory and upload them concurrently instead of staging them under /tmp
+SILVER_IN_MEMORY = os.getenv('BREWERY_SILVER_IN_MEMORY', 'false').lower() in ('1', 'true', 'yes')
+# Raw objects are written in shards of this many records, each cleaned by its own mapped task
+BRONZE_SHARD_RECORDS = int(os.getenv('BREWERY_BRONZE_SHARD_RECORDS', '2000'))
+# Maximum number of mapped silver tasks, each writing the partitions of a group of states ('pandas' writer;
+# 0 builds the whole layer in one task, like the other writers and the incremental mode)
+SILVER_SHARDS = int(os.getenv('BREWERY_SILVER_SHARDS', '8'))
+# Full builds clean the raw shards and write the silver partitions in a single task, skipping the cleaned layer round trip
+FUSED_CLEAN_SILVER = os.getenv('BREWERY_FUSED_CLEAN_SILVER', 'false').lower() in ('1', 'true', 'yes') and not INCREMENTAL
+# Fused mode: also write the cleaned objects to bronze_layer/cleaned, for other consumers of that layer
+FUSED_CLEANED_OUTPUT = os.getenv('BREWERY_FUSED_CLEANED_OUTPUT', 'false').lower() in ('1', 'true', 'yes')
+# Silver writer for full builds: 'pandas' (one file per state), 'dataset' (hive `state=` dataset written and read through pyarrow)
+# or 'stream' (same files as 'pandas', built batch by batch so memory does not grow with the data)
+SILVER_WRITER = os.getenv('BREWERY_SILVER_WRITER', 'pandas')
+# Parquet settings of the 'dataset' writer
+SILVER_DATASET_OPTIONS = {
+    'compression': os.getenv('BREWERY_SILVER_COMPRESSION', 'zstd'),
+    'row_group_size': int(os.getenv('BREWERY_SILVER_ROW_GROUP_SIZE', str(128 * 1024))),
+    'max_rows_per_file': int(os.getenv('BREWERY_SILVER_MAX_ROWS_PER_FILE', '0')) or None,
+}
+# Settings of the 'stream' writer: rows read at a time, rows per row group and rows buffered across states
+SILVER_STREAM_OPTIONS = {
+    'batch_size': int(os.getenv('BREWERY_SILVER_BATCH_SIZE', str(64 * 1024))),
+    'row_group_size': int(os.getenv('BREWERY_SILVER_ROW_GROUP_SIZE', str(128 * 1024))),
+    'max_buffered_rows': int(os.getenv('BREWERY_SILVER_MAX_BUFFERED_ROWS', str(512 * 1024))),
+}
+# Keep a content-hash manifest of the silver partitions: unchanged states are not rewritten nor re-aggregated
+SILVER_MANIFEST = os.getenv('BREWERY_SILVER_MANIFEST', 'true').lower() in ('1', 'true', 'yes')
+# Build gold from per-file partial counts cached by silver ETag, so only changed files are read again
+GOLD_PARTIALS = os.getenv('BREWERY_GOLD_PARTIALS', 'true').lower() in ('1', 'true', 'yes')
+# Also write the counts by country, city, type and country x type, computed in the same pass over silver
+GOLD_CUBE = os.getenv('BREWERY_GOLD_CUBE', 'true').lower() in ('1', 'true', 'yes')
+
+# MinIO connection settings; tasks share one pooled client per process, worker processes open their own
+MINIO_CLIENT_CONFIG = {'endpoint': 'http://minio:9000', 'access_key': 'testtamura', 'secret_key': 'testtamura'}
+# Connection pool and retry settings of the shared client, see `build_client_config`
+S3_CLIENT_SETTINGS = {
+    'max_pool_connections': int(os.getenv('BREWERY_S3_MAX_POOL_CONNECTIONS', '50')),
+    'retry_mode': os.getenv('BREWERY_S3_RETRY_MODE', 'adaptive'),
+}
+# Multipart settings of every upload, see `build_transfer_config` (the bronze stream uses the same part size)
+TRANSFER_CONFIG = {
+    'multipart_threshold': int(os.getenv('BREWERY_S3_MULTIPART_THRESHOLD_MB', '8')) * 1024 * 1024,
+    'multipart_chunksize': int(os.getenv('BREWERY_S3_MULTIPART_CHUNKSIZE_MB', '8')) * 1024 * 1024,
+    'max_concurrency': int(os.getenv('BREWERY_S3_MAX_CONCURRENCY', '10')),
+    'use_threads': os.getenv('BREWERY_S3_USE_THREADS', 'true').lower() in ('1', 'true', 'yes'),
+}
+# OpenTelemetry spans and metrics of every task, stage and S3 call: 'none', 'console' (task log), 'file' (JSON lines) or 'otlp'
+TELEMETRY_EXPORTER = os.getenv('BREWERY_OTEL_EXPORTER', 'none')
+TELEMETRY_FILE = os.getenv('BREWERY_OTEL_FILE', '/tmp/brewery_telemetry.jsonl')
+
+# Profile every task of every run; a single run can be profiled with the conf {"profile": true}
+PROFILE = os.getenv('BREWERY_PROFILE', 'false').lower() in ('1', 'true', 'yes')
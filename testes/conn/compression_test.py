@@ -0,0 +1,66 @@
+import unittest
+import gzip
+import io
+from dags.conn.compression import (Compressor, compress_bytes, decompress_bytes, open_decompressed, split_codec, codec_suffix,
+                                   codec_suffixes, object_stem)
+
+DATA = b''.join(b'{"id": "%d", "brewery_type": "micro", "state": "texas"}\n' % i for i in range(20000))
+
+
+class TestCompressor(unittest.TestCase):
+
+    def test_streamed_output_matches_one_shot_output(self):
+        """
+        Test that compressing chunk by chunk gives the bytes of `compress_bytes` and decompresses back.
+        """
+        for codec in ('none', 'gzip', 'zstd'):
+            with self.subTest(codec=codec):
+                compressor = Compressor(codec)
+                streamed = b''.join(compressor.compress(DATA[i:i + 4096]) for i in range(0, len(DATA), 4096)) + compressor.flush()
+                self.assertEqual(streamed, compress_bytes(DATA, codec))
+                self.assertEqual(decompress_bytes(streamed, codec), DATA)
+
+    def test_repetitive_json_shrinks(self):
+        """
+        Test that the brewery-like NDJSON shrinks well over 5x with both codecs.
+        """
+        self.assertGreater(len(DATA) / len(compress_bytes(DATA, 'gzip')), 5)
+        self.assertGreater(len(DATA) / len(compress_bytes(DATA, 'zstd')), 5)
+
+    def test_gzip_output_is_deterministic_and_standard(self):
+        """
+        Test that gzip output has a zero mtime, so equal content gives equal objects, and is readable by `gzip`.
+        """
+        compressed = compress_bytes(DATA, 'gzip')
+        self.assertEqual(compressed[4:8], b'\x00\x00\x00\x00')
+        self.assertEqual(gzip.decompress(compressed), DATA)
+
+    def test_open_decompressed_reads_lines_while_streaming(self):
+        """
+        Test that compressed bodies can be read line by line without decompressing them first.
+        """
+        for codec in ('gzip', 'zstd'):
+            with self.subTest(codec=codec):
+                body = open_decompressed(io.BytesIO(compress_bytes(DATA, codec)), codec)
+                self.assertEqual(body.readline(), DATA.split(b'\n')[0] + b'\n')
+                self.assertEqual(sum(1 for _ in body), 19999)
+
+
+class TestCodecSuffixes(unittest.TestCase):
+
+    def test_suffix_helpers(self):
+        """
+        Test that the codec is recorded in and read back from the key suffix.
+        """
+        self.assertEqual(split_codec('raw/a.jsonl.gz'), ('raw/a.jsonl', 'gzip'))
+        self.assertEqual(split_codec('raw/a.jsonl.zst'), ('raw/a.jsonl', 'zstd'))
+        self.assertEqual(split_codec('raw/a.jsonl'), ('raw/a.jsonl', 'none'))
+        self.assertEqual(codec_suffix('zstd'), '.zst')
+        self.assertEqual(codec_suffixes('.json'), ('.json', '.json.gz', '.json.zst'))
+        self.assertEqual(object_stem('raw/bronze_breweries-00001.jsonl.gz'), 'bronze_breweries-00001')
+        with self.assertRaises(ValueError):
+            codec_suffix('lzma')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from dags.conn.minio_conn import get_boto3_client
+from dags.conn.minio_conn import get_boto3_client, get_cached_boto3_client, build_client_config
 from botocore.exceptions import NoCredentialsError, ClientError
 
 class TestGetBoto3Client(unittest.TestCase):
@@ -86,3 +86,35 @@ class TestGetBoto3Client(unittest.TestCase):
             get_boto3_client(endpoint, access_key, secret_key)
         
         self.assertIn("Client error", str(context.exception))
+
+
+class TestGetCachedBoto3Client(unittest.TestCase):
+
+    @patch("boto3.client")
+    def test_client_is_cached_per_settings(self, mock_boto_client):
+        """
+        Test that a client is built once per endpoint, credentials and settings, with the tuned config.
+        """
+        mock_boto_client.side_effect = lambda *args, **kwargs: MagicMock()
+
+        first = get_cached_boto3_client("http://cache-test:9000", "test-access", "test-secret", max_pool_connections=64)
+        second = get_cached_boto3_client("http://cache-test:9000", "test-access", "test-secret", max_pool_connections=64)
+        other = get_cached_boto3_client("http://cache-test:9000", "test-access", "test-secret", max_pool_connections=8)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(mock_boto_client.call_count, 2)
+        config = mock_boto_client.call_args_list[0].kwargs['config']
+        self.assertEqual(config.max_pool_connections, 64)
+        self.assertEqual(config.retries, {"mode": "adaptive", "max_attempts": 5})
+        self.assertTrue(config.tcp_keepalive)
+
+    def test_build_client_config_timeouts(self):
+        """
+        Test that timeouts and retry settings reach the botocore config.
+        """
+        config = build_client_config(connect_timeout=2, read_timeout=30, retry_mode="standard", max_attempts=3)
+
+        self.assertEqual((config.connect_timeout, config.read_timeout), (2, 30))
+        self.assertEqual(config.retries, {"mode": "standard", "max_attempts": 3})
+
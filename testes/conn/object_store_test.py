@@ -0,0 +1,227 @@
+import unittest
+from unittest.mock import MagicMock
+import io
+import threading
+import time
+from botocore.exceptions import ClientError
+from dags.conn.object_store import (iter_keys, iter_objects, fetch_objects, upload_objects, open_object, transfer_kwargs, delete_keys,
+                                    object_missing)
+from testes.fake_s3 import fake_bucket
+
+
+class TestIterKeys(unittest.TestCase):
+
+    def test_iter_keys_follows_continuation_token(self):
+        """
+        Test that every listing page is read, not only the first 1000 keys.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.side_effect = [
+            {'Contents': [{'Key': 'p/a.json'}, {'Key': 'p/b.txt'}], 'IsTruncated': True, 'NextContinuationToken': 't1'},
+            {'Contents': [{'Key': 'p/c.json'}], 'IsTruncated': True, 'NextContinuationToken': 't2'},
+            {'Contents': [{'Key': 'p/d.json'}], 'IsTruncated': False},
+        ]
+
+        keys = list(iter_keys(mock_client, 'datalake-case', 'p/', suffix='.json'))
+
+        self.assertEqual(keys, ['p/a.json', 'p/c.json', 'p/d.json'])
+        self.assertEqual(mock_client.list_objects_v2.call_count, 3)
+        mock_client.list_objects_v2.assert_any_call(Bucket='datalake-case', Prefix='p/')
+        mock_client.list_objects_v2.assert_called_with(Bucket='datalake-case', Prefix='p/', ContinuationToken='t2')
+
+    def test_iter_objects_empty_prefix(self):
+        """
+        Test that an empty prefix yields nothing.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {}
+
+        self.assertEqual(list(iter_objects(mock_client, 'datalake-case', 'p/')), [])
+
+
+class TestDeleteKeys(unittest.TestCase):
+
+    def test_delete_keys_batches_of_1000(self):
+        """
+        Test that keys are deleted in batches of at most 1000 and that no request is sent for no keys.
+        """
+        mock_client = MagicMock()
+        mock_client.delete_objects.return_value = {}
+        keys = (f'p/{i}' for i in range(2500))
+
+        self.assertEqual(delete_keys(mock_client, 'datalake-case', keys), 2500)
+        batches = [len(call.kwargs['Delete']['Objects']) for call in mock_client.delete_objects.call_args_list]
+        self.assertEqual(batches, [1000, 1000, 500])
+
+        mock_client.reset_mock()
+        self.assertEqual(delete_keys(mock_client, 'datalake-case', []), 0)
+        mock_client.delete_objects.assert_not_called()
+
+    def test_delete_keys_raises_on_partial_errors(self):
+        """
+        Test that keys S3 could not delete are raised with their error codes instead of being counted as deleted.
+        """
+        objects = {f'p/{i}': b'x' for i in range(3)}
+        client = fake_bucket(objects)
+        client.undeletable.add('p/1')
+
+        with self.assertRaisesRegex(RuntimeError, r"1 of 3 objects could not be deleted from datalake-case: \['p/1 \(AccessDenied\)'\]"):
+            delete_keys(client, 'datalake-case', sorted(objects))
+        self.assertEqual(sorted(objects), ['p/1'])
+
+    def test_object_missing(self):
+        """
+        Test that GET and HEAD not-found errors are told apart from other errors.
+        """
+        for code in ('NoSuchKey', '404', 'NotFound'):
+            self.assertTrue(object_missing(ClientError({'Error': {'Code': code}}, 'GetObject')))
+        self.assertFalse(object_missing(ClientError({'Error': {'Code': 'AccessDenied'}}, 'GetObject')))
+
+
+class TestFetchObjects(unittest.TestCase):
+
+    def test_fetch_objects_keeps_key_order(self):
+        """
+        Test that objects are yielded in key order even when later ones finish first.
+        """
+        mock_client = MagicMock()
+
+        def get_object(Bucket, Key):
+            time.sleep(0.05 if Key == 'k0' else 0)
+            return {'Body': io.BytesIO(Key.encode('utf-8'))}
+
+        mock_client.get_object.side_effect = get_object
+        keys = [f'k{i}' for i in range(10)]
+
+        result = list(fetch_objects(mock_client, 'datalake-case', keys, max_workers=4))
+
+        self.assertEqual(result, [(key, key.encode('utf-8')) for key in keys])
+
+    def test_fetch_objects_bounded_concurrency(self):
+        """
+        Test that no more than max_workers downloads run at the same time.
+        """
+        mock_client = MagicMock()
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def get_object(Bucket, Key):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.01)
+            with lock:
+                state['running'] -= 1
+            return {'Body': io.BytesIO(b'data')}
+
+        mock_client.get_object.side_effect = get_object
+
+        result = list(fetch_objects(mock_client, 'datalake-case', (f'k{i}' for i in range(20)), max_workers=3, as_file=True))
+
+        self.assertEqual(len(result), 20)
+        self.assertLessEqual(state['peak'], 3)
+        self.assertEqual(result[0][1].read(), b'data')
+
+    def test_fetch_objects_propagates_errors(self):
+        """
+        Test that a failed download is raised to the caller.
+        """
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = Exception("Access Denied")
+
+        with self.assertRaises(Exception):
+            list(fetch_objects(mock_client, 'datalake-case', ['k0']))
+
+
+class TestUploadObjects(unittest.TestCase):
+
+    def test_upload_objects_from_buffers(self):
+        """
+        Test that every buffer is uploaded from its start and the keys are returned in order.
+        """
+        mock_client = MagicMock()
+        received = {}
+        mock_client.upload_fileobj.side_effect = lambda fileobj, bucket, key: received.update({key: fileobj.read()})
+
+        def buffers():
+            for i in range(5):
+                buffer = io.BytesIO()
+                buffer.write(f'part-{i}'.encode('utf-8'))  # left at the end, as after to_parquet
+                yield f'k{i}', buffer
+
+        keys = upload_objects(mock_client, 'datalake-case', buffers(), max_workers=2)
+
+        self.assertEqual(keys, [f'k{i}' for i in range(5)])
+        self.assertEqual(received['k3'], b'part-3')
+
+    def test_upload_objects_with_transfer_config(self):
+        """
+        Test that multipart settings reach upload_fileobj only when they are given.
+        """
+        mock_client = MagicMock()
+        settings = {'multipart_threshold': 16 * 1024 * 1024, 'multipart_chunksize': 16 * 1024 * 1024, 'max_concurrency': 4, 'use_threads': False}
+
+        upload_objects(mock_client, 'datalake-case', [('k0', io.BytesIO(b'x'))], transfer_config=settings)
+
+        config = mock_client.upload_fileobj.call_args.kwargs['Config']
+        self.assertEqual((config.multipart_chunksize, config.max_concurrency, config.use_threads), (16 * 1024 * 1024, 4, False))
+        self.assertEqual(transfer_kwargs(None), {})
+
+    def test_upload_objects_propagates_errors(self):
+        """
+        Test that a failed upload is raised to the caller.
+        """
+        mock_client = MagicMock()
+        mock_client.upload_fileobj.side_effect = Exception("Upload failed")
+
+        with self.assertRaises(Exception):
+            upload_objects(mock_client, 'datalake-case', [('k0', io.BytesIO(b'x'))])
+
+
+def ranged_client(body):
+    """
+    Build a client whose get_object honours `Range` like S3 does.
+    """
+    mock_client = MagicMock()
+
+    def get_object(Bucket, Key, Range):
+        if not body:
+            raise ClientError({'Error': {'Code': 'InvalidRange'}}, 'GetObject')
+        start, end = Range[len('bytes='):].split('-')
+        start, end = (max(len(body) - int(end), 0), len(body) - 1) if not start else (int(start), int(end))
+        return {'Body': io.BytesIO(body[start:end + 1]), 'ContentRange': f'bytes {start}-{end}/{len(body)}'}
+
+    mock_client.get_object.side_effect = get_object
+    return mock_client
+
+
+class TestRangeReader(unittest.TestCase):
+
+    def test_reads_tail_then_ranges(self):
+        """
+        Test that the tail is fetched once and earlier bytes with a range request of the read size.
+        """
+        body = bytes(range(256)) * 4
+        mock_client = ranged_client(body)
+        source = open_object(mock_client, 'datalake-case', 'k', tail_size=100)
+
+        source.seek(-10, io.SEEK_END)
+        self.assertEqual(source.read(), body[-10:])
+        self.assertEqual(mock_client.get_object.call_count, 1)
+
+        source.seek(5)
+        self.assertEqual(source.read(20), body[5:25])
+        mock_client.get_object.assert_called_with(Bucket='datalake-case', Key='k', Range='bytes=5-24')
+        self.assertEqual(source.bytes_fetched, 120)
+        self.assertEqual(source.size, len(body))
+
+    def test_small_and_empty_objects(self):
+        """
+        Test that an object smaller than the tail costs one request and an empty one reads as empty.
+        """
+        mock_client = ranged_client(b'small')
+        source = open_object(mock_client, 'datalake-case', 'k')
+        self.assertEqual(source.read(), b'small')
+        self.assertEqual(source.requests, 1)
+
+        self.assertEqual(open_object(ranged_client(b''), 'datalake-case', 'k').read(), b'')
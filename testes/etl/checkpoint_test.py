@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+import requests
+from dags.etl.checkpoint import PageCheckpoints
+from dags.etl.extract import iter_brewery_pages
+from testes.fake_s3 import fake_bucket
+
+CATALOGUE = [{"id": str(i), "state": "texas"} for i in range(45)]
+
+
+def make_session(total, failing_page=None):
+    """
+    Build a mock session answering the meta endpoint and the paginated endpoint, failing on one page.
+    """
+    catalogue = CATALOGUE[:total]
+
+    def get(url, params=None, timeout=None, headers=None):
+        response = MagicMock()
+        if url.endswith("/meta"):
+            response.json.return_value = {"total": str(total)}
+        elif params["page"] == failing_page:
+            raise requests.exceptions.HTTPError("500 Server Error")
+        else:
+            start = (params["page"] - 1) * params["per_page"]
+            response.json.return_value = catalogue[start:start + params["per_page"]]
+        return response
+
+    session = MagicMock()
+    session.get.side_effect = get
+    return session
+
+
+def requested_pages(session):
+    return sorted(call.kwargs['params']['page'] for call in session.get.call_args_list if call.kwargs.get('params'))
+
+
+class TestPageCheckpoints(unittest.TestCase):
+
+    def test_retry_resumes_at_the_first_missing_page(self):
+        """
+        Test that a retry reads the checkpointed pages back and only requests the missing ones.
+        """
+        for codec in ('none', 'gzip', 'zstd'):
+            with self.subTest(codec=codec):
+                objects = {}
+                checkpoints = PageCheckpoints(fake_bucket(objects), 'scheduled__2026-10-17T00:00:00+00:00', codec=codec)
+
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    list(iter_brewery_pages(per_page=10, max_workers=1, session=make_session(45, failing_page=3), checkpoints=checkpoints))
+                # Pages prefetched past the failing one are kept as well
+                completed = checkpoints.completed_pages()
+                self.assertTrue({1, 2} <= completed and 3 not in completed)
+
+                session = make_session(45)
+                pages = list(iter_brewery_pages(per_page=10, max_workers=2, session=session, checkpoints=checkpoints))
+
+                self.assertEqual([page for page, _ in pages], [1, 2, 3, 4, 5])
+                self.assertEqual([brewery for _, breweries in pages for brewery in breweries], CATALOGUE)
+                self.assertEqual(requested_pages(session), sorted({1, 2, 3, 4, 5} - completed))
+                self.assertEqual(checkpoints.completed_pages(), {1, 2, 3, 4, 5})
+
+                self.assertEqual(checkpoints.clear(), 6)
+                self.assertEqual(objects, {})
+
+    def test_retry_keeps_the_pages_of_the_first_try(self):
+        """
+        Test that a catalogue growing between tries does not shift the pages, and that a new page size ignores the checkpoints.
+        """
+        objects = {}
+        checkpoints = PageCheckpoints(fake_bucket(objects), 'manual__1')
+        with self.assertRaises(requests.exceptions.HTTPError):
+            list(iter_brewery_pages(per_page=10, max_workers=1, session=make_session(25, failing_page=3), checkpoints=checkpoints))
+
+        session = make_session(45)
+        pages = list(iter_brewery_pages(per_page=10, max_workers=1, session=session, checkpoints=checkpoints))
+        self.assertEqual([page for page, _ in pages], [1, 2, 3])
+        self.assertEqual(requested_pages(session), [3])
+
+        session = make_session(45)
+        pages = list(iter_brewery_pages(per_page=20, max_workers=1, session=session, checkpoints=checkpoints))
+        self.assertEqual([brewery for _, breweries in pages for brewery in breweries], CATALOGUE)
+        self.assertEqual(requested_pages(session), [1, 2, 3])
+
+    def test_run_id_is_made_key_safe(self):
+        """
+        Test that the run id is turned into a single key segment.
+        """
+        checkpoints = PageCheckpoints(MagicMock(), 'scheduled__2026-10-17T00:00:00+00:00')
+        self.assertEqual(checkpoints.page_key(7), 'bronze_layer/_checkpoints/scheduled__2026-10-17T00_00_00_00_00/page-00007.jsonl.gz')
+
+
+if __name__ == '__main__':
+    unittest.main()
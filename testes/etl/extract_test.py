@@ -1,11 +1,12 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from dags.etl.extract import fetch_breweries
+from dags.etl.extract import fetch_breweries, fetch_all_breweries, iter_brewery_pages
+from dags.etl.telemetry import stage_span
 import requests
 
 class TestFetchBreweries(unittest.TestCase):
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_breweries_success(self, mock_get):
         """
         Test successful fetch of breweries data.
@@ -27,10 +28,10 @@ class TestFetchBreweries(unittest.TestCase):
         result = fetch_breweries(per_page)
 
         # Assertions
-        mock_get.assert_called_once_with(f"https://api.openbrewerydb.org/v1/breweries?per_page={per_page}")
+        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries", params={"per_page": per_page}, timeout=30, headers={})
         self.assertEqual(result, mock_response_data)
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_breweries_http_error(self, mock_get):
         """
         Test fetch_breweries when an HTTP error occurs (e.g., 404).
@@ -45,9 +46,9 @@ class TestFetchBreweries(unittest.TestCase):
             fetch_breweries()
 
         # Assertions
-        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries?per_page=200")
+        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries", params={"per_page": 200}, timeout=30, headers={})
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_breweries_request_exception(self, mock_get):
         """
         Test fetch_breweries when a generic RequestException occurs.
@@ -60,9 +61,9 @@ class TestFetchBreweries(unittest.TestCase):
             fetch_breweries()
 
         # Assertions
-        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries?per_page=200")
+        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries", params={"per_page": 200}, timeout=30, headers={})
 
-    @patch("requests.get")
+    @patch("requests.Session.get")
     def test_fetch_breweries_default_per_page(self, mock_get):
         """
         Test fetch_breweries with the default per_page value.
@@ -80,5 +81,96 @@ class TestFetchBreweries(unittest.TestCase):
         result = fetch_breweries()
 
         # Assertions
-        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries?per_page=200")
+        mock_get.assert_called_once_with("https://api.openbrewerydb.org/v1/breweries", params={"per_page": 200}, timeout=30, headers={})
         self.assertEqual(result, mock_response_data)
+
+
+class TestFetchAllBreweries(unittest.TestCase):
+
+    def make_session(self, total, per_page):
+        """
+        Build a mock session answering the meta endpoint and the paginated endpoint.
+        """
+        catalogue = [{"id": str(i)} for i in range(total)]
+
+        def get(url, params=None, timeout=None, headers=None):
+            response = MagicMock()
+            if url.endswith("/meta"):
+                response.json.return_value = {"total": str(total), "page": "1", "per_page": "50"}
+            else:
+                start = (params["page"] - 1) * params["per_page"]
+                response.json.return_value = catalogue[start:start + params["per_page"]]
+            return response
+
+        session = MagicMock()
+        session.get.side_effect = get
+        return session, catalogue
+
+    def test_fetch_all_breweries_reads_every_page(self):
+        """
+        Test that every page reported by the meta endpoint is fetched and returned in order.
+        """
+        session, catalogue = self.make_session(total=45, per_page=10)
+
+        result = fetch_all_breweries(per_page=10, max_workers=3, session=session)
+
+        self.assertEqual(result, catalogue)
+        # One meta request plus ceil(45 / 10) page requests
+        self.assertEqual(session.get.call_count, 6)
+        session.close.assert_not_called()
+
+    def test_fetch_all_breweries_records_the_api_counters(self):
+        """
+        Test that the extract stage counts the fetched rows and the API requests.
+        """
+        session, _ = self.make_session(total=45, per_page=10)
+
+        with stage_span('unit') as stats:
+            fetch_all_breweries(per_page=10, max_workers=3, session=session)
+
+        self.assertEqual(stats['rows_out'], 45)
+        self.assertEqual(stats['api_requests'], 6)
+        self.assertEqual(stats['api_retries'], 0)
+
+    def test_iter_brewery_pages_yields_in_page_order(self):
+        """
+        Test that pages are yielded in ascending order even when fetched concurrently.
+        """
+        session, _ = self.make_session(total=95, per_page=10)
+
+        pages = [page for page, _ in iter_brewery_pages(per_page=10, max_workers=4, session=session)]
+
+        self.assertEqual(pages, list(range(1, 11)))
+
+    def test_fetch_all_breweries_empty_catalogue(self):
+        """
+        Test that an empty catalogue only queries the meta endpoint.
+        """
+        session, _ = self.make_session(total=0, per_page=10)
+
+        self.assertEqual(fetch_all_breweries(per_page=10, session=session), [])
+        session.get.assert_called_once()
+
+    def test_fetch_all_breweries_page_error(self):
+        """
+        Test that an HTTP error on any page is propagated.
+        """
+        session, _ = self.make_session(total=30, per_page=10)
+        ok_get = session.get.side_effect
+
+        def failing_get(url, params=None, timeout=None, headers=None):
+            if params and params["page"] == 2:
+                raise requests.exceptions.HTTPError("500 Server Error")
+            return ok_get(url, params=params, timeout=timeout, headers=headers)
+
+        session.get.side_effect = failing_get
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            fetch_all_breweries(per_page=10, max_workers=2, session=session)
+
+    def test_fetch_all_breweries_invalid_per_page(self):
+        """
+        Test that per_page values outside the API limits are rejected.
+        """
+        with self.assertRaises(ValueError):
+            fetch_all_breweries(per_page=500, session=MagicMock())
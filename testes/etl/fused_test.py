@@ -0,0 +1,128 @@
+import unittest
+import io
+import json
+import pandas as pd
+from dags.etl.fused import clean_to_silver
+from dags.etl.transform import clean_data
+from dags.etl.load import create_silver_layer, stream_bronze_shards
+from testes.fake_s3 import fake_bucket
+
+RECORDS = [
+    {'id': str(i), 'name': f'Brewery {i}', 'brewery_type': 'Micro', 'city': None if i % 3 else 'San Diego', 'state': ['Texas', 'Ohio', 'New York'][i % 3]}
+    for i in range(12)
+]
+
+
+def raw_objects():
+    return {
+        'bronze_layer/raw/bronze_breweries-00000.jsonl': b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in RECORDS[:7]),
+        'bronze_layer/raw/bronze_breweries-00001.jsonl': b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in RECORDS[7:]),
+    }
+
+
+def silver(objects):
+    return {key: pd.read_parquet(io.BytesIO(body)) for key, body in objects.items() if key.startswith('silver_layer/') and key.endswith('.parquet')}
+
+
+class TestCleanToSilver(unittest.TestCase):
+
+    def test_same_partitions_as_clean_then_silver(self):
+        """
+        Test that the fused mode writes the partitions of clean_data followed by create_silver_layer, for every engine.
+        """
+        for engine in ('python', 'vectorized', 'arrow'):
+            with self.subTest(engine=engine):
+                two_step = raw_objects()
+                client = fake_bucket(two_step)
+                clean_data(client, engine=engine)
+                expected = create_silver_layer(client, in_memory=True)
+
+                fused = raw_objects()
+                client = fake_bucket(fused)
+                self.assertEqual(clean_to_silver(client, engine=engine), expected)
+                self.assertFalse(any(key.startswith('bronze_layer/cleaned') for key in fused))
+
+                self.assertEqual(sorted(silver(fused)), sorted(silver(two_step)))
+                for key, partition in silver(two_step).items():
+                    pd.testing.assert_frame_equal(silver(fused)[key], partition)
+
+    def test_cleaned_side_output(self):
+        """
+        Test that the cleaned objects are written only when a cleaned prefix is given, in the clean_data format.
+        """
+        objects = raw_objects()
+        clean_to_silver(fake_bucket(objects), cleaned_dir='bronze_layer/cleaned')
+
+        cleaned = json.loads(objects['bronze_layer/cleaned/bronze_breweries-00000.json'])
+        self.assertEqual(len(cleaned), 7)
+        self.assertEqual(cleaned[1]['city'], 'unknown')
+        self.assertEqual(cleaned[2]['state'], 'new_york')
+
+    def test_manifest_is_shared_with_the_two_step_build(self):
+        """
+        Test that a fused run after a two-step run with the manifest rewrites nothing, then only changed states.
+        """
+        objects = raw_objects()
+        client = fake_bucket(objects)
+        clean_data(client)
+        create_silver_layer(client, in_memory=True, use_manifest=True)
+
+        client.upload_fileobj.reset_mock()
+        self.assertEqual(clean_to_silver(client, use_manifest=True), [])
+        client.upload_fileobj.assert_not_called()
+
+        changed = [dict(record, brewery_type='Large') if record['id'] == '7' else record for record in RECORDS[7:]]
+        objects['bronze_layer/raw/bronze_breweries-00001.jsonl'] = b''.join(json.dumps(record).encode('utf-8') + b'\n' for record in changed)
+        self.assertEqual(clean_to_silver(client, use_manifest=True), ['ohio'])
+
+    def test_compressed_bronze_gives_the_same_silver(self):
+        """
+        Test that gzip and zstd raw and cleaned objects are smaller and read back transparently by every step.
+        """
+        plain = raw_objects()
+        client = fake_bucket(plain)
+        clean_data(client)
+        create_silver_layer(client, in_memory=True)
+
+        for codec, suffix in (('gzip', '.gz'), ('zstd', '.zst')):
+            with self.subTest(codec=codec):
+                objects = {}
+                client = fake_bucket(objects)
+                raw_keys = stream_bronze_shards(client, iter([RECORDS[:7], RECORDS[7:]]), records_per_shard=7, codec=codec)
+                self.assertTrue(all(key.endswith('.jsonl' + suffix) for key in raw_keys))
+
+                cleaned_keys = clean_data(client, keys=raw_keys, codec=codec)
+                self.assertEqual(cleaned_keys, [f'bronze_layer/cleaned/bronze_breweries-0000{i}.json{suffix}' for i in range(2)])
+                self.assertLess(len(objects[cleaned_keys[0]]), len(plain['bronze_layer/cleaned/bronze_breweries-00000.json']))
+
+                create_silver_layer(client, in_memory=True)
+                for key, partition in silver(plain).items():
+                    pd.testing.assert_frame_equal(silver(objects)[key], partition)
+
+                streamed = dict(objects)
+                create_silver_layer(fake_bucket(streamed), writer='stream')
+                for key, partition in silver(plain).items():
+                    pd.testing.assert_frame_equal(silver(streamed)[key], partition)
+
+                fused = {key: body for key, body in objects.items() if key.startswith('bronze_layer/raw/')}
+                clean_to_silver(fake_bucket(fused), cleaned_dir='bronze_layer/cleaned', codec=codec)
+                self.assertEqual(fused[cleaned_keys[1]], objects[cleaned_keys[1]])
+
+    def test_missing_state_column(self):
+        """
+        Test that raw objects without a state column are rejected.
+        """
+        objects = {'bronze_layer/raw/bronze_breweries-00000.jsonl': b'{"id": "1"}\n'}
+        with self.assertRaises(ValueError):
+            clean_to_silver(fake_bucket(objects))
+
+    def test_no_raw_objects(self):
+        """
+        Test that keys without any raw object are reported with the bucket and prefix they were expected under.
+        """
+        with self.assertRaisesRegex(ValueError, '^No raw objects found under datalake-case/bronze_layer/raw$'):
+            clean_to_silver(fake_bucket(raw_objects()), keys=['bronze_layer/raw/_SUCCESS'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+import unittest
+from unittest.mock import MagicMock
+import json
+from email.utils import formatdate
+import requests
+from dags.etl.http_client import ApiClient, ConditionalCache, TokenBucket, retry_after_seconds
+from dags.etl.extract import iter_brewery_pages, fetch_page
+from dags.etl.checkpoint import PageCheckpoints
+from dags.etl.load import stream_bronze_shards
+from testes.fake_s3 import fake_bucket
+
+
+def make_response(status, body=None, headers=None):
+    """
+    Build a real requests Response, so raise_for_status and headers behave like the API's.
+    """
+    response = requests.models.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode('utf-8') if body is not None else b''
+    response.headers.update(headers or {})
+    response.url = 'https://api.test/breweries'
+    return response
+
+
+class FakeClock:
+    """
+    Clock advanced only by the calls to sleep.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_rate_and_pause(self):
+        """
+        Test that requests beyond the burst wait for a token and that a pause holds every request back.
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [0.5])
+
+        bucket.pause(10)
+        bucket.acquire()
+        self.assertEqual(clock.now, 10.5)
+        # A single request goes through at the end of the pause
+        bucket.acquire()
+        self.assertEqual(clock.now, 11.0)
+
+    def test_unlimited_bucket_still_honours_pauses(self):
+        """
+        Test that a bucket without rate never waits unless paused.
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            bucket.acquire()
+        self.assertEqual(clock.sleeps, [])
+        bucket.pause(3)
+        bucket.acquire()
+        self.assertEqual(clock.sleeps, [3])
+
+
+class TestApiClient(unittest.TestCase):
+
+    def test_retry_after_formats(self):
+        """
+        Test that Retry-After is read in seconds or as an HTTP date, with a default otherwise.
+        """
+        self.assertEqual(retry_after_seconds('3', 1.0), 3.0)
+        self.assertAlmostEqual(retry_after_seconds(formatdate(0, usegmt=True), 1.0), 0.0)
+        self.assertEqual(retry_after_seconds(None, 1.0), 1.0)
+        self.assertEqual(retry_after_seconds('soon', 2.0), 2.0)
+
+    def test_throttled_request_is_retried_after_the_server_delay(self):
+        """
+        Test that a 429 pauses the bucket for Retry-After, a 503 for the backoff, and the request is then retried.
+        """
+        session = MagicMock()
+        session.get.side_effect = [make_response(429, headers={'Retry-After': '7'}), make_response(503), make_response(200, [{"id": "1"}])]
+        bucket = MagicMock()
+        client = ApiClient(session=session, backoff=0.5, bucket=bucket)
+
+        self.assertEqual(client.get_json('https://api.test/breweries'), [{"id": "1"}])
+        self.assertEqual([call.args for call in bucket.pause.call_args_list], [(7.0,), (1.0,)])
+        self.assertEqual(client.stats, {'requests': 3, 'not_modified': 0, 'retries': 2, 'bytes': len(b'[{"id": "1"}]')})
+
+    def test_exhausted_retries_raise(self):
+        """
+        Test that the error is raised once the retries are spent, with the backoff capped to max_wait.
+        """
+        session = MagicMock()
+        session.get.return_value = make_response(503)
+        bucket = MagicMock()
+        client = ApiClient(session=session, max_retries=2, backoff=40, max_wait=60, bucket=bucket)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get_json('https://api.test/breweries')
+        self.assertEqual(session.get.call_count, 3)
+        self.assertEqual([call.args for call in bucket.pause.call_args_list], [(40,), (60,)])
+
+    def test_far_retry_after_fails_the_request(self):
+        """
+        Test that a Retry-After beyond max_wait raises instead of waiting.
+        """
+        session = MagicMock()
+        session.get.return_value = make_response(429, headers={'Retry-After': '3600'})
+        bucket = MagicMock()
+        client = ApiClient(session=session, max_wait=60, bucket=bucket)
+
+        with self.assertRaisesRegex(requests.exceptions.HTTPError, 'Retry-After of 3600s'):
+            client.get_json('https://api.test/breweries')
+        self.assertEqual(session.get.call_count, 1)
+        bucket.pause.assert_not_called()
+
+    def test_304_without_validators_raises(self):
+        """
+        Test that a 304 to a request sent without validators raises a clear error instead of decoding an empty body.
+        """
+        session = MagicMock()
+        session.get.return_value = make_response(304)
+        client = ApiClient(session=session)
+
+        with self.assertRaisesRegex(requests.exceptions.HTTPError, 'without validators'):
+            client.get_json('https://api.test/breweries', params={'page': 1})
+
+    def test_unchanged_pages_come_back_as_304(self):
+        """
+        Test that the validators of a page are sent and a 304 is answered with its records read back from bronze.
+        """
+        objects = {}
+        bucket_client = fake_bucket(objects)
+        session = MagicMock()
+        session.get.side_effect = [
+            make_response(200, [{"id": "1"}, {"id": "2"}], {'ETag': '"v1"', 'Last-Modified': 'Sat, 17 Oct 2026 00:00:00 GMT'}),
+            make_response(304),
+        ]
+        cache = ConditionalCache(bucket_client)
+        client = ApiClient(session=session)
+
+        records = fetch_page(client, 1, per_page=2, base_url='https://api.test/breweries', cache=cache)
+        cache.save(stream_bronze_shards(bucket_client, [records], records_per_shard=1, codec='gzip'), 1)
+        cache = ConditionalCache.load(bucket_client)
+        self.assertNotIn('body', json.dumps(cache._entries))
+        client = ApiClient(session=session)
+
+        self.assertEqual(fetch_page(client, 1, per_page=2, base_url='https://api.test/breweries', cache=cache), [{"id": "1"}, {"id": "2"}])
+        self.assertEqual(session.get.call_args.kwargs['headers'],
+                         {'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 17 Oct 2026 00:00:00 GMT'})
+        self.assertEqual(client.stats['not_modified'], 1)
+
+    def test_page_changed_in_bronze_is_requested_again(self):
+        """
+        Test that a 304 whose records no longer match the bronze shards is followed by an unconditional request.
+        """
+        objects = {}
+        bucket_client = fake_bucket(objects)
+        cache = ConditionalCache(bucket_client)
+        session = MagicMock()
+        session.get.side_effect = [make_response(200, [{"id": "1"}], {'ETag': '"v1"'}), make_response(304),
+                                   make_response(200, [{"id": "1"}], {'ETag': '"v1"'})]
+        fetch_page(ApiClient(session=session), 1, per_page=1, base_url='https://api.test/breweries', cache=cache)
+        cache.save(stream_bronze_shards(bucket_client, [[{"id": "2"}]]), 2000)
+
+        client = ApiClient(session=session)
+        cache = ConditionalCache.load(bucket_client)
+        self.assertEqual(fetch_page(client, 1, per_page=1, base_url='https://api.test/breweries', cache=cache), [{"id": "1"}])
+        self.assertEqual(session.get.call_args.kwargs['headers'], {})
+        self.assertEqual(client.stats, {'requests': 2, 'not_modified': 1, 'retries': 0, 'bytes': len(b'[{"id": "1"}]')})
+
+    def test_cache_is_persisted_between_runs(self):
+        """
+        Test that a second extraction with the saved cache gets every page as a 304 read from the bronze shards,
+        and that unused entries are dropped.
+        """
+        catalogue = [{"id": str(i)} for i in range(25)]
+
+        def get(url, params=None, timeout=None, headers=None):
+            if url.endswith('/meta'):
+                return make_response(200, {"total": str(len(catalogue))})
+            etag = f'"page-{params["page"]}"'
+            if headers and headers.get('If-None-Match') == etag:
+                return make_response(304)
+            start = (params["page"] - 1) * params["per_page"]
+            return make_response(200, catalogue[start:start + params["per_page"]], {'ETag': etag})
+
+        objects = {}
+        bucket_client = fake_bucket(objects)
+        cache = ConditionalCache(bucket_client, {'https://api.test/breweries?page=9&per_page=10': {
+            'etag': '"old"', 'last_modified': None, 'offset': 80, 'count': 10, 'hash': ''}})
+        session = MagicMock()
+        session.get.side_effect = get
+        pages = iter_brewery_pages(per_page=10, base_url='https://api.test/breweries', session=ApiClient(session=session), cache=cache)
+        # Shards cut across pages, so a page is read back from two shards
+        keys = stream_bronze_shards(bucket_client, (page for _, page in pages), records_per_shard=7, codec='gzip')
+        self.assertEqual(cache.save(keys, 7), 3)
+
+        client = ApiClient(session=session)
+        pages = list(iter_brewery_pages(per_page=10, base_url='https://api.test/breweries', session=client,
+                                        cache=ConditionalCache.load(bucket_client)))
+
+        self.assertEqual([brewery for _, page in pages for brewery in page], catalogue)
+        self.assertEqual(client.stats['not_modified'], 3)
+
+    def test_pages_restored_from_checkpoints_keep_their_validators(self):
+        """
+        Test that the entries of pages restored from the checkpoints of a previous try are saved,
+        unless their records changed, so the next run still sends their validators.
+        """
+        catalogue = [{"id": str(i)} for i in range(25)]
+
+        def get(url, params=None, timeout=None, headers=None):
+            if url.endswith('/meta'):
+                return make_response(200, {"total": str(len(catalogue))})
+            etag = f'"page-{params["page"]}"'
+            if headers and headers.get('If-None-Match') == etag:
+                return make_response(304)
+            start = (params["page"] - 1) * params["per_page"]
+            return make_response(200, catalogue[start:start + params["per_page"]], {'ETag': etag})
+
+        def extract(checkpoints=None):
+            client = ApiClient(session=session)
+            cache = ConditionalCache.load(bucket_client)
+            pages = iter_brewery_pages(per_page=10, base_url='https://api.test/breweries', session=client, checkpoints=checkpoints, cache=cache)
+            keys = stream_bronze_shards(bucket_client, (page for _, page in pages), records_per_shard=10)
+            return client, cache.save(keys, 10)
+
+        objects = {}
+        bucket_client = fake_bucket(objects)
+        session = MagicMock()
+        session.get.side_effect = get
+        extract()
+
+        # A previous try of the run persisted pages 1 and 2; page 2 changed in the meantime
+        checkpoints = PageCheckpoints(bucket_client, 'retry')
+        checkpoints.reset(len(catalogue), 10)
+        checkpoints.save(1, catalogue[:10])
+        checkpoints.save(2, catalogue[10:19] + [{"id": "new"}])
+        client, saved = extract(checkpoints)
+        self.assertEqual(client.stats['requests'], 1)
+        self.assertEqual(saved, 2)
+
+        client, _ = extract()
+        self.assertEqual(client.stats['not_modified'], 2)
+
+    def test_missing_cache_starts_empty(self):
+        """
+        Test that loading the cache before any run saved it gives an empty cache.
+        """
+        self.assertEqual(ConditionalCache.load(fake_bucket({})).validators('https://api.test/breweries?page=1'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import MagicMock
+import gzip
+import json
+from io import BytesIO
+from botocore.exceptions import ClientError
+from dags.etl.incremental import (
+    record_fingerprint, load_fingerprint_index, save_fingerprint_index, iter_delta_pages, stream_bronze_delta, delta_changed,
+    pending_index_key, promote_fingerprint_index, FINGERPRINT_INDEX_KEY
+)
+from testes.fake_s3 import fake_bucket
+
+
+class TestRecordFingerprint(unittest.TestCase):
+
+    def test_fingerprint_ignores_key_order(self):
+        """
+        Test that the fingerprint only depends on the record content.
+        """
+        self.assertEqual(
+            record_fingerprint({"id": "1", "name": "One"}),
+            record_fingerprint({"name": "One", "id": "1"})
+        )
+        self.assertNotEqual(
+            record_fingerprint({"id": "1", "name": "One"}),
+            record_fingerprint({"id": "1", "name": "Uno"})
+        )
+        self.assertEqual(len(record_fingerprint({"id": "1"})), 16)
+
+
+class TestIterDeltaPages(unittest.TestCase):
+
+    def test_delta_contains_only_changes(self):
+        """
+        Test that unchanged records are dropped and new, changed, moved and deleted ones are emitted.
+        """
+        unchanged = {"id": "1", "name": "Same", "state": "Texas"}
+        changed = {"id": "2", "name": "New Name", "state": "Texas"}
+        moved = {"id": "3", "name": "Moved", "state": "Ohio"}
+        new = {"id": "4", "name": "Brand New", "state": "Texas"}
+        previous_index = {
+            "1": [record_fingerprint(unchanged), "Texas"],
+            "2": [record_fingerprint({"id": "2", "name": "Old Name", "state": "Texas"}), "Texas"],
+            "3": [record_fingerprint({"id": "3", "name": "Moved", "state": "Iowa"}), "Iowa"],
+            "5": ["0000000000000000", "Maine"],
+        }
+        current_index = {}
+
+        delta = [r for page in iter_delta_pages([[unchanged, changed], [moved, new]], previous_index, current_index) for r in page]
+
+        self.assertEqual(delta, [
+            dict(changed, _deleted=False),
+            {"id": "3", "state": "Iowa", "_deleted": True},
+            dict(moved, _deleted=False),
+            dict(new, _deleted=False),
+            {"id": "5", "state": "Maine", "_deleted": True},
+        ])
+        self.assertEqual(set(current_index), {"1", "2", "3", "4"})
+        self.assertEqual(current_index["3"][1], "Ohio")
+
+
+class TestStreamBronzeDelta(unittest.TestCase):
+
+    def test_load_fingerprint_index_missing(self):
+        """
+        Test that a missing index means an empty index (first run).
+        """
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+        self.assertEqual(load_fingerprint_index(mock_client), {})
+
+    def test_stream_bronze_delta_returns_index_without_saving_it(self):
+        """
+        Test that only changed records are written and the new index is returned for the caller to save.
+        """
+        record = {"id": "1", "name": "Same", "state": "Texas"}
+        previous_index = {"1": [record_fingerprint(record), "Texas"]}
+        mock_client = MagicMock()
+        mock_client.get_object.return_value = {
+            'Body': BytesIO(gzip.compress(json.dumps(previous_index).encode('utf-8')))
+        }
+
+        key, index = stream_bronze_delta(mock_client, iter([[record, {"id": "2", "name": "New", "state": "Ohio"}]]),
+                                         file_name='delta.jsonl')
+
+        self.assertEqual(key, 'bronze_layer/delta/delta.jsonl')
+        delta_call, = mock_client.put_object.call_args_list
+        self.assertEqual(delta_call.kwargs['Key'], key)
+        self.assertEqual(
+            [json.loads(line) for line in delta_call.kwargs['Body'].splitlines()],
+            [{"id": "2", "name": "New", "state": "Ohio", "_deleted": False}]
+        )
+        self.assertEqual(set(index), {"1", "2"})
+
+        mock_client.reset_mock()
+        save_fingerprint_index(mock_client, index)
+        index_call = mock_client.put_object.call_args
+        self.assertEqual(index_call.kwargs['Key'], FINGERPRINT_INDEX_KEY)
+        self.assertEqual(json.loads(gzip.decompress(index_call.kwargs['Body'])), index)
+
+    def test_stream_bronze_delta_keeps_index_on_failure(self):
+        """
+        Test that the index is not updated when the delta cannot be written.
+        """
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        mock_client.put_object.side_effect = Exception("Upload failed")
+
+        with self.assertRaises(Exception):
+            stream_bronze_delta(mock_client, iter([[{"id": "1", "state": "Texas"}]]))
+
+        mock_client.put_object.assert_called_once()
+
+    def test_empty_delta_skips_the_downstream_stages(self):
+        """
+        Test that an unchanged catalogue gives an empty delta, which short-circuits the run, and a change does not.
+        """
+        record = {"id": "1", "name": "Same", "state": "Texas"}
+        for codec in ('none', 'gzip', 'zstd'):
+            with self.subTest(codec=codec):
+                client = fake_bucket({})
+                _, index = stream_bronze_delta(client, iter([[record]]), file_name='delta_20261016.jsonl', codec=codec)
+                save_fingerprint_index(client, index)
+
+                key, _ = stream_bronze_delta(client, iter([[record]]), file_name='delta_20261017.jsonl', codec=codec)
+                self.assertIsNone(delta_changed(client, [key]))
+
+                key, _ = stream_bronze_delta(client, iter([[dict(record, name="Changed")]]), file_name='delta_20261018.jsonl', codec=codec)
+                self.assertIsNotNone(delta_changed(client, [key]))
+
+    def test_changes_of_a_failed_run_are_in_the_next_delta(self):
+        """
+        Test that the index of a run failing after the extraction is not published, so the next run
+        still processes its changes, and that publishing it empties the following delta.
+        """
+        objects = {}
+        client = fake_bucket(objects)
+        record = {"id": "1", "name": "Same", "state": "Texas"}
+        save_fingerprint_index(client, {"1": [record_fingerprint(record), "Texas"]})
+        changed = [[dict(record, name="Changed")]]
+
+        def extract(day):
+            key, index = stream_bronze_delta(client, iter(changed), file_name=f'bronze_breweries_delta_{day}.jsonl', codec='gzip')
+            save_fingerprint_index(client, index, index_key=pending_index_key(key))
+            return key
+
+        # Silver or gold fails: the gold task never promotes the pending index
+        failed_key = extract('20261016')
+        self.assertEqual(pending_index_key(failed_key), 'bronze_layer/_state/pending_fingerprints/bronze_breweries_delta_20261016.json.gz')
+
+        key = extract('20261017')
+        self.assertIsNotNone(delta_changed(client, [key]))
+        self.assertTrue(promote_fingerprint_index(client, key))
+        self.assertFalse(promote_fingerprint_index(client, key))
+        self.assertFalse([name for name in objects if name.startswith('bronze_layer/_state/pending_fingerprints/')])
+
+        self.assertIsNone(delta_changed(client, [extract('20261018')]))
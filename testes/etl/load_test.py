@@ -2,9 +2,16 @@ import unittest
 from unittest.mock import MagicMock, patch
 import json
 import os
-from dags.etl.load import create_bronze_layer, create_silver_layer, create_gold_layer
+from dags.etl.load import create_bronze_layer, create_silver_layer, create_gold_layer, BronzeStreamWriter, stream_bronze_layer, MIN_PART_SIZE, merge_silver_delta, aggregate_with_partials, CUBE_GROUPING_SETS
+from dags.etl.load import stream_bronze_shards, plan_state_shards, route_state_shards, build_silver_shard, commit_silver_shards
+from botocore.exceptions import ClientError
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import io
+import hashlib
+import gzip
+from testes.fake_s3 import fake_bucket
 
 class TestCreateBronzeLayer(unittest.TestCase):
     
@@ -114,6 +121,202 @@ class TestCreateBronzeLayer(unittest.TestCase):
         # Clean up the file after the test
         os.remove(file_path)
 
+class TestStreamBronzeLayer(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_client = MagicMock()
+        self.mock_client.create_multipart_upload.return_value = {'UploadId': 'upload-1'}
+        self.mock_client.upload_part.side_effect = lambda **kwargs: {'ETag': f"etag-{kwargs['PartNumber']}"}
+
+    def test_stream_bronze_layer_small_object(self):
+        """
+        Test that an object smaller than one part is written with a single put_object as NDJSON.
+        """
+        pages = [[{"id": "1", "name": "One"}], [{"id": "2", "name": "Two"}]]
+
+        key = stream_bronze_layer(self.mock_client, iter(pages), bucket_name='datalake-case')
+
+        self.assertEqual(key, 'bronze_layer/raw/bronze_breweries.jsonl')
+        self.mock_client.create_multipart_upload.assert_not_called()
+        body = self.mock_client.put_object.call_args.kwargs['Body']
+        self.assertEqual([json.loads(line) for line in body.splitlines()], pages[0] + pages[1])
+
+    def test_stream_bronze_layer_multipart(self):
+        """
+        Test that full parts are uploaded while pages arrive and the upload is completed at the end.
+        """
+        big_page = [{"id": str(i), "name": "x" * 1000} for i in range(6000)]  # ~6 MB per page
+
+        stream_bronze_layer(self.mock_client, iter([big_page, big_page, [{"id": "last"}]]),
+                            part_size=MIN_PART_SIZE)
+
+        self.assertEqual(self.mock_client.upload_part.call_count, 3)
+        self.mock_client.put_object.assert_not_called()
+        self.mock_client.complete_multipart_upload.assert_called_once_with(
+            Bucket='datalake-case', Key='bronze_layer/raw/bronze_breweries.jsonl', UploadId='upload-1',
+            MultipartUpload={'Parts': [
+                {'ETag': 'etag-1', 'PartNumber': 1},
+                {'ETag': 'etag-2', 'PartNumber': 2},
+                {'ETag': 'etag-3', 'PartNumber': 3},
+            ]}
+        )
+
+    def test_stream_bronze_layer_aborts_on_error(self):
+        """
+        Test that a failure while extracting aborts the multipart upload.
+        """
+        big_page = [{"id": str(i), "name": "x" * 1000} for i in range(6000)]
+
+        def pages():
+            yield big_page
+            raise RuntimeError("API down")
+
+        with self.assertRaises(RuntimeError):
+            stream_bronze_layer(self.mock_client, pages(), part_size=MIN_PART_SIZE)
+
+        self.mock_client.abort_multipart_upload.assert_called_once_with(
+            Bucket='datalake-case', Key='bronze_layer/raw/bronze_breweries.jsonl', UploadId='upload-1'
+        )
+        self.mock_client.complete_multipart_upload.assert_not_called()
+
+    def test_stream_bronze_layer_compressed_multipart(self):
+        """
+        Test that compressed parts are uploaded under a key recording the codec and form one gzip stream.
+        """
+        parts = []
+        self.mock_client.upload_part.side_effect = lambda **kwargs: parts.append(kwargs['Body']) or {'ETag': f"etag-{kwargs['PartNumber']}"}
+        pages = [[{"id": str(i), "name": os.urandom(128).hex()} for i in range(i * 10000, (i + 1) * 10000)] for i in range(6)]
+
+        key = stream_bronze_layer(self.mock_client, iter(pages), part_size=MIN_PART_SIZE, codec='gzip')
+
+        self.assertEqual(key, 'bronze_layer/raw/bronze_breweries.jsonl.gz')
+        self.assertGreater(len(parts), 1)
+        self.assertTrue(all(len(part) >= MIN_PART_SIZE for part in parts[:-1]))
+        lines = gzip.decompress(b''.join(parts)).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [record for page in pages for record in page])
+
+    def test_bronze_stream_writer_rejects_small_parts(self):
+        """
+        Test that part sizes below the S3 minimum are rejected.
+        """
+        with self.assertRaises(ValueError):
+            BronzeStreamWriter(self.mock_client, 'datalake-case', 'key', part_size=1024)
+
+class TestStreamBronzeShards(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_client = MagicMock()
+        self.mock_client.list_objects_v2.return_value = {'Contents': []}
+        self.mock_client.delete_objects.return_value = {}
+
+    def written(self):
+        return {call.kwargs['Key']: [json.loads(line) for line in call.kwargs['Body'].splitlines()] for call in self.mock_client.put_object.call_args_list}
+
+    def test_pages_are_split_into_shards(self):
+        """
+        Test that records are cut into shards of at most `records_per_shard`, whatever the page boundaries.
+        """
+        records = [{"id": str(i)} for i in range(7)]
+
+        keys = stream_bronze_shards(self.mock_client, iter([records[:2], records[2:7]]), records_per_shard=3)
+
+        self.assertEqual(keys, [f'bronze_layer/raw/bronze_breweries-0000{i}.jsonl' for i in range(3)])
+        written = self.written()
+        self.assertEqual([len(written[key]) for key in keys], [3, 3, 1])
+        self.assertEqual([record for key in keys for record in written[key]], records)
+
+    def test_stale_shards_are_deleted(self):
+        """
+        Test that the shards of a previous, larger extraction are removed.
+        """
+        listing = [f'bronze_layer/raw/bronze_breweries-0000{i}.jsonl' for i in range(3)] + ['bronze_layer/raw/bronze_breweries_delta_20241211.jsonl']
+        self.mock_client.list_objects_v2.side_effect = lambda Bucket, Prefix: {'Contents': [{'Key': key} for key in listing if key.startswith(Prefix)]}
+
+        keys = stream_bronze_shards(self.mock_client, iter([[{"id": "1"}]]), records_per_shard=3)
+
+        self.assertEqual(keys, ['bronze_layer/raw/bronze_breweries-00000.jsonl'])
+        self.mock_client.delete_objects.assert_called_once_with(Bucket='datalake-case', Delete={'Objects': [
+            {'Key': 'bronze_layer/raw/bronze_breweries-00001.jsonl'}, {'Key': 'bronze_layer/raw/bronze_breweries-00002.jsonl'},
+        ]})
+
+    def test_empty_extraction_writes_one_shard(self):
+        """
+        Test that an empty extraction still produces one (empty) shard for the mapped clean task.
+        """
+        self.assertEqual(stream_bronze_shards(self.mock_client, iter([[]])), ['bronze_layer/raw/bronze_breweries-00000.jsonl'])
+        self.assertEqual(self.mock_client.put_object.call_args.kwargs['Body'], b'')
+
+class TestSilverShards(unittest.TestCase):
+
+    def cleaned_objects(self, states):
+        records = [{'id': str(i), 'brewery_type': 'micro', 'state': state} for i, state in enumerate(states)]
+        parquet = io.BytesIO()
+        pd.DataFrame(records[1::2]).to_parquet(parquet, index=False)
+        return {
+            'bronze_layer/cleaned/part-0.json': json.dumps(records[::2]).encode('utf-8'),
+            'bronze_layer/cleaned/part-1.parquet': parquet.getvalue(),
+        }
+
+    def build(self, mock_client, keys, shard_count):
+        shards = plan_state_shards(mock_client, keys, shard_count=shard_count)
+        shard_keys = route_state_shards(mock_client, keys, shards)
+        results = [build_silver_shard(mock_client, inputs, states, use_manifest=True) for inputs, states in zip(shard_keys, shards)]
+        return shards, commit_silver_shards(mock_client, results, use_manifest=True)
+
+    def test_plan_state_shards_balances_rows(self):
+        """
+        Test that the states are spread over groups of similar row counts, reading both JSON and Parquet objects.
+        """
+        objects = self.cleaned_objects(['texas'] * 6 + ['ohio'] * 3 + ['oregon'] * 2 + ['maine'] * 2)
+        mock_client = fake_bucket(objects)
+
+        self.assertEqual(plan_state_shards(mock_client, sorted(objects), shard_count=2), [['maine', 'ohio', 'oregon'], ['texas']])
+        self.assertEqual(len(plan_state_shards(mock_client, sorted(objects), shard_count=10)), 4)
+
+    def test_shards_read_only_their_own_states(self):
+        """
+        Test that the cleaned objects are routed once, so each shard input only holds the states of its group.
+        """
+        objects = self.cleaned_objects(['texas'] * 6 + ['ohio'] * 3 + ['oregon'] * 2 + ['maine'] * 2)
+        keys = sorted(objects)
+        objects['bronze_layer/silver_shards/shard-00009/part-00000.parquet'] = b'stale'
+        mock_client = fake_bucket(objects)
+        shards = plan_state_shards(mock_client, keys, shard_count=2)
+
+        shard_keys = route_state_shards(mock_client, keys, shards)
+
+        self.assertEqual(shard_keys, [[f'bronze_layer/silver_shards/shard-{shard:05d}/part-{part:05d}.parquet' for part in range(2)] for shard in range(2)])
+        self.assertNotIn('bronze_layer/silver_shards/shard-00009/part-00000.parquet', objects)
+        for inputs, states in zip(shard_keys, shards):
+            rows = pd.concat([pd.read_parquet(io.BytesIO(objects[key])) for key in inputs])
+            self.assertEqual(sorted(rows['state'].unique()), states)
+        self.assertEqual(sum(len(pd.read_parquet(io.BytesIO(objects[key]))) for inputs in shard_keys for key in inputs), 13)
+
+    def test_sharded_build_with_manifest(self):
+        """
+        Test that the shards write their partitions, skip unchanged ones and that the commit removes dropped states.
+        """
+        objects = self.cleaned_objects(['texas', 'ohio', 'oregon', 'texas'])
+        keys = sorted(objects)
+        mock_client = fake_bucket(objects)
+
+        shards, changed = self.build(mock_client, keys, shard_count=2)
+        self.assertEqual(len(shards), 2)
+        self.assertEqual(changed, ['ohio', 'oregon', 'texas'])
+        texas = pd.read_parquet(io.BytesIO(objects['silver_layer/texas/breweries_texas.parquet']))
+        self.assertEqual(sorted(texas['id']), ['0', '3'])
+
+        mock_client.upload_fileobj.reset_mock()
+        self.assertEqual(self.build(mock_client, keys, shard_count=2)[1], [])
+        # Only the shard inputs are written again, no partition
+        self.assertFalse([call for call in mock_client.upload_fileobj.call_args_list if call.args[2].startswith('silver_layer/')])
+
+        objects.update(self.cleaned_objects(['texas', 'ohio', 'texas', 'texas']))
+        self.assertEqual(self.build(mock_client, keys, shard_count=2)[1], ['texas', 'oregon'])
+        self.assertNotIn('silver_layer/oregon/breweries_oregon.parquet', objects)
+        manifest = json.loads(objects['silver_layer/_manifest.json'])
+        self.assertEqual(sorted(manifest['partitions']), ['ohio', 'texas'])
+
 class TestCreateSilverLayer(unittest.TestCase):
     @patch('boto3.client')
     @patch('pandas.DataFrame.to_parquet')
@@ -149,8 +352,9 @@ class TestCreateSilverLayer(unittest.TestCase):
         # Call the function to test
         create_silver_layer(mock_client, bucket_name='datalake-case')
 
-        # Check that list_objects_v2 was called with the correct prefix
-        mock_client.list_objects_v2.assert_called_once_with(Bucket='datalake-case', Prefix='bronze_layer/cleaned')
+        # Check that list_objects_v2 was called with the correct prefix, then for the other silver layout
+        mock_client.list_objects_v2.assert_any_call(Bucket='datalake-case', Prefix='bronze_layer/cleaned')
+        mock_client.list_objects_v2.assert_called_with(Bucket='datalake-case', Prefix='silver_layer/')
 
         # Check that get_object was called for each file in the response
         mock_client.get_object.assert_any_call(Bucket='datalake-case', Key='bronze_layer/cleaned/file1.json')
@@ -172,6 +376,53 @@ class TestCreateSilverLayer(unittest.TestCase):
             'silver_layer/Texas/breweries_Texas.parquet'
         )
 
+    @patch('pandas.DataFrame.to_parquet')
+    def test_create_silver_layer_reads_parquet_cleaned_files(self, mock_to_parquet):
+        """
+        Test that Parquet objects written by the arrow cleaning engine are consumed directly.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {
+            'Contents': [{'Key': 'bronze_layer/cleaned/bronze_breweries.parquet'}]
+        }
+        buffer = io.BytesIO()
+        pq.write_table(pa.Table.from_pylist([{"id": "1", "state": "ohio"}, {"id": "2", "state": "iowa"}]), buffer)
+        mock_client.get_object.return_value = {'Body': io.BytesIO(buffer.getvalue())}
+
+        create_silver_layer(mock_client, bucket_name='datalake-case')
+
+        self.assertEqual(mock_client.upload_file.call_count, 2)
+        mock_client.upload_file.assert_any_call(
+            os.path.join('/tmp/', 'ohio', 'breweries_ohio.parquet'), 'datalake-case', 'silver_layer/ohio/breweries_ohio.parquet'
+        )
+
+    @patch('os.makedirs')
+    def test_create_silver_layer_in_memory(self, mock_makedirs):
+        """
+        Test that in memory mode uploads one Parquet buffer per state without staging files on disk.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {'Contents': [{'Key': 'bronze_layer/cleaned/file1.json'}]}
+        mock_client.get_object.return_value = {
+            'Body': io.BytesIO(json.dumps([
+                {"id": "1", "name": "brewery1", "state": "oklahoma"},
+                {"id": "2", "name": "brewery2", "state": "texas"},
+                {"id": "3", "name": "brewery3", "state": "texas"},
+            ]).encode('utf-8'))
+        }
+        uploaded = {}
+        mock_client.upload_fileobj.side_effect = lambda fileobj, bucket, key: uploaded.update({key: pd.read_parquet(fileobj)})
+
+        create_silver_layer(mock_client, bucket_name='datalake-case', in_memory=True, max_workers=2)
+
+        mock_makedirs.assert_not_called()
+        mock_client.upload_file.assert_not_called()
+        self.assertEqual(sorted(uploaded), [
+            'silver_layer/oklahoma/breweries_oklahoma.parquet',
+            'silver_layer/texas/breweries_texas.parquet',
+        ])
+        self.assertEqual(uploaded['silver_layer/texas/breweries_texas.parquet']['id'].tolist(), ['2', '3'])
+
     @patch('boto3.client')
     def test_create_silver_layer_no_files(self, mock_boto_client):
         # Mock the boto3 client
@@ -212,6 +463,79 @@ class TestCreateSilverLayer(unittest.TestCase):
         
         self.assertEqual(str(context.exception), "'state' column is missing in the file: bronze_layer/cleaned/file1.json")
 
+class TestMergeSilverDelta(unittest.TestCase):
+
+    def parquet_body(self, rows):
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_parquet(buffer, index=False)
+        return {'Body': io.BytesIO(buffer.getvalue())}
+
+    def test_merge_silver_delta_rewrites_touched_partitions(self):
+        """
+        Test that upserts replace rows by id, deletions remove rows and empty partitions are deleted.
+        """
+        mock_client = MagicMock()
+        delta = [
+            {"id": "1", "name": "renamed", "state": "texas", "_deleted": False},
+            {"id": "3", "name": "unknown", "state": "texas", "_deleted": True},
+            {"id": "9", "name": "unknown", "state": "maine", "_deleted": True},
+        ]
+        partitions = {
+            'silver_layer/texas/breweries_texas.parquet': [
+                {"id": "1", "name": "old", "state": "texas"},
+                {"id": "2", "name": "kept", "state": "texas"},
+                {"id": "3", "name": "gone", "state": "texas"},
+            ],
+            'silver_layer/maine/breweries_maine.parquet': [{"id": "9", "name": "gone", "state": "maine"}],
+        }
+
+        def get_object(Bucket, Key):
+            if Key.endswith('.json'):
+                return {'Body': io.StringIO(json.dumps(delta))}
+            return self.parquet_body(partitions[Key])
+
+        mock_client.get_object.side_effect = get_object
+
+        states = merge_silver_delta(mock_client, keys=['bronze_layer/cleaned_delta/delta.json'])
+
+        self.assertEqual(sorted(states), ['maine', 'texas'])
+        mock_client.delete_object.assert_called_once_with(
+            Bucket='datalake-case', Key='silver_layer/maine/breweries_maine.parquet'
+        )
+        put_call = mock_client.put_object.call_args
+        self.assertEqual(put_call.kwargs['Key'], 'silver_layer/texas/breweries_texas.parquet')
+        texas = pd.read_parquet(io.BytesIO(put_call.kwargs['Body'])).sort_values('id')
+        self.assertEqual(texas['id'].tolist(), ['1', '2'])
+        self.assertEqual(texas['name'].tolist(), ['renamed', 'kept'])
+        self.assertNotIn('_deleted', texas.columns)
+
+    def test_merge_silver_delta_new_partition(self):
+        """
+        Test that a delta for a state without partition creates it.
+        """
+        mock_client = MagicMock()
+        delta = [{"id": "1", "name": "new", "state": "ohio", "_deleted": False}]
+
+        def get_object(Bucket, Key):
+            if Key.endswith('.json'):
+                return {'Body': io.StringIO(json.dumps(delta))}
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+        mock_client.get_object.side_effect = get_object
+
+        self.assertEqual(merge_silver_delta(mock_client, keys=['bronze_layer/cleaned_delta/delta.json']), ['ohio'])
+        self.assertEqual(mock_client.put_object.call_args.kwargs['Key'], 'silver_layer/ohio/breweries_ohio.parquet')
+
+    def test_merge_silver_delta_empty(self):
+        """
+        Test that an empty delta leaves the silver layer untouched.
+        """
+        mock_client = MagicMock()
+        mock_client.get_object.return_value = {'Body': io.StringIO('[]')}
+
+        self.assertEqual(merge_silver_delta(mock_client, keys=['bronze_layer/cleaned_delta/delta.json']), [])
+        mock_client.put_object.assert_not_called()
+
 class TestCreateGoldLayer(unittest.TestCase):
 
     @patch('boto3.client')
@@ -291,6 +615,136 @@ class TestCreateGoldLayer(unittest.TestCase):
             with self.assertRaises(Exception):
                 create_gold_layer(mock_client)
 
+    def test_create_gold_layer_only_changed_states(self):
+        """
+        Test that only the changed states are re-aggregated and the other gold rows are reused.
+        """
+        mock_client = MagicMock()
+        previous = pd.DataFrame({'brewery_type': ['micro', 'micro'], 'state': ['CA', 'TX'], 'brewery_count': [5, 7]})
+        previous_buffer = io.BytesIO()
+        previous.to_parquet(previous_buffer, index=False)
+
+        mock_client.list_objects_v2.return_value = {
+            'Contents': [
+                {'Key': 'silver_layer/CA/breweries_CA.parquet'},
+                {'Key': 'silver_layer/TX/breweries_TX.parquet'},
+            ]
+        }
+        silver_ca = pd.DataFrame({'brewery_type': ['micro', 'brewpub'], 'state': ['CA', 'CA']})
+        silver_buffer = io.BytesIO()
+        silver_ca.to_parquet(silver_buffer, index=False)
+        mock_client.get_object.side_effect = [
+            {'Body': io.BytesIO(previous_buffer.getvalue())},
+            {'Body': io.BytesIO(silver_buffer.getvalue())},
+        ]
+
+        captured = {}
+
+        def capture_upload(path, bucket, key):
+            captured['df'] = pd.read_parquet(path)
+
+        mock_client.upload_file.side_effect = capture_upload
+
+        create_gold_layer(mock_client, states=['CA'])
+
+        # Only the previous gold file and the CA partition were downloaded
+        self.assertEqual(mock_client.get_object.call_count, 2)
+        result = captured['df'].sort_values(['state', 'brewery_type']).reset_index(drop=True)
+        self.assertEqual(result.to_dict('records'), [
+            {'brewery_type': 'brewpub', 'state': 'CA', 'brewery_count': 1},
+            {'brewery_type': 'micro', 'state': 'CA', 'brewery_count': 1},
+            {'brewery_type': 'micro', 'state': 'TX', 'brewery_count': 7},
+        ])
+
+    def test_create_gold_layer_reads_only_needed_columns(self):
+        """
+        Test that only the footer and the brewery_type/state column chunks of a silver file are downloaded.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {'Contents': [{'Key': 'silver_layer/CA/breweries_CA.parquet'}]}
+        silver = pd.DataFrame({
+            'brewery_type': ['micro', 'brewpub'] * 5000,
+            'state': ['CA'] * 10000,
+            'name': [hashlib.sha512(str(i).encode('utf-8')).hexdigest() for i in range(10000)],
+        })
+        body = silver.to_parquet(index=False)
+        downloaded = []
+
+        def get_object(Bucket, Key, Range):
+            start, end = Range[len('bytes='):].split('-')
+            start, end = (max(len(body) - int(end), 0), len(body) - 1) if not start else (int(start), int(end))
+            downloaded.append(end + 1 - start)
+            return {'Body': io.BytesIO(body[start:end + 1]), 'ContentRange': f'bytes {start}-{end}/{len(body)}'}
+
+        mock_client.get_object.side_effect = get_object
+        captured = {}
+        mock_client.upload_file.side_effect = lambda path, bucket, key: captured.update(df=pd.read_parquet(path))
+
+        create_gold_layer(mock_client)
+
+        self.assertLess(sum(downloaded), len(body) / 10)
+        self.assertEqual(sorted(captured['df']['brewery_count']), [5000, 5000])
+
+    def test_create_gold_layer_grouping_sets(self):
+        """
+        Test that every grouping set is written as its own table from a single read of each silver file.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {'Contents': [
+            {'Key': 'silver_layer/CA/breweries_CA.parquet'},
+            {'Key': 'silver_layer/ON/breweries_ON.parquet'},
+        ]}
+        silver = {
+            'silver_layer/CA/breweries_CA.parquet': pd.DataFrame({
+                'brewery_type': ['micro', 'micro', 'brewpub'], 'state': 'CA', 'country': 'US',
+                'city': ['Napa', 'Davis', None], 'name': ['a', 'b', 'c'],
+            }).to_parquet(index=False),
+            'silver_layer/ON/breweries_ON.parquet': pd.DataFrame({
+                'brewery_type': ['micro'], 'state': 'ON', 'country': 'CA', 'city': ['Napa'], 'name': ['d'],
+            }).to_parquet(index=False),
+        }
+        mock_client.get_object.side_effect = lambda Bucket, Key, Range: {'Body': io.BytesIO(silver[Key])}
+        tables = {}
+        mock_client.upload_file.side_effect = lambda path, bucket, key: tables.update({key: pd.read_parquet(path)})
+
+        with patch('os.makedirs'):
+            create_gold_layer(mock_client, grouping_sets=CUBE_GROUPING_SETS)
+
+        self.assertEqual(mock_client.get_object.call_count, 2)
+        self.assertEqual(sorted(tables), sorted(f'golden_layer/{name}.parquet' for name in CUBE_GROUPING_SETS))
+        records = lambda name: sorted(map(tuple, tables[f'golden_layer/{name}.parquet'].values.tolist()), key=str)
+        self.assertEqual(records('brewery_count_by_country'), [('CA', 1), ('US', 3)])
+        self.assertEqual(records('brewery_count_by_city'), [('Davis', 1), ('Napa', 2), (None, 1)])
+        self.assertEqual(records('brewery_count_by_country_and_type'), [('CA', 'micro', 1), ('US', 'brewpub', 1), ('US', 'micro', 2)])
+        self.assertEqual(records('brewery_aggregated_by_type_and_location'), [('brewpub', 'CA', 1), ('micro', 'CA', 2), ('micro', 'ON', 1)])
+        # The finest grain is not one of the sets, so it is kept for incremental runs
+        self.assertEqual(mock_client.put_object.call_args.kwargs['Key'], 'golden_layer/_cube/base.parquet')
+
+    def test_create_gold_layer_recomputes_when_grouping_sets_change(self):
+        """
+        Test that a new grouping set is written even when the silver manifest has no dirty partition.
+        """
+        records = [
+            {'id': '1', 'brewery_type': 'micro', 'state': 'CA'},
+            {'id': '2', 'brewery_type': 'micro', 'state': 'ON'},
+            {'id': '3', 'brewery_type': 'brewpub', 'state': 'ON'},
+        ]
+        objects = {'bronze_layer/cleaned/breweries.json': json.dumps(records).encode('utf-8')}
+        client = fake_bucket(objects)
+        create_silver_layer(client, in_memory=True, use_manifest=True)
+        create_gold_layer(client, use_manifest=True)
+
+        # Same finest grain as the default table, so the previous gold rows alone cannot tell the set is new
+        grouping_sets = {'brewery_aggregated_by_type_and_location': ['brewery_type', 'state'], 'brewery_count_by_type': ['brewery_type']}
+        create_gold_layer(client, use_manifest=True, grouping_sets=grouping_sets)
+        by_type = pd.read_parquet(io.BytesIO(objects['golden_layer/brewery_count_by_type.parquet']))
+        self.assertEqual(sorted(map(tuple, by_type.values.tolist())), [('brewpub', 1), ('micro', 2)])
+
+        # Once recorded, the same grouping sets leave the gold layer untouched
+        client.upload_file.reset_mock()
+        create_gold_layer(client, use_manifest=True, grouping_sets=grouping_sets)
+        client.upload_file.assert_not_called()
+
     def mock_parquet_file(self):
         # Creates a simple mock parquet file with valid brewery_type and state columns
         data = {
@@ -311,4 +765,44 @@ class TestCreateGoldLayer(unittest.TestCase):
         buffer = io.BytesIO()
         df.to_parquet(buffer, index=False)
         buffer.seek(0)
-        return buffer.read()
\ No newline at end of file
+        return buffer.read()
+
+class TestGoldPartials(unittest.TestCase):
+
+    def silver_file(self, brewery_types, state):
+        return pd.DataFrame({'brewery_type': brewery_types, 'state': state}).to_parquet(index=False)
+
+    def test_only_changed_files_are_recomputed(self):
+        """
+        Test that cached partials are reused for unchanged ETags and dropped for deleted files.
+        """
+        objects = {
+            'silver_layer/CA/breweries_CA.parquet': self.silver_file(['micro', 'micro'], 'CA'),
+            'silver_layer/TX/breweries_TX.parquet': self.silver_file(['brewpub'], 'TX'),
+            'silver_layer/NY/breweries_NY.parquet': self.silver_file(['micro'], 'NY'),
+        }
+        mock_client = fake_bucket(objects)
+
+        first = aggregate_with_partials(mock_client)
+        self.assertEqual(first['brewery_count'].sum(), 4)
+        self.assertIn('golden_layer/_partials/partials.parquet', objects)
+
+        objects['silver_layer/CA/breweries_CA.parquet'] = self.silver_file(['micro', 'large', 'large'], 'CA')
+        del objects['silver_layer/NY/breweries_NY.parquet']
+        mock_client.get_object.reset_mock()
+
+        second = aggregate_with_partials(mock_client)
+
+        read_keys = {call.kwargs['Key'] for call in mock_client.get_object.call_args_list}
+        self.assertEqual(read_keys, {'golden_layer/_partials/partials.parquet', 'silver_layer/CA/breweries_CA.parquet'})
+        self.assertEqual(sorted(map(tuple, second.values.tolist())), [
+            ('brewpub', 'TX', 1), ('large', 'CA', 2), ('micro', 'CA', 1),
+        ])
+
+        # Nothing changed: no silver file is read and the partials are not rewritten
+        mock_client.get_object.reset_mock()
+        mock_client.put_object.reset_mock()
+        aggregate_with_partials(mock_client)
+        self.assertEqual(mock_client.get_object.call_count, 1)
+        mock_client.put_object.assert_not_called()
+
@@ -0,0 +1,103 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import marshal
+from dags.etl.profiling import profiled_task, task_profile_prefix
+
+AIRFLOW_ENV = {'AIRFLOW_CTX_DAG_ID': 'brewery_data_pipeline', 'AIRFLOW_CTX_DAG_RUN_ID': 'scheduled__2024-12-11', 'AIRFLOW_CTX_TASK_ID': 'clean_data',
+               'AIRFLOW_CTX_TRY_NUMBER': '2'}
+
+
+def allocate(size):
+    return [str(i) for i in range(size)]
+
+
+class TestProfiledTask(unittest.TestCase):
+
+    def uploaded(self, client):
+        return {call.kwargs['Key']: call.kwargs['Body'] for call in client.put_object.call_args_list}
+
+    def test_disabled_profiling_runs_the_callable_only(self):
+        """
+        Test that nothing is profiled nor uploaded when profiling is off.
+        """
+        client_factory = MagicMock()
+        task = profiled_task(lambda: False, client_factory)(allocate)
+
+        self.assertEqual(len(task(10)), 10)
+        client_factory.assert_not_called()
+
+    @patch.dict('os.environ', AIRFLOW_ENV)
+    def test_report_is_uploaded_under_the_task_prefix(self):
+        """
+        Test that the cProfile, tracemalloc and RSS report is written per dag run and task.
+        """
+        client = MagicMock()
+        task = profiled_task(lambda: True, lambda: client, bucket_name='datalake-case')(allocate)
+
+        self.assertEqual(len(task(50000)), 50000)
+
+        objects = self.uploaded(client)
+        prefix = '_profiles/brewery_data_pipeline/scheduled__2024-12-11/clean_data/try-2/'
+        self.assertEqual(sorted(objects), [f'{prefix}profile.pstats', f'{prefix}profile.txt', f'{prefix}summary.json'])
+        summary = json.loads(objects[f'{prefix}summary.json'])
+        self.assertIsNone(summary['error'])
+        self.assertGreaterEqual(summary['rss_bytes']['peak'], summary['rss_bytes']['start'])
+        self.assertGreater(summary['tracemalloc']['peak_bytes'], 0)
+        self.assertTrue(any('profiling_test.py' in allocation['location'] for allocation in summary['tracemalloc']['top_allocations']))
+        self.assertIn('allocate', objects[f'{prefix}profile.txt'].decode('utf-8'))
+        self.assertTrue(any(function == 'allocate' for _, _, function in marshal.loads(objects[f'{prefix}profile.pstats'])))
+
+    def test_report_is_uploaded_when_the_task_fails(self):
+        """
+        Test that a failing task still gets its report and its exception is re-raised.
+        """
+        client = MagicMock()
+
+        def failing():
+            raise MemoryError("too big")
+
+        with self.assertRaises(MemoryError):
+            profiled_task(lambda: True, lambda: client, trace_memory=False)(failing)()
+
+        summary = json.loads(next(body for key, body in self.uploaded(client).items() if key.endswith('summary.json')))
+        self.assertEqual(summary['error'], 'MemoryError: too big')
+        self.assertNotIn('tracemalloc', summary)
+
+    def test_upload_errors_do_not_fail_the_task(self):
+        """
+        Test that a failing report upload is only logged.
+        """
+        client = MagicMock()
+        client.put_object.side_effect = RuntimeError("bucket unavailable")
+
+        self.assertEqual(profiled_task(lambda: True, lambda: client)(allocate)(3), ['0', '1', '2'])
+
+    @patch.dict('os.environ', {}, clear=True)
+    def test_prefix_outside_of_airflow(self):
+        """
+        Test that the function name is used as task id when run outside of Airflow.
+        """
+        self.assertTrue(task_profile_prefix('gold_layer_task').startswith('_profiles/manual/manual__'))
+        self.assertTrue(task_profile_prefix('gold_layer_task').endswith('/gold_layer_task/try-1/'))
+
+    @patch.dict('os.environ', AIRFLOW_ENV)
+    @patch('dags.etl.profiling.current_map_index', return_value=3)
+    def test_prefix_of_a_mapped_task(self, mock_map_index):
+        """
+        Test that each instance of a mapped task gets its own report prefix.
+        """
+        self.assertEqual(task_profile_prefix('clean_data_task'), '_profiles/brewery_data_pipeline/scheduled__2024-12-11/clean_data/3/try-2/')
+
+    @patch.dict('os.environ', AIRFLOW_ENV)
+    def test_each_try_gets_its_own_prefix(self):
+        """
+        Test that a retry does not overwrite the report of the failed try.
+        """
+        with patch.dict('os.environ', {'AIRFLOW_CTX_TRY_NUMBER': '1'}):
+            first = task_profile_prefix('clean_data_task')
+        self.assertNotEqual(first, task_profile_prefix('clean_data_task'))
+
+
+if __name__ == '__main__':
+    unittest.main()
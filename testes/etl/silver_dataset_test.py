@@ -0,0 +1,138 @@
+import unittest
+from unittest.mock import MagicMock
+import io
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+from dags.etl.silver_dataset import partition_values, partition_state, write_silver_dataset
+from dags.etl.load import create_silver_layer, create_gold_layer
+from testes.fake_s3 import fake_bucket
+
+
+def sample_table():
+    return pa.Table.from_pylist([
+        {'id': '1', 'brewery_type': 'micro', 'state': 'texas'},
+        {'id': '2', 'brewery_type': 'brewpub', 'state': 'texas'},
+        {'id': '3', 'brewery_type': 'micro', 'state': 'oregon'},
+    ])
+
+
+class TestPartitionKeys(unittest.TestCase):
+
+    def test_partition_values_hive_and_legacy_keys(self):
+        """
+        Test that the state is read from both hive and legacy silver keys.
+        """
+        self.assertEqual(partition_values('silver_layer/state=texas/part-0.parquet', 'silver_layer/'), {'state': 'texas'})
+        self.assertEqual(partition_state('silver_layer/state=texas/part-0.parquet', 'silver_layer/'), 'texas')
+        self.assertEqual(partition_state('silver_layer/texas/breweries_texas.parquet', 'silver_layer/'), 'texas')
+
+
+class TestWriteSilverDataset(unittest.TestCase):
+
+    def test_write_silver_dataset_staged_upload(self):
+        """
+        Test that the dataset is uploaded as hive partitions with the requested codec and stale files are removed.
+        """
+        mock_client = MagicMock()
+        uploaded = {}
+
+        def upload_file(path, bucket, key):
+            uploaded[key] = pq.ParquetFile(path)
+            uploaded[key].read()
+
+        mock_client.upload_file.side_effect = upload_file
+        mock_client.delete_objects.return_value = {}
+        mock_client.list_objects_v2.side_effect = lambda Bucket, Prefix: {'Contents': [
+            {'Key': f'{Prefix}part-0.parquet'},
+            {'Key': f'{Prefix}part-1.parquet'},
+        ]}
+
+        keys = write_silver_dataset(mock_client, sample_table(), compression='snappy', row_group_size=1)
+
+        self.assertEqual(keys, ['silver_layer/state=oregon/part-0.parquet', 'silver_layer/state=texas/part-0.parquet'])
+        texas = uploaded['silver_layer/state=texas/part-0.parquet']
+        self.assertEqual(texas.metadata.num_rows, 2)
+        self.assertEqual(texas.metadata.num_row_groups, 2)
+        self.assertEqual(texas.metadata.row_group(0).column(0).compression, 'SNAPPY')
+        self.assertNotIn('state', texas.schema_arrow.names)
+        deleted = [obj['Key'] for obj in mock_client.delete_objects.call_args.kwargs['Delete']['Objects']]
+        self.assertEqual(deleted, ['silver_layer/state=oregon/part-1.parquet', 'silver_layer/state=texas/part-1.parquet'])
+
+    def test_write_silver_dataset_rejects_unknown_options(self):
+        """
+        Test that a misspelt option is not silently ignored.
+        """
+        with self.assertRaises(ValueError):
+            write_silver_dataset(MagicMock(), sample_table(), compresion='zstd')
+
+    def test_dataset_written_and_read_through_filesystem(self):
+        """
+        Test the direct filesystem path end to end: max_rows_per_file splits files and gold prunes states.
+        """
+        mock_client = MagicMock()
+        captured = {}
+        mock_client.upload_file.side_effect = lambda path, bucket, key: captured.update(df=pd.read_parquet(path))
+
+        with tempfile.TemporaryDirectory() as bucket:
+            keys = write_silver_dataset(mock_client, sample_table(), bucket, filesystem=fs.LocalFileSystem(),
+                                        max_rows_per_file=1)
+            self.assertEqual(len(keys), 3)
+            self.assertTrue(os.path.exists(os.path.join(bucket, 'silver_layer', 'state=texas', 'part-1.parquet')))
+
+            create_gold_layer(mock_client, bucket_name=bucket, filesystem=fs.LocalFileSystem())
+
+        mock_client.get_object.assert_not_called()
+        result = captured['df'].sort_values(['state', 'brewery_type']).reset_index(drop=True)
+        self.assertEqual(result.to_dict('records'), [
+            {'brewery_type': 'micro', 'state': 'oregon', 'brewery_count': 1},
+            {'brewery_type': 'brewpub', 'state': 'texas', 'brewery_count': 1},
+            {'brewery_type': 'micro', 'state': 'texas', 'brewery_count': 1},
+        ])
+
+    def test_gold_reads_hive_keys_through_client(self):
+        """
+        Test that gold restores the state column of hive files downloaded with the Boto3 client.
+        """
+        mock_client = MagicMock()
+        mock_client.list_objects_v2.return_value = {'Contents': [{'Key': 'silver_layer/state=texas/part-0.parquet'}]}
+        buffer = io.BytesIO()
+        pq.write_table(pa.table({'brewery_type': ['micro', 'micro']}), buffer)
+        mock_client.get_object.return_value = {'Body': io.BytesIO(buffer.getvalue())}
+        captured = {}
+        mock_client.upload_file.side_effect = lambda path, bucket, key: captured.update(df=pd.read_parquet(path))
+
+        create_gold_layer(mock_client)
+
+        self.assertEqual(captured['df'].to_dict('records'), [{'brewery_type': 'micro', 'state': 'texas', 'brewery_count': 2}])
+
+    def test_switching_writers_keeps_one_layout_per_state(self):
+        """
+        Test that rewriting the silver layer with the other writer removes the previous layout, so gold counts do not change.
+        """
+        records = sample_table().to_pylist()
+        objects = {'bronze_layer/cleaned/breweries.json': pd.DataFrame(records).to_json(orient='records').encode('utf-8')}
+        client = fake_bucket(objects)
+
+        def gold_counts():
+            create_gold_layer(client)
+            df = pd.read_parquet(io.BytesIO(objects['golden_layer/brewery_aggregated_by_type_and_location.parquet']))
+            return df.sort_values(['state', 'brewery_type']).to_dict('records')
+
+        create_silver_layer(client, in_memory=True)
+        expected = gold_counts()
+        self.assertEqual(sum(row['brewery_count'] for row in expected), 3)
+
+        for writer in ('dataset', 'pandas', 'stream'):
+            with self.subTest(writer=writer):
+                create_silver_layer(client, writer=writer, in_memory=True)
+                hive = [key for key in objects if key.startswith('silver_layer/state=')]
+                self.assertEqual(bool(hive), writer == 'dataset')
+                self.assertEqual(gold_counts(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import io
+import json
+import pandas as pd
+from dags.etl.silver_manifest import partition_hash, load_silver_manifest
+from dags.etl.load import create_silver_layer, create_gold_layer
+from testes.fake_s3 import fake_bucket
+
+
+def put_cleaned(objects, records):
+    objects['bronze_layer/cleaned/breweries.json'] = json.dumps(records).encode('utf-8')
+
+
+RECORDS = [
+    {'id': '1', 'brewery_type': 'micro', 'state': 'texas'},
+    {'id': '2', 'brewery_type': 'brewpub', 'state': 'texas'},
+    {'id': '3', 'brewery_type': 'micro', 'state': 'oregon'},
+    {'id': '4', 'brewery_type': 'micro', 'state': 'ohio'},
+]
+
+
+class TestPartitionHash(unittest.TestCase):
+
+    def test_partition_hash_ignores_row_and_column_order(self):
+        """
+        Test that the hash only depends on the partition content.
+        """
+        df = pd.DataFrame(RECORDS)
+        shuffled = df.iloc[::-1][['state', 'id', 'brewery_type']]
+        changed = df.assign(brewery_type=['micro', 'micro', 'micro', 'micro'])
+
+        self.assertEqual(partition_hash(df), partition_hash(shuffled))
+        self.assertNotEqual(partition_hash(df), partition_hash(changed))
+
+
+class TestSilverManifest(unittest.TestCase):
+
+    def test_only_changed_partitions_are_rewritten(self):
+        """
+        Test that unchanged partitions are skipped, removed ones deleted, and the dirty set accumulated.
+        """
+        objects = {}
+        client = fake_bucket(objects)
+        put_cleaned(objects, RECORDS)
+
+        self.assertEqual(create_silver_layer(client, in_memory=True, use_manifest=True), ['ohio', 'oregon', 'texas'])
+        manifest = load_silver_manifest(client)
+        self.assertEqual(manifest['partitions']['texas']['rows'], 2)
+        self.assertEqual(manifest['partitions']['texas']['keys'], ['silver_layer/texas/breweries_texas.parquet'])
+        self.assertEqual(manifest['partitions']['texas']['bytes'], len(objects['silver_layer/texas/breweries_texas.parquet']))
+
+        # Same data: nothing is uploaded
+        client.upload_fileobj.reset_mock()
+        self.assertEqual(create_silver_layer(client, in_memory=True, use_manifest=True), [])
+        client.upload_fileobj.assert_not_called()
+
+        # Texas changes and Ohio disappears
+        put_cleaned(objects, [dict(RECORDS[0], brewery_type='large')] + RECORDS[1:3])
+        self.assertEqual(create_silver_layer(client, in_memory=True, use_manifest=True), ['texas', 'ohio'])
+        self.assertEqual([call.args[2] for call in client.upload_fileobj.call_args_list], ['silver_layer/texas/breweries_texas.parquet'])
+        self.assertNotIn('silver_layer/ohio/breweries_ohio.parquet', objects)
+
+        manifest = load_silver_manifest(client)
+        self.assertEqual(sorted(manifest['partitions']), ['oregon', 'texas'])
+        self.assertEqual(manifest['dirty'], ['ohio', 'oregon', 'texas'])
+
+    def test_gold_recomputes_dirty_partitions_only(self):
+        """
+        Test that gold only downloads the dirty partitions and clears them from the manifest.
+        """
+        objects = {}
+        client = fake_bucket(objects)
+        put_cleaned(objects, RECORDS)
+        create_silver_layer(client, in_memory=True, use_manifest=True)
+        create_gold_layer(client, use_manifest=True)
+        self.assertEqual(load_silver_manifest(client)['dirty'], [])
+
+        put_cleaned(objects, [dict(RECORDS[0], brewery_type='large')] + RECORDS[1:])
+        create_silver_layer(client, in_memory=True, use_manifest=True)
+        client.get_object.reset_mock()
+        create_gold_layer(client, use_manifest=True)
+
+        read_keys = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        self.assertIn('silver_layer/texas/breweries_texas.parquet', read_keys)
+        self.assertNotIn('silver_layer/oregon/breweries_oregon.parquet', read_keys)
+        self.assertEqual(load_silver_manifest(client)['dirty'], [])
+
+        gold = pd.read_parquet(io.BytesIO(objects['golden_layer/brewery_aggregated_by_type_and_location.parquet']))
+        self.assertEqual(sorted(map(tuple, gold[['brewery_type', 'state', 'brewery_count']].values.tolist())), [
+            ('brewpub', 'texas', 1), ('large', 'texas', 1), ('micro', 'ohio', 1), ('micro', 'oregon', 1),
+        ])
+
+        # Nothing dirty: the gold object is not rewritten
+        client.upload_file.reset_mock()
+        create_gold_layer(client, use_manifest=True)
+        client.upload_file.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch
+import io
+import tempfile
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+from dags.etl.silver_stream import iter_json_array, write_silver_stream, PartitionWriter
+from dags.etl.load import create_silver_layer
+from testes.fake_s3 import fake_bucket
+
+
+# Skewed like the real data: half of the rows in one state
+STATES = ['texas', 'texas', 'oregon', 'ohio']
+RECORDS = [{'id': str(i), 'name': f'brewery_{i}', 'brewery_type': 'micro', 'state': STATES[i % 4]} for i in range(40)]
+
+
+def cleaned_objects():
+    parquet = io.BytesIO()
+    pd.DataFrame(RECORDS[20:]).to_parquet(parquet, index=False)
+    return {
+        'bronze_layer/cleaned/part-0.json': json.dumps(RECORDS[:20]).encode('utf-8'),
+        'bronze_layer/cleaned/part-1.parquet': parquet.getvalue(),
+    }
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_elements_split_across_chunks(self):
+        """
+        Test that elements and multi-byte characters cut by the chunk boundaries are decoded.
+        """
+        records = [{'name': 'são_paulo' * i, 'tags': [i, None]} for i in range(30)]
+        body = json.dumps(records, ensure_ascii=False).encode('utf-8')
+        for chunk_size in (1, 3, 64):
+            self.assertEqual(list(iter_json_array(io.BytesIO(body), chunk_size)), records)
+        self.assertEqual(list(iter_json_array(io.BytesIO(b' [ ] '))), [])
+
+    def test_malformed_input(self):
+        """
+        Test that truncated arrays and non-array documents are rejected.
+        """
+        for body in (b'[{"id": "1"}', b'{"id": "1"}', b'[{"id": '):
+            with self.assertRaises(ValueError):
+                list(iter_json_array(io.BytesIO(body), 4))
+
+
+class TestSilverStream(unittest.TestCase):
+
+    def test_stream_writer_matches_pandas_writer(self):
+        """
+        Test that the streamed partitions hold the same rows as the in-memory build, in small row groups.
+        """
+        objects = cleaned_objects()
+        client = fake_bucket(objects)
+        states = create_silver_layer(client, writer='stream', stream_options={'batch_size': 4, 'row_group_size': 5, 'max_buffered_rows': 6})
+        self.assertEqual(states, ['ohio', 'oregon', 'texas'])
+
+        expected = pd.DataFrame(RECORDS)
+        for state in states:
+            key = f'silver_layer/{state}/breweries_{state}.parquet'
+            partition = pd.read_parquet(io.BytesIO(objects[key]))
+            self.assertEqual(sorted(partition['id']), sorted(expected[expected['state'] == state]['id']))
+            metadata = pq.ParquetFile(io.BytesIO(objects[key])).metadata
+            self.assertTrue(all(metadata.row_group(i).num_rows <= 5 for i in range(metadata.num_row_groups)))
+        self.assertGreater(pq.ParquetFile(io.BytesIO(objects['silver_layer/texas/breweries_texas.parquet'])).metadata.num_row_groups, 1)
+
+    def test_buffered_rows_stay_bounded(self):
+        """
+        Test that the rows buffered across states never exceed the cap once a batch is routed.
+        """
+        client = fake_bucket(cleaned_objects())
+        peaks = []
+        original_write = PartitionWriter.write
+
+        def write(writer, table):
+            original_write(writer, table)
+            peaks.append(writer.buffered_rows)
+
+        with patch('dags.etl.silver_stream.PartitionWriter.write', write), tempfile.TemporaryDirectory() as local_dir:
+            files = write_silver_stream(client, sorted(cleaned_objects()), local_dir, batch_size=4, row_group_size=100, max_buffered_rows=6)
+
+        self.assertEqual(sum(file_info['rows'] for file_info in files.values()), len(RECORDS))
+        self.assertLessEqual(max(peaks), 4 + 6)
+
+    def test_stream_writer_with_manifest(self):
+        """
+        Test that unchanged partitions are not uploaded again and changed ones are.
+        """
+        objects = cleaned_objects()
+        client = fake_bucket(objects)
+        options = {'batch_size': 8}
+        create_silver_layer(client, writer='stream', use_manifest=True, stream_options=options)
+
+        client.upload_file.reset_mock()
+        self.assertEqual(create_silver_layer(client, writer='stream', use_manifest=True, stream_options=options), [])
+        client.upload_file.assert_not_called()
+
+        changed = [dict(record, brewery_type='large') if record['id'] == '0' else record for record in RECORDS[:20]]
+        objects['bronze_layer/cleaned/part-0.json'] = json.dumps(changed).encode('utf-8')
+        self.assertEqual(create_silver_layer(client, writer='stream', use_manifest=True, stream_options=options), ['texas'])
+        self.assertEqual([call.args[2] for call in client.upload_file.call_args_list], ['silver_layer/texas/breweries_texas.parquet'])
+        manifest = json.loads(objects['silver_layer/_manifest.json'])
+        self.assertEqual(manifest['dirty'], ['ohio', 'oregon', 'texas'])
+
+    def test_no_cleaned_records(self):
+        """
+        Test that an empty cleaned layer is reported with the bucket and prefix it was read from.
+        """
+        with self.assertRaisesRegex(ValueError, '^No cleaned objects found under datalake-case/bronze_layer/cleaned$'):
+            create_silver_layer(fake_bucket({}), writer='stream')
+
+        client = fake_bucket({'bronze_layer/cleaned/part-0.json': b'[]'})
+        with tempfile.TemporaryDirectory() as local_dir:
+            with self.assertRaisesRegex(ValueError, '^No cleaned records found in the 1 objects read from datalake-case$'):
+                write_silver_stream(client, ['bronze_layer/cleaned/part-0.json'], local_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
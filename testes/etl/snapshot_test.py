@@ -0,0 +1,83 @@
+import unittest
+import hashlib
+import os
+import tempfile
+from dags.etl.snapshot import expected_etag, file_etag, snapshot_id, bronze_changed, save_published_snapshot
+from dags.etl.load import BronzeStreamWriter, stream_bronze_shards, MIN_PART_SIZE
+from testes.fake_s3 import fake_bucket
+
+
+class TestExpectedEtag(unittest.TestCase):
+
+    def test_single_and_multipart_etags(self):
+        """
+        Test the MD5 ETag of single uploads and the MD5-of-MD5s ETag of multipart uploads.
+        """
+        self.assertEqual(expected_etag([hashlib.md5(b'abc').digest()], multipart=False), '"900150983cd24fb0d6963f7d28e17f72"')
+        parts = [hashlib.md5(b'a').digest(), hashlib.md5(b'b').digest()]
+        self.assertEqual(expected_etag(parts), f'"{hashlib.md5(parts[0] + parts[1]).hexdigest()}-2"')
+        self.assertEqual(expected_etag(parts[:1]), f'"{hashlib.md5(parts[0]).hexdigest()}-1"')
+
+    def test_file_etag_follows_the_multipart_settings(self):
+        """
+        Test that a file above the multipart threshold gets the ETag of its chunks.
+        """
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(b'x' * 10)
+        try:
+            self.assertEqual(file_etag(f.name), expected_etag([hashlib.md5(b'x' * 10).digest()], multipart=False))
+            chunks = [hashlib.md5(b'x' * 4).digest(), hashlib.md5(b'x' * 4).digest(), hashlib.md5(b'x' * 2).digest()]
+            self.assertEqual(file_etag(f.name, {'multipart_threshold': 8, 'multipart_chunksize': 4}), expected_etag(chunks))
+        finally:
+            os.remove(f.name)
+
+
+class TestSkipUnchanged(unittest.TestCase):
+
+    def test_identical_objects_are_not_rewritten(self):
+        """
+        Test that an identical small object is not sent again and an identical multipart upload is aborted.
+        """
+        client = fake_bucket({})
+        big_page = [{"id": str(i), "name": os.urandom(64).hex()} for i in range(60000)]
+        for records in ([{"id": "1"}], big_page):
+            with self.subTest(records=len(records)):
+                for expected_unchanged in (False, True):
+                    with BronzeStreamWriter(client, 'datalake-case', 'raw/a.jsonl', part_size=MIN_PART_SIZE, skip_unchanged=True) as writer:
+                        writer.write_records(records)
+                    self.assertEqual(writer.unchanged, expected_unchanged)
+                    self.assertEqual(writer.etag, client.object_etag('raw/a.jsonl'))
+
+        self.assertEqual(client.put_object.call_count, 1)
+        self.assertEqual(client.complete_multipart_upload.call_count, 1)
+        self.assertEqual(client.abort_multipart_upload.call_count, 1)
+
+    def test_pipeline_is_skipped_only_once_published(self):
+        """
+        Test that an unchanged snapshot short-circuits the run only after a complete run published it.
+        """
+        client = fake_bucket({})
+        pages = [[{"id": str(i), "state": "texas"} for i in range(5)]]
+
+        keys = stream_bronze_shards(client, iter(pages), records_per_shard=2, codec='gzip', skip_unchanged=True)
+        snapshot = bronze_changed(client, keys)
+        self.assertIsNotNone(snapshot)
+
+        # The downstream stages failed: the same snapshot must run again
+        keys = stream_bronze_shards(client, iter(pages), records_per_shard=2, codec='gzip', skip_unchanged=True)
+        self.assertEqual(bronze_changed(client, keys), snapshot)
+        save_published_snapshot(client, snapshot)
+
+        client.put_object.reset_mock()
+        keys = stream_bronze_shards(client, iter(pages), records_per_shard=2, codec='gzip', skip_unchanged=True)
+        client.put_object.assert_not_called()
+        self.assertIsNone(bronze_changed(client, keys))
+
+        changed = [pages[0] + [{"id": "5", "state": "ohio"}]]
+        keys = stream_bronze_shards(client, iter(changed), records_per_shard=2, codec='gzip', skip_unchanged=True)
+        self.assertNotEqual(snapshot_id(client, keys), snapshot)
+        self.assertIsNotNone(bronze_changed(client, keys))
+
+
+if __name__ == '__main__':
+    unittest.main()
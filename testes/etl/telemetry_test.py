@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import patch
+import io
+import json
+import os
+import tempfile
+import boto3
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from opentelemetry import metrics, trace
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import InMemoryMetricReader
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from dags.etl.telemetry import stage_span, record_stage, instrument_client, build_exporters
+
+span_exporter = InMemorySpanExporter()
+metric_reader = InMemoryMetricReader()
+
+
+def setUpModule():
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    trace.set_tracer_provider(tracer_provider)
+    metrics.set_meter_provider(MeterProvider(metric_readers=[metric_reader]))
+
+
+class FakeRaw(io.BytesIO):
+
+    def stream(self, **kwargs):
+        yield self.read()
+
+
+def fake_s3_client(statuses):
+    """
+    Build a real S3 client whose HTTP responses are served in order from `statuses`
+    (`(status_code, body)` pairs, optionally followed by extra headers) instead of the network.
+    """
+    client = boto3.client('s3', endpoint_url='http://minio:9000', aws_access_key_id='a', aws_secret_access_key='b',
+                          region_name='us-east-1', config=Config(retries={'mode': 'standard', 'max_attempts': 3}))
+    responses = iter(statuses)
+
+    def send(request, **kwargs):
+        status_code, body, *headers = next(responses)
+        return AWSResponse(request.url, status_code, dict({'Content-Length': str(len(body)), 'ETag': '"etag"'}, **(headers[0] if headers else {})),
+                           FakeRaw(body))
+
+    client.meta.events.register('before-send.s3', send)
+    return client
+
+
+def metric_points(name):
+    points = []
+    for resource_metrics in metric_reader.get_metrics_data().resource_metrics:
+        for scope_metrics in resource_metrics.scope_metrics:
+            for metric in scope_metrics.metrics:
+                if metric.name == name:
+                    points += [(dict(point.attributes), getattr(point, 'value', getattr(point, 'count', None))) for point in metric.data.data_points]
+    return points
+
+
+class TestStageSpan(unittest.TestCase):
+
+    def setUp(self):
+        span_exporter.clear()
+
+    def test_stage_span_records_counters(self):
+        """
+        Test that the counters recorded during a stage end up on its span and metrics.
+        """
+        with stage_span('unit', **{'brewery.bucket': 'datalake-case'}) as stats:
+            record_stage(rows_in=10, rows_out=7)
+        record_stage(rows_in=100)  # outside of any stage: ignored
+
+        self.assertEqual(stats['rows_in'], 10)
+        span = span_exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, 'unit')
+        self.assertEqual(span.attributes['brewery.bucket'], 'datalake-case')
+        self.assertEqual(span.attributes['brewery.rows_out'], 7)
+        self.assertIn(({'stage': 'unit'}, 10), metric_points('brewery.stage.rows_in'))
+        self.assertIn(({'stage': 'unit'}, 1), metric_points('brewery.stage.duration'))
+
+    def test_stage_span_marks_errors(self):
+        """
+        Test that a failing stage is exported with an error status.
+        """
+        with self.assertRaises(ValueError):
+            with stage_span('failing'):
+                raise ValueError("boom")
+
+        span = span_exporter.get_finished_spans()[0]
+        self.assertFalse(span.status.is_ok)
+
+
+class TestInstrumentClient(unittest.TestCase):
+
+    def setUp(self):
+        span_exporter.clear()
+
+    @patch('botocore.endpoint.time.sleep')
+    def test_s3_calls_are_traced_and_counted(self, mock_sleep):
+        """
+        Test that S3 calls produce child spans and count bytes, objects and retries.
+        """
+        client = instrument_client(fake_s3_client([(200, b''), (503, b''), (200, b'hello'), (200, b'', {'Content-Length': '100'}),
+                                                   (200, b'<ListBucketResult/>')]))
+        instrument_client(client)  # registering twice does not double count
+
+        with stage_span('s3-unit') as stats:
+            client.put_object(Bucket='bucket', Key='a.json', Body=b'x' * 100)
+            self.assertEqual(client.get_object(Bucket='bucket', Key='a.json')['Body'].read(), b'hello')
+            # Neither the Content-Length of a HEAD nor a listing counts as data read
+            client.head_object(Bucket='bucket', Key='a.json')
+            client.list_objects_v2(Bucket='bucket', Prefix='a')
+
+        self.assertEqual(stats['bytes_written'], 100)
+        self.assertEqual(stats['bytes_read'], 5)
+        self.assertEqual(stats['objects_written'], 1)
+        self.assertEqual(stats['objects_read'], 1)
+        self.assertEqual(stats['s3_requests'], 4)
+        self.assertEqual(stats['s3_retries'], 1)
+
+        spans = {span.name: span for span in span_exporter.get_finished_spans()}
+        self.assertEqual(spans['s3.GetObject'].parent.span_id, spans['s3-unit'].context.span_id)
+        self.assertEqual(spans['s3.GetObject'].attributes['aws.retry_attempts'], 1)
+        self.assertEqual(spans['s3.PutObject'].attributes['aws.s3.key'], 'a.json')
+        self.assertIn(({'operation': 'GetObject'}, 1), metric_points('brewery.s3.retries'))
+
+
+class TestBuildExporters(unittest.TestCase):
+
+    def test_file_exporter_writes_json_lines(self):
+        """
+        Test that the file exporter appends one JSON document per span.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'telemetry', 'spans.jsonl')
+            file_span_exporter, _ = build_exporters('file', path)
+            provider = TracerProvider()
+            provider.add_span_processor(SimpleSpanProcessor(file_span_exporter))
+            for name in ('first', 'second'):
+                provider.get_tracer(__name__).start_span(name).end()
+            provider.shutdown()
+
+            with open(path) as f:
+                self.assertEqual([json.loads(line)['name'] for line in f], ['first', 'second'])
+
+    def test_unknown_exporter(self):
+        """
+        Test that an unknown exporter name is rejected.
+        """
+        with self.assertRaises(ValueError):
+            build_exporters('jaeger')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,14 @@ import os
 import json
 import pandas as pd
 from io import StringIO
-from dags.etl.transform import clean_data
+from dags.etl.transform import clean_data, clean_dataframe, clean_table, read_raw_table
+import io
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.parquet as pq
 import re
+import threading
+import time
 
 class TestCleanData(unittest.TestCase):
 
@@ -44,7 +50,7 @@ class TestCleanData(unittest.TestCase):
             'Contents': [{'Key': 'bronze_layer/raw/data.json'}]
         }
         sample_json = [{"Name": "Test Brewery", "Address": "123 Street", "City": "Test City"}]
-        mock_file_body = StringIO(json.dumps(sample_json))
+        mock_file_body = io.BytesIO(json.dumps(sample_json).encode('utf-8'))
         mock_client.get_object.return_value = {'Body': mock_file_body}
 
         with patch("os.path.join", return_value="/tmp/data.json"):
@@ -65,7 +71,7 @@ class TestCleanData(unittest.TestCase):
             'Contents': [{'Key': 'bronze_layer/raw/data.json'}]
         }
         sample_json = [{"Name": "Test Brewery"}]
-        mock_file_body = StringIO(json.dumps(sample_json))
+        mock_file_body = io.BytesIO(json.dumps(sample_json).encode('utf-8'))
         mock_client.get_object.return_value = {'Body': mock_file_body}
         mock_client.upload_file.side_effect = Exception("Upload failed")
 
@@ -87,7 +93,7 @@ class TestCleanData(unittest.TestCase):
             'Contents': [{'Key': 'bronze_layer/raw/data.json'}]
         }
         sample_json = [{"Name": "Test Brewery", "Address": "123 Street", "City": None}]
-        mock_file_body = StringIO(json.dumps(sample_json))
+        mock_file_body = io.BytesIO(json.dumps(sample_json).encode('utf-8'))
         mock_client.get_object.return_value = {'Body': mock_file_body}
 
         # Capture the DataFrame before saving
@@ -124,5 +130,170 @@ class TestCleanData(unittest.TestCase):
         pd.testing.assert_frame_equal(self.captured_df, df_expected)
         mock_client.upload_file.assert_called_once()
 
+    @patch("os.makedirs")
+    @patch("pandas.DataFrame.to_json")
+    def test_clean_data_reads_ndjson_keys(self, mock_to_json, mock_makedirs):
+        """Test that newline-delimited JSON objects passed by key are cleaned without listing the bucket."""
+        mock_client = MagicMock()
+        lines = "\n".join(json.dumps(r) for r in [{"Name": "One Brewery"}, {"Name": "Two Brewery"}])
+        mock_client.get_object.return_value = {'Body': io.BytesIO((lines + "\n").encode('utf-8'))}
+
+        with patch("os.path.join", return_value="/tmp/bronze_breweries.json"):
+            clean_data(mock_client, keys=['bronze_layer/raw/bronze_breweries.jsonl'])
+
+        mock_client.list_objects_v2.assert_not_called()
+        mock_client.get_object.assert_called_once_with(Bucket='datalake-case', Key='bronze_layer/raw/bronze_breweries.jsonl')
+        mock_client.upload_file.assert_called_once_with(
+            "/tmp/bronze_breweries.json", 'datalake-case', 'bronze_layer/cleaned/bronze_breweries.json'
+        )
+
+    @patch("os.makedirs")
+    def test_clean_data_prefetches_objects_sequentially_cleaned(self, mock_makedirs):
+        """Test that without worker processes the raw objects are downloaded concurrently and cleaned in key order."""
+        lock, active, peak = threading.Lock(), [0], [0]
+
+        def get_object(Bucket, Key):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {'Body': io.BytesIO(json.dumps({"id": Key, "Name": "A B"}).encode("utf-8"))}
+
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = get_object
+        keys = [f'bronze_layer/raw/part-{i}.jsonl' for i in range(6)]
+
+        cleaned = clean_data(mock_client, keys=keys, engine='arrow', download_workers=3)
+
+        self.assertEqual(cleaned, [f'bronze_layer/cleaned/part-{i}.parquet' for i in range(6)])
+        self.assertEqual(mock_client.get_object.call_count, 6)
+        self.assertGreater(peak[0], 1)
+        written = [pq.read_table(io.BytesIO(call.kwargs['Body'])).column('id')[0].as_py() for call in mock_client.put_object.call_args_list]
+        self.assertEqual(written, [key.lower() for key in keys])
+
+class TestCleanDataFrameEngines(unittest.TestCase):
+
+    def sample_frame(self):
+        return pd.json_normalize([
+            {"Brewery Name": "Foo  Bar\tBaz", "city": None, "lat": 1.5, "mixed": "A B", "tags": [1, 2], "unicode": "İstanbul Bräu"},
+            {"Brewery Name": "Old\x1cTown\x85Ale", "city": "New York", "lat": None, "mixed": 3, "tags": None, "unicode": None},
+            {"Brewery Name": None, "city": "  Lead\u3000Space", "lat": 2.0, "mixed": None, "tags": "A b", "unicode": "ǅ x"},
+        ])
+
+    def test_vectorized_engine_matches_python_engine(self):
+        """Test that the vectorized engine gives exactly the same output, including nulls and non-strings."""
+        expected = clean_dataframe(self.sample_frame(), engine='python')
+        result = clean_dataframe(self.sample_frame(), engine='vectorized')
+
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertEqual(result.loc[0, 'Brewery_Name'], 'foo_bar_baz')
+        self.assertEqual(result.loc[1, 'Brewery_Name'], 'old_town_ale')
+        self.assertEqual(result.loc[2, 'city'], '_lead_space')
+        self.assertEqual(result.loc[1, 'mixed'], 3)
+        self.assertEqual(result.loc[1, 'unicode'], 'unknown')
+
+    def test_unknown_engine(self):
+        """Test that an unknown engine is rejected before touching the bucket."""
+        mock_client = MagicMock()
+
+        with self.assertRaises(ValueError):
+            clean_data(mock_client, engine='spark')
+
+        mock_client.list_objects_v2.assert_not_called()
+
+class TestParallelCleaning(unittest.TestCase):
+
+    def fake_client(self):
+        client = MagicMock()
+
+        def get_object(Bucket, Key):
+            if 'broken' in Key:
+                raise ValueError("corrupted object")
+            return {'Body': io.BytesIO(json.dumps({"id": Key, "Name": "A B"}).encode("utf-8"))}
+
+        client.get_object.side_effect = get_object
+        return client
+
+    @patch("os.makedirs")
+    def test_clean_data_parallel_reports_results(self, mock_makedirs):
+        """Test that every worker opens its own client and the cleaned keys come back in input order."""
+        worker_client = self.fake_client()
+        keys = [f'bronze_layer/raw/part-{i}.jsonl' for i in range(5)]
+
+        # Threads stand in for processes so the mocked client factory is shared with the workers
+        with patch("dags.etl.transform.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("dags.etl.transform.get_boto3_client", return_value=worker_client) as mock_factory:
+            cleaned = clean_data(MagicMock(), keys=keys, engine='arrow', max_workers=3,
+                                 client_config={'endpoint': 'http://minio:9000', 'access_key': 'a', 'secret_key': 'b'})
+
+        self.assertEqual(cleaned, [f'bronze_layer/cleaned/part-{i}.parquet' for i in range(5)])
+        self.assertEqual(mock_factory.call_count, 3)
+        mock_factory.assert_called_with(endpoint='http://minio:9000', access_key='a', secret_key='b')
+        self.assertEqual(worker_client.put_object.call_count, 5)
+
+    @patch("os.makedirs")
+    def test_clean_data_parallel_collects_errors(self, mock_makedirs):
+        """Test that a failing object does not stop the others and is reported to the task."""
+        worker_client = self.fake_client()
+        keys = ['bronze_layer/raw/ok.jsonl', 'bronze_layer/raw/broken.jsonl', 'bronze_layer/raw/ok2.jsonl']
+
+        with patch("dags.etl.transform.ProcessPoolExecutor", ThreadPoolExecutor), \
+                patch("dags.etl.transform.get_boto3_client", return_value=worker_client):
+            with self.assertRaises(RuntimeError) as context:
+                clean_data(MagicMock(), keys=keys, engine='arrow', max_workers=2, client_config={'endpoint': 'x'})
+
+        self.assertIn("1 of 3 objects failed", str(context.exception))
+        self.assertIn('bronze_layer/raw/broken.jsonl', str(context.exception))
+        self.assertEqual(worker_client.put_object.call_count, 2)
+
+    def test_clean_data_parallel_requires_client_config(self):
+        """Test that the parallel mode needs connection settings for the worker processes."""
+        with self.assertRaises(ValueError):
+            clean_data(MagicMock(), max_workers=4)
+
+class TestArrowEngine(unittest.TestCase):
+
+    def raw_ndjson(self):
+        records = [
+            {"id": "1", "Brewery Name": "Foo  Bar", "address_2": None, "location": {"City Name": "New York", "zip": 10001}},
+            {"id": "2", "Brewery Name": None, "address_2": None, "location": {"City Name": "Old\u3000Town", "zip": None}},
+        ]
+        return "\n".join(json.dumps(r) for r in records).encode("utf-8")
+
+    def test_clean_table_applies_cleaning_rules(self):
+        """Test flattening, column renaming, normalisation and null filling with Arrow kernels."""
+        table = clean_table(read_raw_table(self.raw_ndjson(), 'bronze_layer/raw/data.jsonl'))
+
+        self.assertEqual(table.column_names, ['id', 'Brewery_Name', 'address_2', 'location.City_Name', 'location.zip'])
+        self.assertEqual(table['Brewery_Name'].to_pylist(), ['foo_bar', 'unknown'])
+        self.assertEqual(table['address_2'].to_pylist(), ['unknown', 'unknown'])
+        self.assertEqual(table['location.City_Name'].to_pylist(), ['new_york', 'old_town'])
+        # Typed columns keep their nulls
+        self.assertEqual(table['location.zip'].to_pylist(), [10001, None])
+
+    def test_read_raw_table_json_array_and_empty(self):
+        """Test that legacy JSON arrays and empty objects are read."""
+        table = read_raw_table(json.dumps([{"a": 1}, {"b": "x"}]).encode("utf-8"), 'raw/data.json')
+        self.assertEqual(table.column_names, ['a', 'b'])
+        self.assertEqual(read_raw_table(b'', 'raw/delta.jsonl').num_rows, 0)
+
+    @patch("os.makedirs")
+    def test_clean_data_arrow_engine_writes_parquet(self, mock_makedirs):
+        """Test that the arrow engine uploads a Parquet object without going through pandas."""
+        mock_client = MagicMock()
+        mock_client.get_object.return_value = {'Body': io.BytesIO(self.raw_ndjson())}
+
+        with patch("pandas.json_normalize") as mock_normalize:
+            keys = clean_data(mock_client, keys=['bronze_layer/raw/bronze_breweries.jsonl'], engine='arrow')
+
+        mock_normalize.assert_not_called()
+        mock_client.upload_file.assert_not_called()
+        self.assertEqual(keys, ['bronze_layer/cleaned/bronze_breweries.parquet'])
+        put_call = mock_client.put_object.call_args
+        self.assertEqual(put_call.kwargs['Key'], 'bronze_layer/cleaned/bronze_breweries.parquet')
+        self.assertEqual(pq.read_table(io.BytesIO(put_call.kwargs['Body'])).num_rows, 2)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,90 @@
+from unittest.mock import MagicMock
+import hashlib
+import io
+from botocore.exceptions import ClientError
+
+
+def fake_bucket(objects):
+    """
+    Build a MagicMock S3 client backed by a dict of key -> bytes, shared by the etl tests.
+
+    It serves whole and ranged reads, HEAD requests, listings, single, file and multipart
+    uploads and deletes, and gives objects S3-like ETags: the MD5 of the content for single
+    uploads, the MD5 of the part digests followed by '-<parts>' for multipart uploads.
+    `client.object_etag(key)` returns the ETag of a stored object, and the keys added to
+    `client.undeletable` are reported in the `Errors` of `delete_objects` answers.
+    """
+    client = MagicMock()
+    multipart_etags, uploads, undeletable = {}, {}, set()
+
+    def store(key, body):
+        objects[key] = body
+        multipart_etags.pop(key, None)
+
+    def object_etag(key):
+        return multipart_etags.get(key) or f'"{hashlib.md5(objects[key]).hexdigest()}"'
+
+    def missing(operation):
+        return ClientError({'Error': {'Code': '404' if operation == 'HeadObject' else 'NoSuchKey'}}, operation)
+
+    def get_object(Bucket, Key, Range=None):
+        if Key not in objects:
+            raise missing('GetObject')
+        body = objects[Key]
+        if Range is None:
+            return {'Body': io.BytesIO(body)}
+        start, end = Range[len('bytes='):].split('-')
+        start, end = (max(len(body) - int(end), 0), len(body) - 1) if not start else (int(start), int(end))
+        return {'Body': io.BytesIO(body[start:end + 1]), 'ContentRange': f'bytes {start}-{end}/{len(body)}'}
+
+    def head_object(Bucket, Key):
+        if Key not in objects:
+            raise missing('HeadObject')
+        return {'ETag': object_etag(Key), 'ContentLength': len(objects[Key])}
+
+    def upload_file(path, bucket, key, **kwargs):
+        with open(path, 'rb') as f:
+            store(key, f.read())
+
+    def delete_objects(Bucket, Delete):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        for key in keys:
+            if key not in undeletable:
+                objects.pop(key, None)
+        response = {'Deleted': [{'Key': key} for key in keys if key not in undeletable]}
+        errors = [{'Key': key, 'Code': 'AccessDenied', 'Message': 'Access Denied'} for key in keys if key in undeletable]
+        if errors:
+            response['Errors'] = errors
+        return response
+
+    def create_multipart_upload(Bucket, Key):
+        upload_id = f'upload-{len(uploads) + 1}'
+        uploads[upload_id] = []
+        return {'UploadId': upload_id}
+
+    def upload_part(Bucket, Key, UploadId, PartNumber, Body):
+        uploads[UploadId].append(Body)
+        return {'ETag': f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(Bucket, Key, UploadId, MultipartUpload):
+        parts = uploads.pop(UploadId)
+        store(Key, b''.join(parts))
+        multipart_etags[Key] = f'"{hashlib.md5(b"".join(hashlib.md5(part).digest() for part in parts)).hexdigest()}-{len(parts)}"'
+
+    client.get_object.side_effect = get_object
+    client.head_object.side_effect = head_object
+    client.list_objects_v2.side_effect = lambda Bucket, Prefix, **kwargs: {'Contents': [
+        {'Key': key, 'Size': len(body), 'ETag': object_etag(key)} for key, body in sorted(objects.items()) if key.startswith(Prefix)
+    ]}
+    client.put_object.side_effect = lambda Bucket, Key, Body, **kwargs: store(Key, Body)
+    client.upload_file.side_effect = upload_file
+    client.upload_fileobj.side_effect = lambda fileobj, bucket, key, **kwargs: store(key, fileobj.read())
+    client.create_multipart_upload.side_effect = create_multipart_upload
+    client.upload_part.side_effect = upload_part
+    client.complete_multipart_upload.side_effect = complete_multipart_upload
+    client.abort_multipart_upload.side_effect = lambda Bucket, Key, UploadId: uploads.pop(UploadId)
+    client.delete_object.side_effect = lambda Bucket, Key: objects.pop(Key, None)
+    client.delete_objects.side_effect = delete_objects
+    client.object_etag = object_etag
+    client.undeletable = undeletable
+    return client